@@ -2,72 +2,105 @@
 from __future__ import annotations
 
 import logging
-from datetime import timedelta
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.typing import ConfigType
 
-from .const import DOMAIN
+from .const import CONF_SELECTED_CARPARKS, DOMAIN
 from .api import TfNSWCarParkAPI
+from .coordinator import TfNSWCarParkCoordinator, snapshot_store
+from .directory import async_get_directory
+from .history import async_get_history
+from .services import async_setup_services
+from .spatial import async_get_locator
+from .session import async_get_shared_session, async_release_shared_session
+from .thresholds import async_get_thresholds
 
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORMS: list[Platform] = [Platform.SENSOR]
-SCAN_INTERVAL = timedelta(minutes=5)
+
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the TfNSW Car Park services."""
+    async_setup_services(hass)
+    return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up TfNSW Car Park from a config entry."""
     api_key = entry.data["api_key"]
-    selected_carparks = entry.data.get("selected_carparks", [])
-    
-    api = TfNSWCarParkAPI(api_key)
-    
-    async def async_update_data():
-        """Fetch data from API endpoint."""
-        try:
-            data = {}
-            for carpark_id in selected_carparks:
-                _LOGGER.debug("Fetching data for carpark %s", carpark_id)
-                carpark_data = await api.get_carpark_data(carpark_id)
-                if carpark_data:
-                    _LOGGER.debug("Received data for carpark %s: %s", carpark_id, carpark_data)
-                    data[carpark_id] = carpark_data
-                else:
-                    _LOGGER.warning("No data received for carpark %s", carpark_id)
-            _LOGGER.debug("Total data collected: %s", data)
-            return data
-        except Exception as err:
-            _LOGGER.error("Error communicating with API: %s", err)
-            raise UpdateFailed(f"Error communicating with API: {err}")
-    
-    coordinator = DataUpdateCoordinator(
-        hass,
-        _LOGGER,
-        name="aus_tfnsw_carparks",
-        update_method=async_update_data,
-        update_interval=SCAN_INTERVAL,
+
+    directory = await async_get_directory(hass)
+    history = await async_get_history(
+        hass, entry.data.get(CONF_SELECTED_CARPARKS, [])
     )
-    
-    # Fetch initial data so we have data when entities subscribe
-    await coordinator.async_config_entry_first_refresh()
-    
-    hass.data.setdefault(DOMAIN, {})
-    hass.data[DOMAIN][entry.entry_id] = {
-        "coordinator": coordinator,
-        "api": api,
-    }
-    
-    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
-    
+    thresholds = await async_get_thresholds(hass)
+
+    shared_session = async_get_shared_session(hass)
+    api = TfNSWCarParkAPI(
+        api_key,
+        session=shared_session.acquire(),
+        coalescer=shared_session.coalescer,
+        budget=shared_session.budget,
+    )
+
+    # Hand the shared session back on any failure, or it is never closed
+    try:
+        coordinator = TfNSWCarParkCoordinator(
+            hass, entry, api, directory, history, thresholds, shared_session.stats
+        )
+
+        # Start from the last known snapshots when there are any, otherwise
+        # fetch initial data so we have data when entities subscribe
+        if await coordinator.async_restore():
+            entry.async_create_background_task(
+                hass, coordinator.async_refresh(), f"{DOMAIN} first refresh"
+            )
+        else:
+            await coordinator.async_config_entry_first_refresh()
+
+        locator = async_get_locator(hass, directory)
+        entry.async_on_unload(locator.async_register(coordinator))
+
+        hass.data.setdefault(DOMAIN, {})
+        hass.data[DOMAIN][entry.entry_id] = {
+            "coordinator": coordinator,
+            "api": api,
+        }
+
+        await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    except Exception:
+        hass.data.get(DOMAIN, {}).pop(entry.entry_id, None)
+        await api.close()
+        await async_release_shared_session(hass)
+        raise
+
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+
     return True
 
 
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload a config entry after its options changed."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
-    
+        entry_data = hass.data[DOMAIN].pop(entry.entry_id)
+        await entry_data["api"].close()
+        await async_release_shared_session(hass)
+
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the saved snapshots of a deleted config entry."""
+    await snapshot_store(hass, entry.entry_id).async_remove()
@@ -0,0 +1,135 @@
+"""Group totals for the TfNSW Car Park integration."""
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from .models import CarParkSnapshot
+
+# A member's share of the totals as (capacity, occupied, available,
+# reporting, stale), the last two being 0 or 1
+Contribution = Tuple[int, int, int, int, int]
+
+NO_CONTRIBUTION: Contribution = (0, 0, 0, 0, 0)
+
+
+def _contribution(snapshot: Optional[CarParkSnapshot]) -> Contribution:
+    """Return what a car park's snapshot adds to its groups' totals."""
+    if snapshot is None or snapshot.available is None:
+        return NO_CONTRIBUTION
+    return (
+        snapshot.total_capacity,
+        snapshot.occupied,
+        snapshot.available,
+        1,
+        1 if snapshot.stale else 0,
+    )
+
+
+class GroupTotals:
+    """Running capacity and occupancy totals of a group of car parks.
+
+    The last contribution of every member is kept, so a changed snapshot
+    moves the totals by its difference alone and the cost of an update does
+    not depend on the size of the group.
+    """
+
+    __slots__ = (
+        "group_id",
+        "name",
+        "total_capacity",
+        "occupied",
+        "available",
+        "reporting",
+        "stale",
+        "version",
+        "_contributions",
+    )
+
+    def __init__(self, group_id: str, name: str) -> None:
+        """Initialize an empty group."""
+        self.group_id = group_id
+        self.name = name
+        self.total_capacity = 0
+        self.occupied = 0
+        self.available = 0
+        self.reporting = 0
+        self.stale = 0
+        # Bumped whenever the totals change, so listeners can check it
+        self.version = 0
+        self._contributions: Dict[str, Contribution] = {}
+
+    @property
+    def members(self) -> int:
+        """Return the number of car parks in the group."""
+        return len(self._contributions)
+
+    @property
+    def occupancy_percentage(self) -> Optional[float]:
+        """Return the share of the group's capacity that is occupied."""
+        if not self.reporting:
+            return None
+        if self.total_capacity <= 0:
+            return 0
+        return round((self.occupied / self.total_capacity) * 100, 1)
+
+    def add_member(self, carpark_id: str) -> None:
+        """Add a car park that has not reported yet."""
+        self._contributions.setdefault(carpark_id, NO_CONTRIBUTION)
+
+    def update(self, carpark_id: str, snapshot: Optional[CarParkSnapshot]) -> bool:
+        """Apply a member's new snapshot, returning True if the totals moved."""
+        old = self._contributions.get(carpark_id, NO_CONTRIBUTION)
+        new = _contribution(snapshot)
+        self._contributions[carpark_id] = new
+        if new == old:
+            return False
+        self._apply(old, new)
+        return True
+
+    def remove_member(self, carpark_id: str) -> bool:
+        """Drop a car park, returning True if the totals moved."""
+        old = self._contributions.pop(carpark_id, NO_CONTRIBUTION)
+        if old == NO_CONTRIBUTION:
+            return False
+        self._apply(old, NO_CONTRIBUTION)
+        return True
+
+    def _apply(self, old: Contribution, new: Contribution) -> None:
+        """Move the totals from one contribution to another."""
+        self.total_capacity += new[0] - old[0]
+        self.occupied += new[1] - old[1]
+        self.available += new[2] - old[2]
+        self.reporting += new[3] - old[3]
+        self.stale += new[4] - old[4]
+        self.version += 1
+
+
+def parse_groups(text: str) -> Dict[str, List[str]]:
+    """Parse groups written one per line as "Name: id, id, ...".
+
+    Raises ValueError if a line is not in that form.
+    """
+    groups: Dict[str, List[str]] = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        name, separator, members = line.partition(":")
+        name = name.strip()
+        carpark_ids = [
+            carpark_id.strip()
+            for carpark_id in members.split(",")
+            if carpark_id.strip()
+        ]
+        if not separator or not name or not carpark_ids:
+            raise ValueError(f"Expected 'Name: id, id' but got '{line.strip()}'")
+        if name in groups:
+            raise ValueError(f"Group '{name}' is defined twice")
+        groups[name] = list(dict.fromkeys(carpark_ids))
+    return groups
+
+
+def format_groups(groups: Mapping[str, Iterable[str]]) -> str:
+    """Format groups in the form read by parse_groups."""
+    return "\n".join(
+        f"{name}: {', '.join(carpark_ids)}" for name, carpark_ids in groups.items()
+    )
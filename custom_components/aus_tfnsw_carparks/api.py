@@ -2,80 +2,579 @@
 from __future__ import annotations
 
 import asyncio
+import json
 import logging
-from typing import Any, Dict, Optional
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+)
 
 import aiohttp
 import async_timeout
 
-from .const import API_BASE_URL
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+from .const import (
+    API_BASE_URL,
+    AUTH_FAILURE_STATUSES,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_TIMEOUT,
+    COALESCE_TTL,
+    DNS_CACHE_TTL,
+    KEEPALIVE_TIMEOUT,
+    KEY_COOLDOWN,
+    MAX_CONCURRENT_REQUESTS,
+    REQUEST_DEADLINE,
+    REQUEST_TIMEOUT,
+    REQUESTS_PER_SECOND,
+    RETRY_ATTEMPTS,
+    RETRY_BACKOFF_BASE,
+    RETRY_BACKOFF_MAX,
+    RETRY_STATUSES,
+)
+from .metrics import RefreshMetrics
+from .scheduler import RequestBudget
 
 _LOGGER = logging.getLogger(__name__)
 
 
+class CircuitOpenError(Exception):
+    """Raised instead of calling the API while the circuit is open."""
+
+
+def _retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Return the delay requested by a Retry-After header, in seconds."""
+    if (value := headers.get("Retry-After")) is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+class CircuitBreaker:
+    """Fail fast while the upstream API keeps failing.
+
+    After enough consecutive failures the circuit opens and requests are
+    refused until the reset timeout passes. The next request is then let
+    through as a trial and the rest are refused while it runs: success
+    closes the circuit, failure reopens it. A trial that ends without
+    either, e.g. when it is cancelled, gives way to a new one after
+    another reset timeout.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = CIRCUIT_RESET_TIMEOUT,
+    ) -> None:
+        """Initialize a closed circuit."""
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        """Return True if requests are currently refused."""
+        if self._opened_at is None:
+            return False
+        return time.monotonic() - self._opened_at < self._reset_timeout
+
+    def check(self) -> None:
+        """Raise if requests are currently refused, else admit a request."""
+        if self._opened_at is None:
+            return
+        now = time.monotonic()
+        if now - self._opened_at < self._reset_timeout:
+            raise CircuitOpenError("TfNSW API circuit is open")
+        # Half open: this request is the trial, refuse others until it ends
+        self._opened_at = now
+
+    def record_success(self) -> None:
+        """Close the circuit."""
+        self._failures = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        """Count a failure, opening the circuit at the threshold."""
+        self._failures += 1
+        if self._failures >= self._failure_threshold:
+            if self._opened_at is None:
+                _LOGGER.warning(
+                    "TfNSW API failed %d times in a row, pausing requests for %ds",
+                    self._failures,
+                    self._reset_timeout,
+                )
+            self._opened_at = time.monotonic()
+
+
+class ConnectionStats:
+    """Count new versus reused connections in a pooled session."""
+
+    def __init__(self) -> None:
+        """Initialize the counters."""
+        self.created = 0
+        self.reused = 0
+
+    @property
+    def reuse_rate(self) -> float:
+        """Return the fraction of requests served on a kept-alive connection."""
+        total = self.created + self.reused
+        return self.reused / total if total else 0.0
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """Return a trace config that feeds these counters."""
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(self._on_connection_create)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuse)
+        return trace_config
+
+    async def _on_connection_create(self, session, context, params) -> None:
+        """Record a freshly opened connection."""
+        self.created += 1
+
+    async def _on_connection_reuse(self, session, context, params) -> None:
+        """Record a request served from the connection pool."""
+        self.reused += 1
+
+
+def create_session(stats: Optional[ConnectionStats] = None) -> aiohttp.ClientSession:
+    """Create a pooled session tuned for polling the TfNSW API."""
+    connector = aiohttp.TCPConnector(
+        limit_per_host=MAX_CONCURRENT_REQUESTS,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        trace_configs=[stats.trace_config()] if stats else None,
+    )
+
+
+class RateLimiter:
+    """Token bucket keeping requests inside a requests-per-second budget."""
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        """Initialize the rate limiter."""
+        self._rate = rate
+        self._burst = max(burst, 1)
+        self._tokens = float(self._burst)
+        self._updated: Optional[float] = None
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent."""
+        if self._rate <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if self._updated is not None:
+            self._tokens = min(
+                self._burst, self._tokens + (now - self._updated) * self._rate
+            )
+        self._updated = now
+        # Reserve the token up front so concurrent waiters queue behind us
+        self._tokens -= 1
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self._rate)
+
+
+class RequestCoalescer:
+    """Share facility fetches between API clients.
+
+    A request for a facility that is already being fetched waits for that
+    fetch, and successful results are reused for a short time, so config
+    entries tracking the same car parks cause a single upstream request.
+    Fetches rotate through the API keys of every registered client to
+    spread the load across their quotas. Only keys that have worked are
+    shared, and a key the API rejects sits out for a cool-down, so one
+    entry's bad key cannot fail the other entries' fetches.
+    """
+
+    def __init__(
+        self, ttl: float = COALESCE_TTL, key_cooldown: float = KEY_COOLDOWN
+    ) -> None:
+        """Initialize the coalescer."""
+        self._ttl = ttl
+        self._key_cooldown = key_cooldown
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._results: Dict[str, Tuple[float, Any]] = {}
+        self._api_keys: List[str] = []
+        self._working_keys: Set[str] = set()
+        self._rejected_keys: Dict[str, float] = {}
+        self._next_key = 0
+
+    def register_key(self, api_key: str) -> None:
+        """Add a client's API key to the rotation."""
+        self._api_keys.append(api_key)
+
+    def unregister_key(self, api_key: str) -> None:
+        """Remove a client's API key from the rotation."""
+        if api_key in self._api_keys:
+            self._api_keys.remove(api_key)
+        if api_key not in self._api_keys:
+            self._working_keys.discard(api_key)
+            self._rejected_keys.pop(api_key, None)
+
+    def _is_rejected(self, api_key: str, now: float) -> bool:
+        """Return True if a key is cooling down after being rejected."""
+        if (rejected_at := self._rejected_keys.get(api_key)) is None:
+            return False
+        if now - rejected_at < self._key_cooldown:
+            return True
+        del self._rejected_keys[api_key]
+        return False
+
+    def next_key(self, default: str) -> str:
+        """Return the API key to use for the next upstream request.
+
+        Rotates through the keys that have worked, plus the caller's own key
+        so it can prove itself. Falls back to the caller's key if none is
+        usable.
+        """
+        now = time.monotonic()
+        keys = [
+            api_key
+            for api_key in dict.fromkeys(self._api_keys)
+            if (api_key in self._working_keys or api_key == default)
+            and not self._is_rejected(api_key, now)
+        ]
+        if not keys:
+            return default
+        self._next_key = (self._next_key + 1) % len(keys)
+        return keys[self._next_key]
+
+    def record_key_success(self, api_key: str) -> None:
+        """Share a key that the API accepted."""
+        if api_key not in self._working_keys:
+            self._working_keys.add(api_key)
+            self._rejected_keys.pop(api_key, None)
+
+    def record_key_rejected(self, api_key: str) -> None:
+        """Take a key the API rejected out of the rotation for a while."""
+        if api_key not in self._rejected_keys:
+            _LOGGER.warning(
+                "TfNSW API rejected an API key, not sharing it for %ds",
+                self._key_cooldown,
+            )
+        self._working_keys.discard(api_key)
+        self._rejected_keys[api_key] = time.monotonic()
+
+    async def fetch(
+        self, key: str, fetch: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """Return the result for a key and whether another caller fetched it.
+
+        A fetch that returns None counts as a failure and is not cached.
+        """
+        now = time.monotonic()
+        if (cached := self._results.get(key)) is not None:
+            if now - cached[0] < self._ttl:
+                return cached[1], True
+            del self._results[key]
+        if (future := self._in_flight.get(key)) is not None:
+            return await asyncio.shield(future), True
+
+        future = self._in_flight[key] = asyncio.get_running_loop().create_future()
+        result = None
+        try:
+            result = await fetch()
+            if result is not None:
+                self._results[key] = (time.monotonic(), result)
+            return result, False
+        finally:
+            del self._in_flight[key]
+            # Waiters see a cancelled or failed fetch as a missing result
+            future.set_result(result)
+
+
 class TfNSWCarParkAPI:
     """TfNSW Car Park API client."""
 
-    def __init__(self, api_key: str) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        session: Optional[aiohttp.ClientSession] = None,
+        max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+        requests_per_second: float = REQUESTS_PER_SECOND,
+        base_url: str = API_BASE_URL,
+        metrics: Optional[RefreshMetrics] = None,
+        coalescer: Optional[RequestCoalescer] = None,
+        budget: Optional[RequestBudget] = None,
+    ) -> None:
         """Initialize the API client."""
         self.api_key = api_key
-        self.session = None
+        self.base_url = base_url
+        self.metrics = metrics or RefreshMetrics()
+        self.session = session
+        self._owns_session = session is None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._rate_limiter = RateLimiter(requests_per_second, burst=max_concurrency)
+        self.circuit_breaker = CircuitBreaker()
+        self.coalescer = coalescer
+        if coalescer is not None:
+            coalescer.register_key(api_key)
+        self.budget = budget
 
     async def _get_session(self) -> aiohttp.ClientSession:
         """Get aiohttp session."""
         if self.session is None:
-            self.session = aiohttp.ClientSession()
+            self.session = create_session()
         return self.session
 
     async def close(self) -> None:
-        """Close the session."""
-        if self.session:
+        """Close the session if this client created it."""
+        if self.coalescer is not None:
+            self.coalescer.unregister_key(self.api_key)
+            self.coalescer = None
+        if self.session and self._owns_session:
             await self.session.close()
             self.session = None
 
-    async def _request(self, url: str) -> Dict[str, Any]:
-        """Make a request to the API."""
+    async def _request_with_headers(
+        self,
+        url: str,
+        extra_headers: Optional[Mapping[str, str]] = None,
+        facility_id: Optional[str] = None,
+        api_key: Optional[str] = None,
+        reserved: bool = False,
+    ) -> Tuple[Any, Mapping[str, str]]:
+        """Make a request to the API, returning data and response headers.
+
+        Timeouts, connection errors and retryable statuses are retried with
+        jittered exponential backoff, honouring Retry-After, within an overall
+        deadline. Data is None when the server answers a conditional request
+        with 304. Every attempt is counted against the request budget, the
+        first one through the scheduler's reservation when it has one.
+        """
         headers = {
             "accept": "application/json",
-            "Authorization": f"apikey {self.api_key}"
+            "Authorization": f"apikey {api_key or self.api_key}"
         }
+        if extra_headers:
+            headers.update(extra_headers)
         
         session = await self._get_session()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + REQUEST_DEADLINE
         
-        try:
-            async with async_timeout.timeout(10):
-                async with session.get(url, headers=headers) as response:
-                    response.raise_for_status()
-                    return await response.json()
-        except asyncio.TimeoutError:
+        for attempt in range(RETRY_ATTEMPTS):
+            try:
+                self.circuit_breaker.check()
+            except CircuitOpenError:
+                if reserved and not attempt and self.budget is not None:
+                    self.budget.refund()
+                raise
+            if self.budget is not None and (attempt or not reserved):
+                self.budget.charge()
+            self.metrics.requests += 1
+            retry_after = None
+            try:
+                async with async_timeout.timeout(REQUEST_TIMEOUT):
+                    async with session.get(url, headers=headers) as response:
+                        if response.status in RETRY_STATUSES:
+                            retry_after = _retry_after(response.headers)
+                        response.raise_for_status()
+                        if response.status == 304:
+                            self.metrics.not_modified += 1
+                            data = None
+                        else:
+                            body = await response.read()
+                            started = time.perf_counter()
+                            data = json_loads(body) if body else None
+                            self.metrics.record_response(
+                                facility_id, len(body), time.perf_counter() - started
+                            )
+                self.circuit_breaker.record_success()
+                return data, response.headers
+            except aiohttp.ClientResponseError as err:
+                if err.status not in RETRY_STATUSES:
+                    self.metrics.failures += 1
+                    _LOGGER.error(
+                        "Error occurred while connecting to TfNSW API: %s", err
+                    )
+                    raise
+                error: Exception = err
+            except asyncio.TimeoutError as err:
+                error = err
+            except aiohttp.ClientError as err:
+                error = err
+            
+            self.circuit_breaker.record_failure()
+            delay = random.uniform(
+                0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2**attempt)
+            )
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            if attempt + 1 == RETRY_ATTEMPTS or loop.time() + delay > deadline:
+                break
+            self.metrics.retries += 1
+            _LOGGER.debug(
+                "Retrying TfNSW API request in %.1fs after %r", delay, error
+            )
+            await asyncio.sleep(delay)
+        
+        self.metrics.failures += 1
+        if isinstance(error, asyncio.TimeoutError):
             _LOGGER.error("Timeout occurred while connecting to TfNSW API")
-            raise
-        except aiohttp.ClientError as err:
-            _LOGGER.error("Error occurred while connecting to TfNSW API: %s", err)
-            raise
+        else:
+            _LOGGER.error("Error occurred while connecting to TfNSW API: %s", error)
+        raise error
+
+    async def _request(
+        self,
+        url: str,
+        facility_id: Optional[str] = None,
+        api_key: Optional[str] = None,
+        reserved: bool = False,
+    ) -> Dict[str, Any]:
+        """Make a request to the API."""
+        data, _ = await self._request_with_headers(
+            url, facility_id=facility_id, api_key=api_key, reserved=reserved
+        )
+        return data
 
     async def get_carpark_list(self) -> Dict[str, str]:
         """Get list of available car parks."""
         try:
-            data = await self._request(API_BASE_URL)
+            data = await self._request(self.base_url)
             _LOGGER.debug("Retrieved %d car parks", len(data))
             return data
         except Exception as err:
             _LOGGER.error("Failed to get car park list: %s", err)
             raise
 
+    async def get_carpark_list_if_modified(
+        self, etag: Optional[str] = None, last_modified: Optional[str] = None
+    ) -> Tuple[Optional[Dict[str, str]], Optional[str], Optional[str]]:
+        """Get the car park list unless it is unchanged since the given validators.
+
+        Returns the list (None if unchanged) with the new ETag and Last-Modified.
+        """
+        extra_headers = {}
+        if etag:
+            extra_headers["If-None-Match"] = etag
+        if last_modified:
+            extra_headers["If-Modified-Since"] = last_modified
+        try:
+            data, headers = await self._request_with_headers(
+                self.base_url, extra_headers
+            )
+        except Exception as err:
+            _LOGGER.error("Failed to get car park list: %s", err)
+            raise
+        if data is None:
+            _LOGGER.debug("Car park list not modified")
+        else:
+            _LOGGER.debug("Retrieved %d car parks", len(data))
+        return (
+            data,
+            headers.get("ETag", etag),
+            headers.get("Last-Modified", last_modified),
+        )
+
     async def get_carpark_data(self, facility_id: str) -> Optional[Dict[str, Any]]:
-        """Get data for a specific car park."""
-        url = f"{API_BASE_URL}?facility={facility_id}"
+        """Get data for a specific car park, polled on a budget reservation."""
+        url = f"{self.base_url}?facility={facility_id}"
+        api_key = (
+            self.coalescer.next_key(self.api_key) if self.coalescer else self.api_key
+        )
         
+        started = time.monotonic()
         try:
-            data = await self._request(url)
+            data = await self._request(url, facility_id, api_key, reserved=True)
+            if self.coalescer is not None:
+                self.coalescer.record_key_success(api_key)
+            self.metrics.record_latency(facility_id, time.monotonic() - started, True)
             _LOGGER.debug("Retrieved data for car park %s", facility_id)
             return data
+        except CircuitOpenError:
+            self.metrics.circuit_rejections += 1
+            _LOGGER.debug("Skipped car park %s while the circuit is open", facility_id)
+            return None
         except Exception as err:
+            if (
+                self.coalescer is not None
+                and isinstance(err, aiohttp.ClientResponseError)
+                and err.status in AUTH_FAILURE_STATUSES
+            ):
+                self.coalescer.record_key_rejected(api_key)
+            self.metrics.record_latency(facility_id, time.monotonic() - started, False)
             _LOGGER.error("Failed to get data for car park %s: %s", facility_id, err)
             return None
 
+    async def get_all_carpark_data(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Get data for every car park in one request, if the API offers it.
+
+        Returns None when the list endpoint only carries names, in which case
+        callers have to fall back to per-facility requests. Like a single
+        car park, it is polled on a budget reservation.
+        """
+        await self._rate_limiter.acquire()
+        data = await self._request(self.base_url, reserved=True)
+        if not data or not all(isinstance(value, dict) for value in data.values()):
+            return None
+        _LOGGER.debug("Retrieved bulk data for %d car parks", len(data))
+        return data
+
+    async def _get_carpark_data_limited(
+        self, facility_id: str
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Get data for a car park within the concurrency and rate budget.
+
+        With a coalescer, fetches shared with other clients skip the rate
+        limit and hand their budget reservation back.
+        """
+
+        async def fetch() -> Optional[Dict[str, Any]]:
+            async with self._semaphore:
+                await self._rate_limiter.acquire()
+                return await self.get_carpark_data(facility_id)
+
+        if self.coalescer is None:
+            return facility_id, await fetch()
+        data, shared = await self.coalescer.fetch(facility_id, fetch)
+        if shared:
+            self.metrics.coalesced += 1
+            if self.budget is not None:
+                self.budget.refund()
+        return facility_id, data
+
+    async def iter_carpark_data(
+        self, facility_ids: Iterable[str]
+    ) -> AsyncIterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """Fetch several car parks concurrently, yielding each as it completes."""
+        tasks = [
+            asyncio.ensure_future(self._get_carpark_data_limited(facility_id))
+            for facility_id in dict.fromkeys(facility_ids)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
     async def test_connection(self) -> bool:
         """Test the API connection."""
         try:
@@ -2,7 +2,8 @@
 from __future__ import annotations
 
 import logging
-from typing import Any, Dict, Optional
+import os
+from typing import Any, Dict, Mapping, Optional
 
 import voluptuous as vol
 
@@ -11,8 +12,26 @@ from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.helpers import selector
 
+from .aggregate import format_groups, parse_groups
 from .api import TfNSWCarParkAPI
-from .const import CONF_API_KEY, CONF_SELECTED_CARPARKS, DOMAIN
+from .const import (
+    CONF_API_KEY,
+    CONF_COMPACT_MODE,
+    CONF_DAILY_REQUEST_BUDGET,
+    CONF_GROUP_BY_SUBURB,
+    CONF_GROUPS,
+    CONF_NEAREST_ENTITY,
+    CONF_NEAREST_MIN_AVAILABLE,
+    CONF_SELECTED_CARPARKS,
+    CONF_SNAPSHOT_FILE,
+    DEFAULT_DAILY_REQUEST_BUDGET,
+    DEFAULT_NEAREST_ENTITY,
+    DEFAULT_NEAREST_MIN_AVAILABLE,
+    DOMAIN,
+    MIN_DAILY_REQUEST_BUDGET,
+)
+from .directory import async_get_directory
+from .session import async_get_shared_session
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -37,20 +56,21 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             api_key = user_input[CONF_API_KEY].strip()
             
             # Test the API key
-            api = TfNSWCarParkAPI(api_key)
+            api = TfNSWCarParkAPI(
+                api_key, session=async_get_shared_session(self.hass).session
+            )
             try:
                 if await api.test_connection():
                     self._api_key = api_key
                     # Get car park list for next step
-                    self._carpark_list = await api.get_carpark_list()
-                    await api.close()
+                    directory = await async_get_directory(self.hass)
+                    await directory.async_refresh(api)
+                    self._carpark_list = directory.names
                     return await self.async_step_carpark_selection()
                 else:
                     errors["base"] = "auth"
             except Exception:
                 errors["base"] = "cannot_connect"
-            finally:
-                await api.close()
 
         return self.async_show_form(
             step_id="user",
@@ -133,30 +153,49 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
 
         if user_input is not None:
             selected_carparks = user_input.get(CONF_SELECTED_CARPARKS, [])
+            snapshot_file = user_input.get(CONF_SNAPSHOT_FILE, "").strip()
+            try:
+                groups = parse_groups(user_input.get(CONF_GROUPS, ""))
+            except ValueError:
+                groups = None
             
             if not selected_carparks:
                 errors["base"] = "no_carparks_selected"
+            elif snapshot_file and not os.path.isabs(snapshot_file):
+                errors[CONF_SNAPSHOT_FILE] = "invalid_snapshot_file"
+            elif groups is None or any(
+                carpark_id not in selected_carparks
+                for carpark_ids in groups.values()
+                for carpark_id in carpark_ids
+            ):
+                errors[CONF_GROUPS] = "invalid_groups"
             else:
                 # Update the config entry
                 self.hass.config_entries.async_update_entry(
                     self.config_entry,
                     data={
                         **self.config_entry.data,
+                        **user_input,
                         CONF_SELECTED_CARPARKS: selected_carparks,
+                        CONF_SNAPSHOT_FILE: snapshot_file,
+                        CONF_GROUPS: groups,
                     },
                 )
                 return self.async_create_entry(title="", data={})
 
-        # Get fresh car park list
-        api_key = self.config_entry.data[CONF_API_KEY]
-        api = TfNSWCarParkAPI(api_key)
-        
-        try:
-            self._carpark_list = await api.get_carpark_list()
-        except Exception:
-            errors["base"] = "cannot_connect"
-        finally:
-            await api.close()
+        # Use the cached car park list, refreshing it when stale
+        directory = await async_get_directory(self.hass)
+        if directory.is_stale or not directory.facilities:
+            api_key = self.config_entry.data[CONF_API_KEY]
+            api = TfNSWCarParkAPI(
+                api_key, session=async_get_shared_session(self.hass).session
+            )
+            try:
+                await directory.async_refresh(api)
+            except Exception:
+                if not directory.facilities:
+                    errors["base"] = "cannot_connect"
+        self._carpark_list = directory.names
 
         if errors:
             return self.async_show_form(
@@ -164,17 +203,14 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                 errors=errors,
             )
 
-        # Get currently selected car parks
-        current_selection = self.config_entry.data.get(CONF_SELECTED_CARPARKS, [])
-
         return self.async_show_form(
             step_id="init",
-            data_schema=self._get_options_schema(current_selection),
+            data_schema=self._get_options_schema(self.config_entry.data),
             errors=errors,
         )
 
-    def _get_options_schema(self, current_selection: list) -> vol.Schema:
-        """Get schema for options."""
+    def _get_options_schema(self, current: Mapping[str, Any]) -> vol.Schema:
+        """Get schema for options, defaulting to the current settings."""
         # Create options list with car park names, values are IDs
         options = [
             selector.SelectOptionDict(value=carpark_id, label=name)
@@ -184,7 +220,7 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         return vol.Schema({
             vol.Required(
                 CONF_SELECTED_CARPARKS,
-                default=current_selection
+                default=current.get(CONF_SELECTED_CARPARKS, [])
             ): selector.SelectSelector(
                 selector.SelectSelectorConfig(
                     options=options,
@@ -192,4 +228,40 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                     mode=selector.SelectSelectorMode.DROPDOWN,
                 )
             ),
+            vol.Required(
+                CONF_DAILY_REQUEST_BUDGET,
+                default=current.get(
+                    CONF_DAILY_REQUEST_BUDGET, DEFAULT_DAILY_REQUEST_BUDGET
+                ),
+            ): vol.All(vol.Coerce(int), vol.Range(min=MIN_DAILY_REQUEST_BUDGET)),
+            vol.Required(
+                CONF_COMPACT_MODE,
+                default=current.get(CONF_COMPACT_MODE, False),
+            ): bool,
+            vol.Required(
+                CONF_NEAREST_ENTITY,
+                default=current.get(CONF_NEAREST_ENTITY, DEFAULT_NEAREST_ENTITY),
+            ): selector.EntitySelector(
+                selector.EntitySelectorConfig(
+                    domain=["person", "zone", "device_tracker"]
+                )
+            ),
+            vol.Required(
+                CONF_NEAREST_MIN_AVAILABLE,
+                default=current.get(
+                    CONF_NEAREST_MIN_AVAILABLE, DEFAULT_NEAREST_MIN_AVAILABLE
+                ),
+            ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+            vol.Optional(
+                CONF_SNAPSHOT_FILE,
+                default=current.get(CONF_SNAPSHOT_FILE, ""),
+            ): str,
+            vol.Required(
+                CONF_GROUP_BY_SUBURB,
+                default=current.get(CONF_GROUP_BY_SUBURB, False),
+            ): bool,
+            vol.Optional(
+                CONF_GROUPS,
+                default=format_groups(current.get(CONF_GROUPS, {})),
+            ): selector.TextSelector(selector.TextSelectorConfig(multiline=True)),
         })
@@ -5,3 +5,92 @@ API_BASE_URL = "https://api.transport.nsw.gov.au/v1/carpark"
 
 CONF_API_KEY = "api_key"
 CONF_SELECTED_CARPARKS = "selected_carparks"
+
+# Concurrency and rate budget for facility refreshes
+MAX_CONCURRENT_REQUESTS = 8
+REQUESTS_PER_SECOND = 5
+
+# Pooled HTTP session shared by every config entry and config flow
+DATA_SESSION = "session"
+KEEPALIVE_TIMEOUT = 75
+DNS_CACHE_TTL = 300
+
+# Persistent facility directory
+DATA_DIRECTORY = "directory"
+DIRECTORY_TTL_HOURS = 24
+
+# Adaptive polling, all intervals in seconds
+CONF_DAILY_REQUEST_BUDGET = "daily_request_budget"
+DEFAULT_DAILY_REQUEST_BUDGET = 50000
+MIN_DAILY_REQUEST_BUDGET = 100
+SCHEDULER_TICK = 60
+DEFAULT_POLL_INTERVAL = 300
+MIN_POLL_INTERVAL = 60
+MAX_POLL_INTERVAL = 1800
+BACKOFF_FACTOR = 1.5
+
+# Fetch everything in one request once this many car parks are selected
+BULK_REFRESH_THRESHOLD = 20
+
+# Occupancy history
+DATA_HISTORY = "history"
+SERVICE_GET_HISTORY = "get_history"
+
+# Occupancy forecasting, durations in seconds
+FORECAST_HORIZON = 4 * 3600
+FORECAST_STEP = 15 * 60
+FORECAST_DEVIATION_DECAY = 3600
+FORECAST_PROFILE_REBUILD = 3600
+FULL_OCCUPANCY_RATIO = 0.98
+
+# Request retries and circuit breaker, durations in seconds
+REQUEST_TIMEOUT = 10
+REQUEST_DEADLINE = 20
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF_BASE = 0.5
+RETRY_BACKOFF_MAX = 8
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT = 60
+
+# One primary sensor per car park, derived sensors disabled by default
+CONF_COMPACT_MODE = "compact_mode"
+
+# Nearest available car park
+DATA_LOCATOR = "locator"
+SERVICE_FIND_NEAREST = "find_nearest"
+CONF_NEAREST_ENTITY = "nearest_entity"
+CONF_NEAREST_MIN_AVAILABLE = "nearest_min_available"
+DEFAULT_NEAREST_ENTITY = "zone.home"
+DEFAULT_NEAREST_MIN_AVAILABLE = 1
+DEFAULT_NEAREST_COUNT = 3
+GRID_CELL_DEGREES = 0.05
+
+# Request and refresh metrics
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+SLOWEST_FACILITIES = 5
+
+# Longest the event loop may be blocked by one step of a refresh, parsing
+# batches estimated to take longer moves to an executor
+LOOP_BLOCK_BUDGET_MS = 10
+
+# Facility fetches shared between config entries, durations in seconds
+COALESCE_TTL = 30
+# Rejected API keys leave the shared rotation for this long
+AUTH_FAILURE_STATUSES = frozenset({401, 403})
+KEY_COOLDOWN = 900
+
+# Snapshot file written by the standalone collector, ages in seconds
+CONF_SNAPSHOT_FILE = "snapshot_file"
+SNAPSHOT_FILE_MAX_AGE = 600
+
+# Availability threshold events
+DATA_THRESHOLDS = "thresholds"
+EVENT_THRESHOLD = f"{DOMAIN}_threshold"
+SERVICE_SET_THRESHOLD = "set_threshold"
+SERVICE_REMOVE_THRESHOLD = "remove_threshold"
+DEFAULT_THRESHOLD_HYSTERESIS = 5
+
+# Aggregate sensors for groups of car parks
+CONF_GROUPS = "groups"
+CONF_GROUP_BY_SUBURB = "group_by_suburb"
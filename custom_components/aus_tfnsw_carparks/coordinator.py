@@ -0,0 +1,499 @@
+"""Data update coordinator for the TfNSW Car Park integration."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util, slugify
+
+from .aggregate import GroupTotals
+from .api import CircuitOpenError, ConnectionStats, TfNSWCarParkAPI
+from .const import (
+    BULK_REFRESH_THRESHOLD,
+    CONF_DAILY_REQUEST_BUDGET,
+    CONF_GROUP_BY_SUBURB,
+    CONF_GROUPS,
+    CONF_SELECTED_CARPARKS,
+    CONF_SNAPSHOT_FILE,
+    DEFAULT_DAILY_REQUEST_BUDGET,
+    DOMAIN,
+    LOOP_BLOCK_BUDGET_MS,
+    SCHEDULER_TICK,
+)
+from .directory import FacilityDirectory
+from .forecast import CarParkForecast, ForecastEngine
+from .history import OccupancyHistory
+from .models import CarParkSnapshot, build_snapshots
+from .scheduler import PollScheduler
+from .snapshot_file import SnapshotFileReader
+from .thresholds import ThresholdMonitor
+
+_LOGGER = logging.getLogger(__name__)
+
+LOOP_BLOCK_BUDGET = LOOP_BLOCK_BUDGET_MS / 1000
+# Applying a large batch yields to the loop after this long, leaving room
+# for the work before and after it within the budget
+APPLY_SLICE = LOOP_BLOCK_BUDGET / 2
+# Starting estimate of the time to parse one payload, refined as we go
+INITIAL_PARSE_COST = 0.0002
+
+FetchBatch = List[Tuple[str, Optional[Dict[str, Any]]]]
+
+STORAGE_KEY = f"{DOMAIN}.snapshots"
+STORAGE_VERSION = 1
+SAVE_DELAY = 60
+
+
+def snapshot_store(hass: HomeAssistant, entry_id: str) -> Store[Dict[str, Any]]:
+    """Return the store holding a config entry's last known payloads."""
+    return Store(hass, STORAGE_VERSION, f"{STORAGE_KEY}.{entry_id}")
+
+
+class TfNSWFacilityCoordinator(DataUpdateCoordinator[CarParkSnapshot]):
+    """Latest snapshot and forecast of a single car park.
+
+    It never polls; the entry's refresh coordinator pushes each snapshot as
+    soon as it arrives, so a car park's entities only wake for their own
+    changes and its failures do not affect any other car park.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, carpark_id: str, directory: FacilityDirectory
+    ) -> None:
+        """Initialize the coordinator."""
+        super().__init__(hass, _LOGGER, name=f"{DOMAIN} {carpark_id}")
+        self.carpark_id = carpark_id
+        self.directory = directory
+        self.forecast: Optional[CarParkForecast] = None
+
+    async def _async_update_data(self) -> CarParkSnapshot:
+        """Return the latest pushed snapshot."""
+        if self.data is None:
+            raise UpdateFailed(f"No data received for carpark {self.carpark_id}")
+        return self.data
+
+    @callback
+    def async_set_forecast(self, forecast: Optional[CarParkForecast]) -> None:
+        """Store a new forecast and notify listeners if it changed."""
+        old = self.forecast
+        self.forecast = forecast
+        if (old and old.fingerprint) != (forecast and forecast.fingerprint):
+            self.async_update_listeners()
+
+
+class TfNSWGroupCoordinator(DataUpdateCoordinator[GroupTotals]):
+    """Running totals of a group of car parks.
+
+    Like the car park coordinators it never polls; the entry's refresh
+    coordinator updates the totals as member snapshots arrive and pushes
+    them once per refresh if they moved.
+    """
+
+    def __init__(self, hass: HomeAssistant, group_id: str, name: str) -> None:
+        """Initialize the coordinator."""
+        super().__init__(hass, _LOGGER, name=f"{DOMAIN} group {group_id}")
+        self.totals = GroupTotals(group_id, name)
+
+    async def _async_update_data(self) -> GroupTotals:
+        """Return the latest pushed totals."""
+        if self.data is None:
+            raise UpdateFailed(f"No data received for group {self.totals.name}")
+        return self.data
+
+
+class TfNSWCarParkCoordinator(DataUpdateCoordinator[Dict[str, CarParkSnapshot]]):
+    """Poll the selected car parks on an adaptive schedule.
+
+    The coordinator ticks frequently, but each tick only fetches the
+    facilities the scheduler reports as due; the others keep their last
+    snapshot. Large selections are fetched with a single bulk request when
+    the API supports it. A car park whose fetch fails keeps its last good
+    snapshot, flagged stale, and is retried on a short interval.
+
+    Parsing a batch that would block the event loop for longer than the
+    loop budget, and forecasting, run in an executor; the loop only
+    applies the finished snapshots, yielding between slices of a large
+    batch.
+
+    Every snapshot that changes is pushed to that car park's own
+    coordinator as it arrives, while this coordinator's data collects the
+    whole selection for the locator and entity discovery. Group totals
+    are moved by the same snapshots and pushed once the refresh is done.
+
+    The latest payload of each car park is saved, so after a restart
+    entities can start from stale snapshots while the first refresh runs.
+    Whether the API serves bulk requests is saved with them.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        api: TfNSWCarParkAPI,
+        directory: FacilityDirectory,
+        history: OccupancyHistory,
+        thresholds: ThresholdMonitor,
+        connection_stats: ConnectionStats,
+    ) -> None:
+        """Initialize the coordinator."""
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=DOMAIN,
+            update_interval=timedelta(seconds=SCHEDULER_TICK),
+            always_update=False,
+        )
+        self.api = api
+        self.directory = directory
+        self.history = history
+        self.thresholds = thresholds
+        self.connection_stats = connection_stats
+        self.metrics = api.metrics
+        self.selected_carparks: List[str] = entry.data.get(CONF_SELECTED_CARPARKS, [])
+        self._store = snapshot_store(hass, entry.entry_id)
+        self._payloads: Dict[str, Dict[str, Any]] = {}
+        self._bulk_supported: Optional[bool] = None
+        # Read a collector's snapshot file instead of polling, if configured
+        self.file_source: Optional[SnapshotFileReader] = None
+        if snapshot_file := entry.data.get(CONF_SNAPSHOT_FILE):
+            self.file_source = SnapshotFileReader(snapshot_file)
+        self._parse_cost = INITIAL_PARSE_COST
+        self.forecast_engine = ForecastEngine()
+        self.forecasts: Dict[str, CarParkForecast] = {}
+        self.facilities: Dict[str, TfNSWFacilityCoordinator] = {
+            carpark_id: TfNSWFacilityCoordinator(hass, carpark_id, directory)
+            for carpark_id in self.selected_carparks
+        }
+        self.scheduler = PollScheduler(
+            self.selected_carparks,
+            entry.data.get(CONF_DAILY_REQUEST_BUDGET, DEFAULT_DAILY_REQUEST_BUDGET),
+            budget=api.budget,
+            api_key=api.api_key,
+        )
+        entry.async_on_unload(self.scheduler.close)
+        self.groups: Dict[str, TfNSWGroupCoordinator] = {}
+        self._carpark_groups: Dict[str, List[TfNSWGroupCoordinator]] = {}
+        self._dirty_groups: Set[TfNSWGroupCoordinator] = set()
+        for name, carpark_ids in entry.data.get(CONF_GROUPS, {}).items():
+            group = self._async_get_group(f"custom_{slugify(name)}", name)
+            for carpark_id in carpark_ids:
+                if carpark_id in self.facilities:
+                    self._async_join_group(group, carpark_id)
+        # Suburbs come from the directory and may only be known once a
+        # car park's first payload arrives, so membership can move later
+        self.group_by_suburb: bool = entry.data.get(CONF_GROUP_BY_SUBURB, False)
+        self._suburbs: Dict[str, Optional[str]] = {}
+        if self.group_by_suburb:
+            for carpark_id in self.selected_carparks:
+                self._async_update_suburb(carpark_id)
+
+    async def async_restore(self) -> bool:
+        """Serve the last saved snapshots, flagged stale, until a refresh lands.
+
+        Returns True if any selected car park could be restored.
+        """
+        if not (stored := await self._store.async_load()):
+            return False
+        # The list endpoint either serves payloads or it does not, so the
+        # bulk probe is not repeated after every restart
+        self._bulk_supported = stored.get("bulk_supported")
+        self._payloads = {
+            carpark_id: payload
+            for carpark_id, payload in stored.get("payloads", {}).items()
+            if carpark_id in self.facilities
+        }
+        if not self._payloads:
+            return False
+        results = await self.hass.async_add_executor_job(
+            build_snapshots, list(self._payloads.items()), {}
+        )
+        snapshots = {}
+        for carpark_id, _, snapshot in results:
+            snapshots[carpark_id] = snapshot.as_stale()
+            self._push(carpark_id, snapshots[carpark_id])
+        await self._async_flush_groups()
+        self.async_set_updated_data(snapshots)
+        _LOGGER.debug(
+            "Restored %d of %d carparks from storage",
+            len(snapshots),
+            len(self.selected_carparks),
+        )
+        return True
+
+    @callback
+    def _data_to_save(self) -> Dict[str, Any]:
+        """Return the data to persist."""
+        return {"payloads": self._payloads, "bulk_supported": self._bulk_supported}
+
+    @property
+    def use_bulk(self) -> bool:
+        """Return True if refreshes should fetch every car park at once."""
+        return (
+            self._bulk_supported is not False
+            and len(self.selected_carparks) > BULK_REFRESH_THRESHOLD
+        )
+
+    async def _async_fetch(self, now: datetime) -> AsyncIterator[FetchBatch]:
+        """Yield batches of payloads for the car parks due now."""
+        if self.file_source is not None:
+            batch = await self.hass.async_add_executor_job(
+                self.file_source.read, self.selected_carparks
+            )
+            if batch:
+                yield batch
+            return
+
+        if self.use_bulk:
+            if not self.scheduler.bulk_due(now):
+                return
+            _LOGGER.debug(
+                "Fetching bulk data for %d carparks", len(self.selected_carparks)
+            )
+            try:
+                bulk = await self.api.get_all_carpark_data()
+            except Exception as err:
+                if isinstance(err, CircuitOpenError):
+                    self.metrics.circuit_rejections += 1
+                else:
+                    _LOGGER.warning("Bulk refresh failed: %s", err)
+                # Fail each car park on its own so they go stale and retry
+                yield [(carpark_id, None) for carpark_id in self.selected_carparks]
+                return
+            if bulk is not None:
+                self._bulk_supported = True
+                yield [
+                    (carpark_id, bulk.get(carpark_id))
+                    for carpark_id in self.selected_carparks
+                ]
+                return
+            _LOGGER.debug("Bulk data not available, fetching carparks individually")
+            self._bulk_supported = False
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+        due = self.scheduler.due(now)
+        if not due:
+            return
+        _LOGGER.debug("Fetching data for %d carparks", len(due))
+        async for carpark_id, carpark_data in self.api.iter_carpark_data(due):
+            yield [(carpark_id, carpark_data)]
+
+    async def _async_update_data(self) -> Dict[str, CarParkSnapshot]:
+        """Fetch the car parks that are due."""
+        started = time.monotonic()
+        previous = self.data or {}
+        now = dt_util.now()
+        timestamp = now.timestamp()
+        snapshots = dict(previous)
+        requested = received = reused = 0
+        # Longest stretch the refresh held the event loop without yielding
+        loop_block = 0.0
+
+        try:
+            async for batch in self._async_fetch(now):
+                resumed = time.perf_counter()
+                requested += len(batch)
+                payloads = []
+                for carpark_id, carpark_data in batch:
+                    if carpark_data:
+                        payloads.append((carpark_id, carpark_data))
+                        continue
+                    if not self.api.circuit_breaker.is_open:
+                        _LOGGER.warning("No data received for carpark %s", carpark_id)
+                    self.scheduler.record_failure(carpark_id, now)
+                    # Keep serving the last good snapshot until a retry lands
+                    if (snapshot := snapshots.get(carpark_id)) is not None:
+                        if (stale := snapshot.as_stale()) is not snapshot:
+                            snapshots[carpark_id] = stale
+                            self._push(carpark_id, stale)
+                    elif facility := self.facilities.get(carpark_id):
+                        facility.async_set_update_error(
+                            UpdateFailed(f"No data received for carpark {carpark_id}")
+                        )
+                if not payloads:
+                    loop_block = max(loop_block, time.perf_counter() - resumed)
+                    continue
+
+                # Reuse the previous snapshot when the facility has not moved
+                fingerprints = {
+                    carpark_id: snapshot.fingerprint
+                    for carpark_id, _ in payloads
+                    if (snapshot := previous.get(carpark_id)) is not None
+                }
+                if len(payloads) * self._parse_cost > LOOP_BLOCK_BUDGET:
+                    loop_block = max(loop_block, time.perf_counter() - resumed)
+                    results = await self.hass.async_add_executor_job(
+                        build_snapshots, payloads, fingerprints
+                    )
+                    resumed = time.perf_counter()
+                else:
+                    parse_started = time.perf_counter()
+                    results = build_snapshots(payloads, fingerprints)
+                    self._parse_cost += 0.2 * (
+                        (time.perf_counter() - parse_started) / len(payloads)
+                        - self._parse_cost
+                    )
+
+                received += len(results)
+                for (carpark_id, fingerprint, snapshot), (_, carpark_data) in zip(
+                    results, payloads
+                ):
+                    if time.perf_counter() - resumed > APPLY_SLICE:
+                        loop_block = max(loop_block, time.perf_counter() - resumed)
+                        await asyncio.sleep(0)
+                        resumed = time.perf_counter()
+                    if snapshot is None:
+                        reused += 1
+                        snapshot = previous[carpark_id]
+                    else:
+                        self.directory.async_update_metadata(carpark_id, carpark_data)
+                        self._payloads[carpark_id] = carpark_data
+                        snapshots[carpark_id] = snapshot
+                        self._push(carpark_id, snapshot)
+                    self.history.async_record(timestamp, snapshot)
+                    self.scheduler.record(
+                        carpark_id,
+                        now,
+                        fingerprint,
+                        snapshot.message_date,
+                        snapshot.occupied,
+                    )
+                loop_block = max(loop_block, time.perf_counter() - resumed)
+        except Exception as err:
+            _LOGGER.error("Error communicating with API: %s", err)
+            raise UpdateFailed(f"Error communicating with API: {err}") from err
+        finally:
+            loop_block = max(loop_block, await self._async_flush_groups())
+
+        if not requested:
+            return previous
+
+        self.directory.async_schedule_refresh(self.api)
+        if received > reused:
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+        loop_block = max(loop_block, await self._async_update_forecasts(snapshots, now))
+        duration = time.monotonic() - started
+        self.metrics.record_refresh(duration, reused, received - reused, loop_block)
+        if loop_block > LOOP_BLOCK_BUDGET:
+            _LOGGER.debug(
+                "Refresh blocked the event loop for %.1fms, budget is %dms",
+                loop_block * 1000,
+                LOOP_BLOCK_BUDGET_MS,
+            )
+        _LOGGER.debug(
+            "Received data for %d of %d carparks in %.2fs, %d unchanged, "
+            "connection reuse rate %.0f%%",
+            received,
+            requested,
+            duration,
+            reused,
+            self.connection_stats.reuse_rate * 100,
+        )
+        return snapshots
+
+    @callback
+    def _push(self, carpark_id: str, snapshot: CarParkSnapshot) -> None:
+        """Hand a changed snapshot to its car park's coordinator right away."""
+        if (facility := self.facilities.get(carpark_id)) is not None:
+            facility.async_set_updated_data(snapshot)
+            self.thresholds.async_evaluate(snapshot)
+        if self.group_by_suburb:
+            self._async_update_suburb(carpark_id)
+        for group in self._carpark_groups.get(carpark_id, ()):
+            if group.totals.update(carpark_id, snapshot):
+                self._dirty_groups.add(group)
+
+    @callback
+    def _async_get_group(self, group_id: str, name: str) -> TfNSWGroupCoordinator:
+        """Return a group's coordinator, creating it if needed."""
+        if (group := self.groups.get(group_id)) is None:
+            group = self.groups[group_id] = TfNSWGroupCoordinator(
+                self.hass, group_id, name
+            )
+        return group
+
+    @callback
+    def _async_join_group(self, group: TfNSWGroupCoordinator, carpark_id: str) -> None:
+        """Add a car park to a group."""
+        group.totals.add_member(carpark_id)
+        self._carpark_groups.setdefault(carpark_id, []).append(group)
+        if (snapshot := (self.data or {}).get(carpark_id)) is not None:
+            if group.totals.update(carpark_id, snapshot):
+                self._dirty_groups.add(group)
+
+    @callback
+    def _async_update_suburb(self, carpark_id: str) -> None:
+        """Move a car park to its suburb's group if its suburb changed."""
+        suburb = self.directory.metadata(carpark_id).suburb
+        if carpark_id in self._suburbs and self._suburbs[carpark_id] == suburb:
+            return
+        if (old := self._suburbs.get(carpark_id)) is not None:
+            group = self.groups[f"suburb_{slugify(old)}"]
+            self._carpark_groups[carpark_id].remove(group)
+            if group.totals.remove_member(carpark_id):
+                self._dirty_groups.add(group)
+        self._suburbs[carpark_id] = suburb
+        if suburb:
+            self._async_join_group(
+                self._async_get_group(f"suburb_{slugify(suburb)}", suburb), carpark_id
+            )
+
+    async def _async_flush_groups(self) -> float:
+        """Push the totals of every group that moved since the last flush.
+
+        Yields between slices of the pushes, as each one writes the state
+        of the group's entities. Returns the longest time spent on the
+        event loop.
+        """
+        loop_block = 0.0
+        resumed = time.perf_counter()
+        while self._dirty_groups:
+            if time.perf_counter() - resumed > APPLY_SLICE:
+                loop_block = max(loop_block, time.perf_counter() - resumed)
+                await asyncio.sleep(0)
+                resumed = time.perf_counter()
+            group = self._dirty_groups.pop()
+            group.async_set_updated_data(group.totals)
+        return max(loop_block, time.perf_counter() - resumed)
+
+    async def _async_update_forecasts(
+        self, snapshots: Dict[str, CarParkSnapshot], now: datetime
+    ) -> float:
+        """Forecast every selected car park from its history.
+
+        The NumPy work runs in an executor, and handing out the forecasts
+        yields between slices, as each one may write a sensor's state.
+        Returns the longest time spent on the event loop.
+        """
+        timestamp = now.timestamp()
+        utc_offset = now.utcoffset().total_seconds()
+        engine = self.forecast_engine
+        loop_block = 0.0
+        if engine.profiles_stale(self.selected_carparks, timestamp):
+            started = time.perf_counter()
+            columns = engine.collect_history(self.history, self.selected_carparks)
+            loop_block = time.perf_counter() - started
+            await self.hass.async_add_executor_job(
+                engine.build_profiles,
+                columns,
+                self.selected_carparks,
+                timestamp,
+                utc_offset,
+            )
+        self.forecasts = await self.hass.async_add_executor_job(
+            engine.forecast, snapshots, timestamp, utc_offset
+        )
+        resumed = time.perf_counter()
+        for carpark_id, facility in self.facilities.items():
+            if time.perf_counter() - resumed > APPLY_SLICE:
+                loop_block = max(loop_block, time.perf_counter() - resumed)
+                await asyncio.sleep(0)
+                resumed = time.perf_counter()
+            facility.async_set_forecast(self.forecasts.get(carpark_id))
+        return max(loop_block, time.perf_counter() - resumed)
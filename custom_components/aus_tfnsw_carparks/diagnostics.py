@@ -0,0 +1,52 @@
+"""Diagnostics support for the TfNSW Car Park integration."""
+from __future__ import annotations
+
+from typing import Any, Dict
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_API_KEY, DOMAIN
+
+TO_REDACT = {CONF_API_KEY}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> Dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    api = coordinator.api
+    connection_stats = coordinator.connection_stats
+    return {
+        "entry": async_redact_data(dict(entry.data), TO_REDACT),
+        "selected_carparks": len(coordinator.selected_carparks),
+        "carparks_with_data": len(coordinator.data or {}),
+        "stale_carparks": sorted(
+            carpark_id
+            for carpark_id, snapshot in (coordinator.data or {}).items()
+            if snapshot.stale
+        ),
+        "use_bulk": coordinator.use_bulk,
+        "last_update_success": coordinator.last_update_success,
+        "circuit_open": api.circuit_breaker.is_open,
+        "connections": {
+            "created": connection_stats.created,
+            "reused": connection_stats.reused,
+            "reuse_rate": round(connection_stats.reuse_rate, 3),
+        },
+        "directory": {
+            "facilities": len(coordinator.directory.facilities),
+            "fetched_at": coordinator.directory.fetched_at,
+        },
+        "groups": {
+            group_id: {
+                "carparks": group.totals.members,
+                "reporting": group.totals.reporting,
+                "stale": group.totals.stale,
+            }
+            for group_id, group in coordinator.groups.items()
+        },
+        "metrics": api.metrics.as_dict(),
+    }
@@ -0,0 +1,175 @@
+"""Persistent facility directory for the TfNSW Car Park integration."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .api import TfNSWCarParkAPI
+from .const import DATA_DIRECTORY, DIRECTORY_TTL_HOURS, DOMAIN
+from .models import FacilityMetadata
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_KEY = f"{DOMAIN}.directory"
+STORAGE_VERSION = 1
+SAVE_DELAY = 30
+
+DIRECTORY_TTL = timedelta(hours=DIRECTORY_TTL_HOURS)
+
+
+def _static_metadata(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Extract the fields of a facility payload that rarely change."""
+    location = data.get("location") or {}
+    metadata = {
+        "name": data.get("facility_name"),
+        "facility_id": data.get("facility_id"),
+        "tfnsw_facility_id": data.get("tfnsw_facility_id"),
+        "park_id": data.get("ParkID"),
+        "suburb": location.get("suburb"),
+        "address": location.get("address"),
+        "latitude": location.get("latitude"),
+        "longitude": location.get("longitude"),
+        "capacity": data.get("spots"),
+    }
+    return {k: v for k, v in metadata.items() if v is not None}
+
+
+class FacilityDirectory:
+    """Car park ids, names and static metadata, cached on disk."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the directory."""
+        self.hass = hass
+        self._store: Store[Dict[str, Any]] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._load_lock = asyncio.Lock()
+        self._loaded = False
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.facilities: Dict[str, Dict[str, Any]] = {}
+        self._metadata_cache: Dict[str, FacilityMetadata] = {}
+        # Bumped whenever facility metadata changes, so caches can check it
+        self.version = 0
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.fetched_at: Optional[float] = None
+
+    async def async_load(self) -> None:
+        """Load the directory from storage once."""
+        async with self._load_lock:
+            if self._loaded:
+                return
+            if stored := await self._store.async_load():
+                self.facilities = stored.get("facilities", {})
+                self.etag = stored.get("etag")
+                self.last_modified = stored.get("last_modified")
+                self.fetched_at = stored.get("fetched_at")
+            self._loaded = True
+            _LOGGER.debug("Loaded %d facilities from storage", len(self.facilities))
+
+    @property
+    def names(self) -> Dict[str, str]:
+        """Return a mapping of facility id to name."""
+        return {
+            facility_id: metadata.get("name", facility_id)
+            for facility_id, metadata in self.facilities.items()
+        }
+
+    @property
+    def is_stale(self) -> bool:
+        """Return True if the list is due for a refresh."""
+        if self.fetched_at is None:
+            return True
+        age = dt_util.utcnow().timestamp() - self.fetched_at
+        return age > DIRECTORY_TTL.total_seconds()
+
+    def name(self, facility_id: str) -> Optional[str]:
+        """Return the name of a facility, if known."""
+        return self.facilities.get(facility_id, {}).get("name")
+
+    def metadata(self, facility_id: str) -> FacilityMetadata:
+        """Return the static metadata of a facility, built once and shared."""
+        if (metadata := self._metadata_cache.get(facility_id)) is None:
+            metadata = self._metadata_cache[facility_id] = (
+                FacilityMetadata.from_directory(
+                    facility_id, self.facilities.get(facility_id, {})
+                )
+            )
+        return metadata
+
+    async def async_refresh(self, api: TfNSWCarParkAPI) -> None:
+        """Refresh the facility list, using conditional requests when possible."""
+        carpark_list, self.etag, self.last_modified = (
+            await api.get_carpark_list_if_modified(self.etag, self.last_modified)
+        )
+        self.fetched_at = dt_util.utcnow().timestamp()
+        if carpark_list:
+            self.async_set_names(carpark_list)
+        else:
+            self._async_schedule_save()
+
+    @callback
+    def async_set_names(self, carpark_list: Dict[str, str]) -> None:
+        """Replace the facility list, keeping metadata of known facilities."""
+        self.facilities = {
+            facility_id: {**self.facilities.get(facility_id, {}), "name": name}
+            for facility_id, name in carpark_list.items()
+        }
+        self._metadata_cache.clear()
+        self.version += 1
+        self._async_schedule_save()
+
+    @callback
+    def async_schedule_refresh(self, api: TfNSWCarParkAPI) -> None:
+        """Refresh the facility list in the background if it is stale."""
+        if not self.is_stale or (self._refresh_task and not self._refresh_task.done()):
+            return
+        self._refresh_task = self.hass.async_create_background_task(
+            self._async_background_refresh(api), f"{DOMAIN} directory refresh"
+        )
+
+    async def _async_background_refresh(self, api: TfNSWCarParkAPI) -> None:
+        """Refresh the facility list, keeping the cached copy on failure."""
+        try:
+            await self.async_refresh(api)
+        except Exception as err:
+            _LOGGER.warning("Keeping cached car park list, refresh failed: %s", err)
+
+    @callback
+    def async_update_metadata(self, facility_id: str, data: Dict[str, Any]) -> None:
+        """Record static metadata seen in a facility payload."""
+        current = self.facilities.get(facility_id, {})
+        updated = {**current, **_static_metadata(data)}
+        if updated != current:
+            self.facilities[facility_id] = updated
+            self._metadata_cache.pop(facility_id, None)
+            self.version += 1
+            self._async_schedule_save()
+
+    @callback
+    def _async_schedule_save(self) -> None:
+        """Save the directory after a short delay."""
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> Dict[str, Any]:
+        """Return the data to persist."""
+        return {
+            "facilities": self.facilities,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "fetched_at": self.fetched_at,
+        }
+
+
+async def async_get_directory(hass: HomeAssistant) -> FacilityDirectory:
+    """Return the loaded facility directory, creating it if needed."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (directory := domain_data.get(DATA_DIRECTORY)) is None:
+        directory = domain_data[DATA_DIRECTORY] = FacilityDirectory(hass)
+    await directory.async_load()
+    return directory
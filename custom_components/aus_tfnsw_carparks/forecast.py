@@ -0,0 +1,185 @@
+"""Occupancy forecasting for the TfNSW Car Park integration."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .const import (
+    FORECAST_DEVIATION_DECAY,
+    FORECAST_HORIZON,
+    FORECAST_PROFILE_REBUILD,
+    FORECAST_STEP,
+    FULL_OCCUPANCY_RATIO,
+)
+from .history import OccupancyHistory
+from .models import CarParkSnapshot
+
+HOURS_PER_WEEK = 168
+# 1970-01-01 was a Thursday, shift so week hour 0 is Monday midnight
+EPOCH_WEEK_HOUR_OFFSET = 3 * 24
+
+# Bucket start, total and count columns of an hourly rollup
+HourlyColumns = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def _week_hours(timestamps: np.ndarray, utc_offset: float) -> np.ndarray:
+    """Convert timestamps to fractional local hours since Monday midnight."""
+    return ((timestamps + utc_offset) / 3600 + EPOCH_WEEK_HOUR_OFFSET) % HOURS_PER_WEEK
+
+
+@dataclass(frozen=True, slots=True)
+class CarParkForecast:
+    """Predicted occupancy of a car park over the next few hours."""
+
+    times: Tuple[float, ...]
+    occupied: Tuple[int, ...]
+    capacity: int
+    predict_full_time: Optional[float]
+    fingerprint: int
+
+
+class ForecastEngine:
+    """Forecast occupancy of every tracked car park in one batch.
+
+    Each car park has a day-of-week and hour-of-day profile built from its
+    hourly history. A forecast follows the profile from now on, offset by
+    the car park's current deviation from it, which decays over time.
+    Both steps work on copies of the data, so they can run in an executor.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the engine with no profiles."""
+        self._facility_ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._profiles = np.empty((0, HOURS_PER_WEEK))
+        self._profiles_built: Optional[float] = None
+        offsets = np.arange(FORECAST_STEP, FORECAST_HORIZON + 1, FORECAST_STEP)
+        self._offsets = offsets.astype(np.float64)
+
+    def profiles_stale(self, facility_ids: Sequence[str], timestamp: float) -> bool:
+        """Return True if the profiles should be rebuilt from history."""
+        return (
+            self._profiles_built is None
+            or timestamp - self._profiles_built > FORECAST_PROFILE_REBUILD
+            or list(facility_ids) != self._facility_ids
+        )
+
+    @staticmethod
+    def collect_history(
+        history: OccupancyHistory, facility_ids: Sequence[str]
+    ) -> List[Optional[HourlyColumns]]:
+        """Copy each car park's hourly rollup out of the history.
+
+        Runs on the event loop, so the rollups are not appended to while
+        being read; the copies can then be handed to build_profiles in an
+        executor.
+        """
+        columns: List[Optional[HourlyColumns]] = []
+        for facility_id in facility_ids:
+            series = history.series.get((facility_id, None))
+            if series is None or not (rollup := series.rollups["hour"]).start:
+                columns.append(None)
+                continue
+            # Copy out of the arrays so they stay resizable while we work
+            columns.append((
+                np.array(rollup.start, dtype=np.float64),
+                np.array(rollup.total, dtype=np.float64),
+                np.array(rollup.count, dtype=np.float64),
+            ))
+        return columns
+
+    def build_profiles(
+        self,
+        columns: Sequence[Optional[HourlyColumns]],
+        facility_ids: Sequence[str],
+        timestamp: float,
+        utc_offset: float,
+    ) -> None:
+        """Average each car park's hourly history by hour of the week."""
+        profiles = np.full((len(facility_ids), HOURS_PER_WEEK), np.nan)
+        for row, facility_columns in enumerate(columns):
+            if facility_columns is None:
+                continue
+            start, total, count = facility_columns
+            mean = total / count
+            slots = _week_hours(start, utc_offset).astype(np.intp)
+            counts = np.bincount(slots, minlength=HOURS_PER_WEEK)
+            sums = np.bincount(slots, weights=mean, minlength=HOURS_PER_WEEK)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                profiles[row] = sums / counts
+        self._facility_ids = list(facility_ids)
+        self._rows = {facility_id: row for row, facility_id in enumerate(facility_ids)}
+        self._profiles = profiles
+        self._profiles_built = timestamp
+
+    def forecast(
+        self,
+        snapshots: Dict[str, CarParkSnapshot],
+        timestamp: float,
+        utc_offset: float,
+    ) -> Dict[str, CarParkForecast]:
+        """Forecast every car park with a current occupancy and capacity."""
+        facility_ids = [
+            facility_id
+            for facility_id in self._facility_ids
+            if (snapshot := snapshots.get(facility_id)) is not None
+            and snapshot.occupied is not None
+            and snapshot.total_capacity
+        ]
+        if not facility_ids:
+            return {}
+
+        rows = np.fromiter(
+            (self._rows[facility_id] for facility_id in facility_ids),
+            dtype=np.intp,
+            count=len(facility_ids),
+        )
+        current = np.array(
+            [snapshots[facility_id].occupied for facility_id in facility_ids],
+            dtype=np.float64,
+        )
+        capacity = np.array(
+            [snapshots[facility_id].total_capacity for facility_id in facility_ids],
+            dtype=np.float64,
+        )
+
+        # Steps sit on FORECAST_STEP boundaries, so their times only move
+        # when a boundary passes rather than on every refresh
+        steps = timestamp - timestamp % FORECAST_STEP + self._offsets
+        decay = np.exp(-(steps - timestamp) / FORECAST_DEVIATION_DECAY)
+
+        # Interpolate each profile at now and at every forecast step
+        hours = _week_hours(np.concatenate(([timestamp], steps)), utc_offset)
+        lower = np.floor(hours).astype(np.intp) % HOURS_PER_WEEK
+        upper = (lower + 1) % HOURS_PER_WEEK
+        fraction = hours - np.floor(hours)
+        profiles = self._profiles[rows]
+        expected = profiles[:, lower] * (1 - fraction) + profiles[:, upper] * fraction
+
+        deviation = current - expected[:, 0]
+        predicted = expected[:, 1:] + deviation[:, None] * decay
+        # Without a profile, assume occupancy stays where it is
+        predicted = np.where(np.isnan(predicted), current[:, None], predicted)
+        predicted = np.clip(np.rint(predicted), 0, capacity[:, None])
+
+        full = predicted >= capacity[:, None] * FULL_OCCUPANCY_RATIO
+        becomes_full = full.any(axis=1)
+        first_full = full.argmax(axis=1)
+
+        times = tuple(steps.tolist())
+        forecasts = {}
+        for index, facility_id in enumerate(facility_ids):
+            occupied = tuple(int(value) for value in predicted[index])
+            full_time = (
+                times[first_full[index]] if becomes_full[index] else None
+            )
+            forecasts[facility_id] = CarParkForecast(
+                times=times,
+                occupied=occupied,
+                capacity=int(capacity[index]),
+                predict_full_time=full_time,
+                fingerprint=hash((times[0], occupied, full_time)),
+            )
+        return forecasts
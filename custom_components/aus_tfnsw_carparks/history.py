@@ -0,0 +1,288 @@
+"""Local occupancy history for the TfNSW Car Park integration."""
+from __future__ import annotations
+
+import asyncio
+import base64
+import logging
+from array import array
+from bisect import bisect_left, bisect_right
+from functools import partial
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DATA_HISTORY, DOMAIN
+from .models import CarParkSnapshot
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_KEY = f"{DOMAIN}.history"
+STORAGE_VERSION = 1
+SAVE_DELAY = 300
+
+# Rollup resolutions as (name, bucket seconds, buckets kept)
+RESOLUTIONS: Tuple[Tuple[str, int, int], ...] = (
+    ("5min", 300, 7 * 288),
+    ("hour", 3600, 90 * 24),
+    ("day", 86400, 2 * 365),
+)
+
+# Stored columns of a rollup with their array typecodes. Samples are whole
+# spot counts and bucket starts whole seconds, so 32-bit integers suffice
+COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("start", "I"),
+    ("total", "i"),
+    ("count", "I"),
+    ("low", "i"),
+    ("high", "i"),
+)
+
+SeriesKey = Tuple[str, Optional[str]]
+
+
+def _encode(values: array) -> str:
+    """Encode an array for JSON storage."""
+    return base64.b64encode(values.tobytes()).decode("ascii")
+
+
+def _decode(typecode: str, data: str) -> array:
+    """Decode an array from JSON storage."""
+    values = array(typecode)
+    values.frombytes(base64.b64decode(data))
+    return values
+
+
+class Rollup:
+    """Fixed-width buckets of occupancy held in parallel arrays."""
+
+    __slots__ = ("bucket", "retention", "start", "total", "count", "low", "high")
+
+    def __init__(self, bucket: int, retention: int) -> None:
+        """Initialize an empty rollup."""
+        self.bucket = bucket
+        self.retention = retention
+        self.start = array("I")
+        self.total = array("i")
+        self.count = array("I")
+        self.low = array("i")
+        self.high = array("i")
+
+    def add(self, timestamp: float, value: int) -> None:
+        """Fold a sample into its bucket."""
+        bucket_start = int(timestamp) - int(timestamp) % self.bucket
+        if self.start and self.start[-1] == bucket_start:
+            self.total[-1] += value
+            self.count[-1] += 1
+            self.low[-1] = min(self.low[-1], value)
+            self.high[-1] = max(self.high[-1], value)
+            return
+        if self.start and bucket_start < self.start[-1]:
+            # Out of order samples would break the sorted bucket index
+            return
+        self.start.append(bucket_start)
+        self.total.append(value)
+        self.count.append(1)
+        self.low.append(value)
+        self.high.append(value)
+        # Trim in batches so the arrays are not shifted on every append
+        if len(self.start) > self.retention * 1.1:
+            excess = len(self.start) - self.retention
+            for column in (self.start, self.total, self.count, self.low, self.high):
+                del column[:excess]
+
+    def covers(self, timestamp: float) -> bool:
+        """Return True if this rollup holds or would retain data from the time.
+
+        A young rollup covers times before its first sample that its
+        retention reaches back to, so short histories keep their detail.
+        """
+        if not self.start:
+            return False
+        return (
+            self.start[0] <= timestamp
+            or self.start[-1] - self.bucket * self.retention < timestamp
+        )
+
+    def query(self, start: float, end: float) -> List[Dict[str, Any]]:
+        """Return the buckets that start within a time range."""
+        first = bisect_left(self.start, start - start % self.bucket)
+        last = bisect_right(self.start, end)
+        return [
+            {
+                "time": self.start[i],
+                "mean": round(self.total[i] / self.count[i], 1),
+                "min": self.low[i],
+                "max": self.high[i],
+            }
+            for i in range(first, last)
+        ]
+
+    def as_dict(self) -> Dict[str, str]:
+        """Return the rollup in a form suitable for storage."""
+        return {name: _encode(getattr(self, name)) for name, _ in COLUMNS}
+
+    def load(self, data: Dict[str, str]) -> None:
+        """Restore the rollup from storage."""
+        for name, typecode in COLUMNS:
+            setattr(self, name, _decode(typecode, data[name]))
+
+
+class OccupancySeries:
+    """Occupancy of one car park or zone at every rollup resolution."""
+
+    __slots__ = ("rollups",)
+
+    def __init__(self) -> None:
+        """Initialize an empty series."""
+        self.rollups = {
+            name: Rollup(bucket, retention) for name, bucket, retention in RESOLUTIONS
+        }
+
+    def add(self, timestamp: float, value: int) -> None:
+        """Record an occupancy sample."""
+        for rollup in self.rollups.values():
+            rollup.add(timestamp, value)
+
+    def resolution_for(self, start: float) -> str:
+        """Return the finest resolution that still covers the start time."""
+        for name, _, _ in RESOLUTIONS:
+            if self.rollups[name].covers(start):
+                return name
+        # Past every retention, use the finest rollup that has data
+        for name, _, _ in RESOLUTIONS:
+            if self.rollups[name].start:
+                return name
+        return RESOLUTIONS[-1][0]
+
+
+class OccupancyHistory:
+    """Per car park and per zone occupancy history, persisted to storage.
+
+    Each car park's series are kept in a store of their own, loaded when a
+    config entry selects the car park and saved at most once per save
+    delay, so a save only encodes the car parks that recorded samples.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the history."""
+        self.hass = hass
+        self._load_lock = asyncio.Lock()
+        self._loaded: Set[str] = set()
+        self._stores: Dict[str, Store[Dict[str, Any]]] = {}
+        self._pending_saves: Set[str] = set()
+        self.series: Dict[SeriesKey, OccupancySeries] = {}
+        # Zones with a series, by car park, to find a car park's series
+        self._zones: Dict[str, List[Optional[str]]] = {}
+
+    def _store(self, carpark_id: str) -> Store[Dict[str, Any]]:
+        """Return the store holding a car park's history."""
+        if (store := self._stores.get(carpark_id)) is None:
+            store = self._stores[carpark_id] = Store(
+                self.hass, STORAGE_VERSION, f"{STORAGE_KEY}.{carpark_id}"
+            )
+        return store
+
+    async def async_load(self, carpark_ids: Iterable[str]) -> None:
+        """Load the history of car parks that are not loaded yet."""
+        async with self._load_lock:
+            carpark_ids = [
+                carpark_id
+                for carpark_id in dict.fromkeys(carpark_ids)
+                if carpark_id not in self._loaded
+            ]
+            if not carpark_ids:
+                return
+            results = await asyncio.gather(
+                *(self._store(carpark_id).async_load() for carpark_id in carpark_ids)
+            )
+            for carpark_id, stored in zip(carpark_ids, results):
+                for item in (stored or {}).get("series", []):
+                    series = OccupancySeries()
+                    for name, rollup in item["rollups"].items():
+                        if name in series.rollups:
+                            series.rollups[name].load(rollup)
+                    self._set_series((carpark_id, item.get("zone_id")), series)
+            self._loaded.update(carpark_ids)
+            _LOGGER.debug("Loaded history of %d carparks", len(carpark_ids))
+
+    @callback
+    def async_record(self, timestamp: float, snapshot: CarParkSnapshot) -> None:
+        """Record the occupancy of a car park and its zones."""
+        self._add((snapshot.carpark_id, None), timestamp, snapshot.occupied)
+        for zone in snapshot.zones:
+            self._add((snapshot.carpark_id, zone.zone_id), timestamp, zone.occupied)
+        self._async_schedule_save(snapshot.carpark_id)
+
+    def _add(self, key: SeriesKey, timestamp: float, value: Optional[int]) -> None:
+        """Add a sample to a series, creating it if needed."""
+        if value is None or value < 0:
+            return
+        if (series := self.series.get(key)) is None:
+            series = self._set_series(key, OccupancySeries())
+        series.add(timestamp, value)
+
+    def _set_series(self, key: SeriesKey, series: OccupancySeries) -> OccupancySeries:
+        """Add a series to the history."""
+        if key not in self.series:
+            self._zones.setdefault(key[0], []).append(key[1])
+        self.series[key] = series
+        return series
+
+    def query(
+        self,
+        carpark_id: str,
+        zone_id: Optional[str],
+        start: float,
+        end: float,
+        resolution: Optional[str] = None,
+    ) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+        """Return the resolution used and the buckets within a time range."""
+        if (series := self.series.get((carpark_id, zone_id))) is None:
+            return None, []
+        resolution = resolution or series.resolution_for(start)
+        return resolution, series.rollups[resolution].query(start, end)
+
+    @callback
+    def _async_schedule_save(self, carpark_id: str) -> None:
+        """Save a car park's history once the save delay has passed.
+
+        A delayed save restarts its timer whenever it is requested again,
+        and samples arrive every tick, so it is only requested when none is
+        pending; otherwise the history would only be written at shutdown.
+        """
+        if carpark_id in self._pending_saves:
+            return
+        self._pending_saves.add(carpark_id)
+        self._store(carpark_id).async_delay_save(
+            partial(self._data_to_save, carpark_id), SAVE_DELAY
+        )
+
+    @callback
+    def _data_to_save(self, carpark_id: str) -> Dict[str, Any]:
+        """Return a car park's data to persist."""
+        self._pending_saves.discard(carpark_id)
+        return {
+            "series": [
+                {
+                    "zone_id": zone_id,
+                    "rollups": {
+                        name: rollup.as_dict()
+                        for name, rollup in series.rollups.items()
+                    },
+                }
+                for zone_id in self._zones.get(carpark_id, [])
+                if (series := self.series.get((carpark_id, zone_id))) is not None
+            ]
+        }
+
+
+async def async_get_history(
+    hass: HomeAssistant, carpark_ids: Iterable[str] = ()
+) -> OccupancyHistory:
+    """Return the occupancy history with the given car parks loaded."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (history := domain_data.get(DATA_HISTORY)) is None:
+        history = domain_data[DATA_HISTORY] = OccupancyHistory(hass)
+    await history.async_load(carpark_ids)
+    return history
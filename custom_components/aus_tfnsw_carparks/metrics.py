@@ -0,0 +1,197 @@
+"""Request and refresh metrics for the TfNSW Car Park integration."""
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+
+from .const import LATENCY_BUCKETS_MS, SLOWEST_FACILITIES
+
+BUCKET_LABELS = [f"le_{bound}ms" for bound in LATENCY_BUCKETS_MS] + ["overflow"]
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram of durations in milliseconds."""
+
+    __slots__ = ("counts", "count", "total", "maximum")
+
+    def __init__(self) -> None:
+        """Initialize an empty histogram."""
+        # One bucket per bound plus an overflow bucket
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def add(self, milliseconds: float) -> None:
+        """Record a duration."""
+        self.counts[bisect_left(LATENCY_BUCKETS_MS, milliseconds)] += 1
+        self.count += 1
+        self.total += milliseconds
+        if milliseconds > self.maximum:
+            self.maximum = milliseconds
+
+    @property
+    def mean(self) -> Optional[float]:
+        """Return the mean duration."""
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Return the upper bound of the bucket holding the q-th quantile."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(float(bound), self.maximum)
+        return self.maximum
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the histogram for diagnostics."""
+        mean = self.mean
+        return {
+            "count": self.count,
+            "mean_ms": round(mean, 1) if mean is not None else None,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "max_ms": round(self.maximum, 1),
+            "buckets": dict(zip(BUCKET_LABELS, self.counts)),
+        }
+
+
+class FacilityMetrics:
+    """Request metrics of a single facility."""
+
+    __slots__ = ("latency", "failures", "payload_bytes", "last_payload_bytes")
+
+    def __init__(self) -> None:
+        """Initialize the counters."""
+        self.latency = LatencyHistogram()
+        self.failures = 0
+        self.payload_bytes = 0
+        self.last_payload_bytes = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the metrics for diagnostics."""
+        return {
+            "latency": self.latency.as_dict(),
+            "failures": self.failures,
+            "payload_bytes": self.payload_bytes,
+            "last_payload_bytes": self.last_payload_bytes,
+        }
+
+
+class RefreshMetrics:
+    """Counters for API requests and coordinator refreshes.
+
+    Recording only touches a few integers and one histogram bucket, so it
+    is cheap enough to stay on in the refresh loop. Anything derived, such
+    as quantiles or the slowest facilities, is computed when read.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the counters."""
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.not_modified = 0
+        self.circuit_rejections = 0
+        self.coalesced = 0
+        self.payload_bytes = 0
+        self.parse_seconds = 0.0
+        self.latency = LatencyHistogram()
+        self.facilities: Dict[str, FacilityMetrics] = {}
+        self.refreshes = 0
+        self.refresh_duration = LatencyHistogram()
+        self.last_refresh_ms: Optional[float] = None
+        self.loop_block = LatencyHistogram()
+        self.last_loop_block_ms: Optional[float] = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _facility(self, facility_id: str) -> FacilityMetrics:
+        """Return the metrics of a facility, creating them if needed."""
+        if (metrics := self.facilities.get(facility_id)) is None:
+            metrics = self.facilities[facility_id] = FacilityMetrics()
+        return metrics
+
+    def record_response(
+        self, facility_id: Optional[str], size: int, parse_seconds: float
+    ) -> None:
+        """Record a response body and the time taken to decode it."""
+        self.payload_bytes += size
+        self.parse_seconds += parse_seconds
+        if facility_id is not None:
+            metrics = self._facility(facility_id)
+            metrics.payload_bytes += size
+            metrics.last_payload_bytes = size
+
+    def record_latency(self, facility_id: str, seconds: float, ok: bool) -> None:
+        """Record the end-to-end time of a facility request, retries included."""
+        milliseconds = seconds * 1000
+        self.latency.add(milliseconds)
+        metrics = self._facility(facility_id)
+        metrics.latency.add(milliseconds)
+        if not ok:
+            metrics.failures += 1
+
+    def record_refresh(
+        self,
+        seconds: float,
+        cache_hits: int,
+        cache_misses: int,
+        loop_block_seconds: float,
+    ) -> None:
+        """Record a coordinator refresh that requested data."""
+        self.refreshes += 1
+        self.last_refresh_ms = seconds * 1000
+        self.refresh_duration.add(self.last_refresh_ms)
+        self.last_loop_block_ms = loop_block_seconds * 1000
+        self.loop_block.add(self.last_loop_block_ms)
+        self.cache_hits += cache_hits
+        self.cache_misses += cache_misses
+
+    @property
+    def cache_hit_rate(self) -> Optional[float]:
+        """Return the share of payloads whose snapshot could be reused."""
+        total = self.cache_hits + self.cache_misses
+        return self.cache_hits / total if total else None
+
+    def slowest(self, count: int = SLOWEST_FACILITIES) -> List[Tuple[str, float]]:
+        """Return the facilities with the highest mean latency, slowest first."""
+        means = [
+            (metrics.latency.mean, facility_id)
+            for facility_id, metrics in self.facilities.items()
+            if metrics.latency.count
+        ]
+        means.sort(reverse=True)
+        return [(facility_id, round(mean, 1)) for mean, facility_id in means[:count]]
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return every metric for diagnostics."""
+        hit_rate = self.cache_hit_rate
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "not_modified": self.not_modified,
+            "circuit_rejections": self.circuit_rejections,
+            "coalesced": self.coalesced,
+            "payload_bytes": self.payload_bytes,
+            "parse_ms": round(self.parse_seconds * 1000, 1),
+            "latency": self.latency.as_dict(),
+            "refreshes": self.refreshes,
+            "last_refresh_ms": self.last_refresh_ms,
+            "refresh_duration": self.refresh_duration.as_dict(),
+            "last_loop_block_ms": self.last_loop_block_ms,
+            "loop_block": self.loop_block.as_dict(),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_rate": round(hit_rate, 3) if hit_rate is not None else None,
+            "slowest": dict(self.slowest()),
+            "facilities": {
+                facility_id: metrics.as_dict()
+                for facility_id, metrics in self.facilities.items()
+            },
+        }
@@ -0,0 +1,264 @@
+"""Data models for the TfNSW Car Park integration."""
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+# Attributes that describe the facility rather than its current occupancy
+STATIC_ATTRIBUTES = frozenset({
+    "carpark_id",
+    "facility_name",
+    "facility_id",
+    "tfnsw_facility_id",
+    "park_id",
+    "suburb",
+    "address",
+    "latitude",
+    "longitude",
+})
+
+
+def _to_int(value: Any) -> Optional[int]:
+    """Convert an API value to int, returning None if it is not numeric."""
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def payload_fingerprint(data: Dict[str, Any]) -> int:
+    """Return a cheap fingerprint of the parts of a payload that change."""
+    occupancy = data.get("occupancy") or {}
+    return hash((
+        data.get("MessageDate"),
+        data.get("spots"),
+        occupancy.get("total"),
+        tuple(
+            (
+                zone.get("zone_id"),
+                zone.get("spots"),
+                (zone.get("occupancy") or {}).get("total"),
+            )
+            for zone in data.get("zones") or []
+        ),
+    ))
+
+
+@dataclass(frozen=True, slots=True)
+class FacilityMetadata:
+    """Static description of a car park, shared by all of its entities."""
+
+    carpark_id: str
+    name: Optional[str]
+    suburb: Optional[str]
+    address: Optional[str]
+    latitude: Any
+    longitude: Any
+    attributes: Mapping[str, Any]
+
+    @classmethod
+    def from_directory(
+        cls, carpark_id: str, metadata: Mapping[str, Any]
+    ) -> FacilityMetadata:
+        """Build facility metadata from a directory entry."""
+        attributes = {
+            "carpark_id": carpark_id,
+            "facility_name": metadata.get("name"),
+            "facility_id": metadata.get("facility_id"),
+            "tfnsw_facility_id": metadata.get("tfnsw_facility_id"),
+            "park_id": metadata.get("park_id"),
+            "suburb": metadata.get("suburb"),
+            "address": metadata.get("address"),
+            "latitude": metadata.get("latitude"),
+            "longitude": metadata.get("longitude"),
+        }
+        return cls(
+            carpark_id=carpark_id,
+            name=metadata.get("name"),
+            suburb=metadata.get("suburb"),
+            address=metadata.get("address"),
+            latitude=metadata.get("latitude"),
+            longitude=metadata.get("longitude"),
+            attributes=MappingProxyType(
+                {k: v for k, v in attributes.items() if v is not None}
+            ),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class ZoneSnapshot:
+    """Occupancy of a single zone within a car park."""
+
+    zone_id: str
+    zone_name: Optional[str]
+    spots: Any
+    total_capacity: Optional[int]
+    occupied: Optional[int]
+    transients: Any
+
+    @property
+    def available(self) -> Optional[int]:
+        """Return available spots in the zone."""
+        if self.total_capacity is None or self.occupied is None:
+            return None
+        return self.total_capacity - self.occupied
+
+    @classmethod
+    def from_payload(cls, data: Dict[str, Any]) -> ZoneSnapshot:
+        """Build a zone snapshot from its API payload."""
+        occupancy = data.get("occupancy") or {}
+        return cls(
+            zone_id=str(data.get("zone_id")),
+            zone_name=data.get("zone_name"),
+            spots=data.get("spots"),
+            total_capacity=_to_int(data.get("spots")),
+            occupied=_to_int(occupancy.get("total")),
+            transients=occupancy.get("transients"),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class CarParkSnapshot:
+    """Parsed occupancy of a car park at one refresh.
+
+    Built once per facility per refresh so entities only read fields. The
+    occupancy attributes belong on one entity per car park, alongside the
+    facility's static metadata; the others carry the small summary. The
+    fingerprint changes whenever the upstream data does, letting the
+    coordinator and entities skip work for unchanged facilities.
+    """
+
+    carpark_id: str
+    facility_name: Optional[str]
+    total_capacity: Optional[int]
+    occupied: Optional[int]
+    available: Optional[int]
+    occupancy_percentage: Optional[float]
+    message_date: Optional[str]
+    zones: Tuple[ZoneSnapshot, ...]
+    attributes: Dict[str, Any]
+    summary_attributes: Dict[str, Any]
+    fingerprint: int
+    stale: bool = False
+
+    def zone(self, zone_id: str) -> Optional[ZoneSnapshot]:
+        """Return a zone by id."""
+        for zone in self.zones:
+            if zone.zone_id == zone_id:
+                return zone
+        return None
+
+    def as_stale(self) -> CarParkSnapshot:
+        """Return a copy flagged as served from the last good refresh."""
+        if self.stale:
+            return self
+        return replace(
+            self,
+            attributes={**self.attributes, "stale": True},
+            summary_attributes={**self.summary_attributes, "stale": True},
+            fingerprint=hash((self.fingerprint, True)),
+            stale=True,
+        )
+
+    @classmethod
+    def from_payload(
+        cls,
+        carpark_id: str,
+        data: Dict[str, Any],
+        fingerprint: Optional[int] = None,
+    ) -> CarParkSnapshot:
+        """Build a snapshot from a facility payload."""
+        occupancy = data.get("occupancy") or {}
+        spots = data.get("spots")
+        occupied_spots = occupancy.get("total")
+        total_capacity = _to_int(spots)
+        occupied = _to_int(occupied_spots)
+
+        available = None
+        percentage = None
+        if total_capacity is not None and occupied is not None:
+            available = total_capacity - occupied
+            if total_capacity > 0:
+                percentage = round((occupied / total_capacity) * 100, 1)
+            else:
+                percentage = 0
+
+        zones = tuple(
+            ZoneSnapshot.from_payload(zone) for zone in data.get("zones") or []
+        )
+
+        # Static fields live in FacilityMetadata, only occupancy is kept here
+        attributes = {
+            "last_updated": data.get("MessageDate"),
+            "time": data.get("time"),
+            "tsn": data.get("tsn"),
+            # Keep unparseable values visible rather than dropping them
+            "total_capacity": spots if total_capacity is None else total_capacity,
+            "occupied_spots": occupied_spots if occupied is None else occupied,
+            "available_spots": available,
+            "occupancy_percentage": percentage,
+            "monthlies": occupancy.get("monthlies"),
+            "open_gate": occupancy.get("open_gate"),
+            "transients": occupancy.get("transients"),
+            "loop": occupancy.get("loop"),
+        }
+        zone_info = []
+        for zone in zones:
+            if zone.zone_name and zone.zone_name.strip():
+                zone_data = {
+                    "zone_id": zone.zone_id,
+                    "zone_name": zone.zone_name,
+                    "spots": zone.spots,
+                }
+                if zone.transients:
+                    zone_data["transients"] = zone.transients
+                zone_info.append(zone_data)
+        if zone_info:
+            attributes["zones"] = zone_info
+
+        return cls(
+            carpark_id=carpark_id,
+            facility_name=data.get("facility_name"),
+            total_capacity=total_capacity,
+            occupied=occupied,
+            available=available,
+            occupancy_percentage=percentage,
+            message_date=data.get("MessageDate"),
+            zones=zones,
+            attributes={k: v for k, v in attributes.items() if v is not None},
+            summary_attributes={
+                k: v
+                for k, v in (
+                    ("carpark_id", carpark_id),
+                    ("last_updated", data.get("MessageDate")),
+                )
+                if v is not None
+            },
+            fingerprint=(
+                payload_fingerprint(data) if fingerprint is None else fingerprint
+            ),
+        )
+
+
+def build_snapshots(
+    payloads: Sequence[Tuple[str, Dict[str, Any]]],
+    fingerprints: Mapping[str, int],
+) -> List[Tuple[str, int, Optional[CarParkSnapshot]]]:
+    """Fingerprint a batch of payloads and parse the ones that changed.
+
+    Returns (id, fingerprint, snapshot) per payload, with no snapshot when
+    the fingerprint matches the known one. Only reads its arguments, so it
+    is safe to run in an executor.
+    """
+    results = []
+    for carpark_id, data in payloads:
+        fingerprint = payload_fingerprint(data)
+        if fingerprints.get(carpark_id) == fingerprint:
+            results.append((carpark_id, fingerprint, None))
+        else:
+            snapshot = CarParkSnapshot.from_payload(carpark_id, data, fingerprint)
+            results.append((carpark_id, fingerprint, snapshot))
+    return results
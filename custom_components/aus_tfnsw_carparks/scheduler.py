@@ -0,0 +1,226 @@
+"""Adaptive polling scheduler for the TfNSW Car Park integration."""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .const import (
+    BACKOFF_FACTOR,
+    DEFAULT_POLL_INTERVAL,
+    MAX_POLL_INTERVAL,
+    MIN_POLL_INTERVAL,
+)
+
+# Weight of the newest observation in the learned averages
+SMOOTHING = 0.3
+# Limits on how far a volatile or quiet hour can scale the interval
+MIN_VOLATILITY_FACTOR = 0.5
+MAX_VOLATILITY_FACTOR = 2.0
+
+
+def _parse_message_date(message_date: Optional[str]) -> Optional[float]:
+    """Parse a MessageDate into seconds, or None if it is missing or invalid."""
+    if not message_date:
+        return None
+    try:
+        return datetime.fromisoformat(message_date).timestamp()
+    except ValueError:
+        return None
+
+
+class FacilitySchedule:
+    """Learned update behaviour of a single facility."""
+
+    __slots__ = (
+        "next_due",
+        "interval",
+        "cadence",
+        "message_time",
+        "fingerprint",
+        "occupied",
+        "volatility",
+    )
+
+    def __init__(self, interval: float) -> None:
+        """Initialize the schedule, due immediately."""
+        self.next_due = 0.0
+        self.interval = interval
+        self.cadence = interval
+        self.message_time: Optional[float] = None
+        self.fingerprint: Optional[int] = None
+        self.occupied: Optional[int] = None
+        # Average occupancy movement per upstream update, by hour of day
+        self.volatility = [0.0] * 24
+
+
+class RequestBudget:
+    """Daily budget of API requests, shared by every config entry.
+
+    Schedulers reserve tokens for the polls they hand out, and clients
+    charge every other request they send: retries, directory refreshes and
+    connection tests. A reserved poll that is never sent, because another
+    entry fetched it or the circuit is open, is refunded. Unreserved
+    requests may overdraw the budget, which then holds back later polls.
+
+    Quotas are per API key, so the daily rate is the sum over the keys in
+    use of the smallest budget configured for each.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty budget."""
+        self._users: Dict[object, Tuple[str, int, int]] = {}
+        self._rate = 0.0
+        self._burst = 0.0
+        self._tokens = 0.0
+        self._updated: Optional[float] = None
+
+    def register(
+        self, api_key: str, daily_budget: int, burst: int
+    ) -> Callable[[], None]:
+        """Add a user's budget and burst, returning a callback to remove them."""
+        user = object()
+        self._users[user] = (api_key, daily_budget, burst)
+        self._tokens += burst
+        self._update_limits()
+
+        def unregister() -> None:
+            if self._users.pop(user, None) is not None:
+                self._update_limits()
+
+        return unregister
+
+    def _update_limits(self) -> None:
+        """Recompute the rate and burst from the registered users."""
+        key_budgets: Dict[str, int] = {}
+        for api_key, daily_budget, _ in self._users.values():
+            key_budgets[api_key] = min(
+                daily_budget, key_budgets.get(api_key, daily_budget)
+            )
+        self._rate = sum(key_budgets.values()) / 86400
+        self._burst = float(sum(burst for _, _, burst in self._users.values()))
+        self._tokens = min(self._burst, self._tokens)
+
+    def _refill(self, timestamp: float) -> None:
+        """Add the request tokens accrued since the last reservation."""
+        if self._updated is not None:
+            self._tokens = min(
+                self._burst, self._tokens + (timestamp - self._updated) * self._rate
+            )
+        self._updated = timestamp
+
+    def reserve(self, count: int, timestamp: float) -> int:
+        """Reserve tokens for up to count polls, returning how many it got."""
+        self._refill(timestamp)
+        granted = max(0, min(count, int(self._tokens)))
+        self._tokens -= granted
+        return granted
+
+    def charge(self) -> None:
+        """Count a request sent without a reservation."""
+        self._tokens -= 1
+
+    def refund(self) -> None:
+        """Return the token of a reserved poll that was not sent."""
+        self._tokens = min(self._burst, self._tokens + 1)
+
+
+class PollScheduler:
+    """Decide which facilities to poll on each tick.
+
+    Each facility's upstream update cadence is learned from successive
+    MessageDate values, and its interval shrinks in hours where occupancy
+    tends to move and grows while the data stays static. Polls are only
+    handed out while the request budget has tokens for them.
+    """
+
+    def __init__(
+        self,
+        facility_ids: Iterable[str],
+        daily_budget: int,
+        default_interval: float = DEFAULT_POLL_INTERVAL,
+        min_interval: float = MIN_POLL_INTERVAL,
+        max_interval: float = MAX_POLL_INTERVAL,
+        budget: Optional[RequestBudget] = None,
+        api_key: str = "",
+    ) -> None:
+        """Initialize the scheduler."""
+        self._schedules: Dict[str, FacilitySchedule] = {
+            facility_id: FacilitySchedule(default_interval)
+            for facility_id in facility_ids
+        }
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self.budget = budget or RequestBudget()
+        # Allow a full sweep of every facility in one go, e.g. at startup,
+        # after a bulk request probing whether the API serves them at once
+        self._unregister = self.budget.register(
+            api_key, daily_budget, len(self._schedules) + 1
+        )
+
+    def close(self) -> None:
+        """Stop drawing on the request budget."""
+        self._unregister()
+
+    def due(self, now: datetime) -> List[str]:
+        """Return the facilities to poll now, most overdue first."""
+        timestamp = now.timestamp()
+        overdue = sorted(
+            (schedule.next_due, facility_id)
+            for facility_id, schedule in self._schedules.items()
+            if schedule.next_due <= timestamp
+        )
+        count = self.budget.reserve(len(overdue), timestamp)
+        return [facility_id for _, facility_id in overdue[:count]]
+
+    def bulk_due(self, now: datetime) -> bool:
+        """Return True if a single request covering every facility is due."""
+        timestamp = now.timestamp()
+        if not any(
+            schedule.next_due <= timestamp for schedule in self._schedules.values()
+        ):
+            return False
+        return self.budget.reserve(1, timestamp) == 1
+    def record(
+        self,
+        facility_id: str,
+        now: datetime,
+        fingerprint: int,
+        message_date: Optional[str],
+        occupied: Optional[int],
+    ) -> None:
+        """Learn from a successful poll and schedule the next one."""
+        schedule = self._schedules[facility_id]
+        if fingerprint != schedule.fingerprint:
+            message_time = _parse_message_date(message_date)
+            if (
+                message_time is not None
+                and schedule.message_time is not None
+                and message_time > schedule.message_time
+            ):
+                schedule.cadence += SMOOTHING * (
+                    message_time - schedule.message_time - schedule.cadence
+                )
+            if occupied is not None and schedule.occupied is not None:
+                volatility = schedule.volatility
+                volatility[now.hour] += SMOOTHING * (
+                    abs(occupied - schedule.occupied) - volatility[now.hour]
+                )
+            schedule.fingerprint = fingerprint
+            schedule.message_time = message_time
+            schedule.occupied = occupied
+            interval = schedule.cadence
+        else:
+            # Nothing moved since the last poll, back off
+            interval = schedule.interval * BACKOFF_FACTOR
+
+        mean_volatility = sum(schedule.volatility) / 24
+        if mean_volatility > 0:
+            factor = schedule.volatility[now.hour] / mean_volatility
+            interval /= min(max(factor, MIN_VOLATILITY_FACTOR), MAX_VOLATILITY_FACTOR)
+
+        schedule.interval = min(max(interval, self._min_interval), self._max_interval)
+        schedule.next_due = now.timestamp() + schedule.interval
+
+    def record_failure(self, facility_id: str, now: datetime) -> None:
+        """Retry a failed facility soon without learning from it."""
+        self._schedules[facility_id].next_due = now.timestamp() + self._min_interval
@@ -2,22 +2,53 @@
 from __future__ import annotations
 
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Any, Dict, Optional
 
 from homeassistant.components.sensor import (
+    SensorDeviceClass,
     SensorEntity,
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.const import (
+    ATTR_LATITUDE,
+    ATTR_LONGITUDE,
+    PERCENTAGE,
+    EntityCategory,
+    UnitOfInformation,
+    UnitOfTime,
+)
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_track_state_change_event
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util, slugify
 
-from .const import DOMAIN
+from .aggregate import GroupTotals
+from .const import (
+    CONF_COMPACT_MODE,
+    CONF_NEAREST_ENTITY,
+    CONF_NEAREST_MIN_AVAILABLE,
+    DATA_DIRECTORY,
+    DATA_LOCATOR,
+    DEFAULT_NEAREST_COUNT,
+    DEFAULT_NEAREST_ENTITY,
+    DEFAULT_NEAREST_MIN_AVAILABLE,
+    DOMAIN,
+    SCHEDULER_TICK,
+)
+from .forecast import CarParkForecast
+from .metrics import RefreshMetrics
+from .models import STATIC_ATTRIBUTES, CarParkSnapshot, ZoneSnapshot
+from .spatial import CarParkLocator
 
 _LOGGER = logging.getLogger(__name__)
 
+# Only the diagnostic metric sensors poll; everything else is pushed
+SCAN_INTERVAL = timedelta(seconds=SCHEDULER_TICK)
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -26,51 +57,157 @@ async def async_setup_entry(
 ) -> None:
     """Set up TfNSW Car Park sensors."""
     coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
-    api = hass.data[DOMAIN][config_entry.entry_id]["api"]
-    
-    # Get car park list to get names
-    try:
-        carpark_list = await api.get_carpark_list()
-    except Exception as err:
-        _LOGGER.error("Failed to get car park list for sensor setup: %s", err)
-        return
+    directory = hass.data[DOMAIN][DATA_DIRECTORY]
     
     entities = []
     selected_carparks = config_entry.data.get("selected_carparks", [])
+    compact = config_entry.data.get(CONF_COMPACT_MODE, False)
+    carpark_names = {}
     
     for carpark_id in selected_carparks:
-        if carpark_id in carpark_list:
-            carpark_name = carpark_list[carpark_id]
-            entities.extend([
-                TfNSWCarParkSensor(
-                    coordinator, carpark_id, carpark_name, "available_spots"
-                ),
-                TfNSWCarParkSensor(
-                    coordinator, carpark_id, carpark_name, "total_spots"
-                ),
-                TfNSWCarParkSensor(
-                    coordinator, carpark_id, carpark_name, "occupied_spots"
-                ),
-                TfNSWCarParkSensor(
-                    coordinator, carpark_id, carpark_name, "occupancy_percentage"
-                ),
-            ])
+        # Resolve names from the cached directory, falling back to live data
+        carpark_name = carpark_names[carpark_id] = (
+            directory.name(carpark_id)
+            or getattr((coordinator.data or {}).get(carpark_id), "facility_name", None)
+            or carpark_id
+        )
+        # Car park entities follow their own car park's coordinator
+        facility = coordinator.facilities[carpark_id]
+        entities.append(
+            TfNSWCarParkSensor(facility, carpark_id, carpark_name, "available_spots")
+        )
+        # In compact mode the primary sensor carries the core values as
+        # attributes and the derived sensors are left for users to enable
+        entities.extend([
+            TfNSWCarParkSensor(
+                facility,
+                carpark_id,
+                carpark_name,
+                sensor_type,
+                enabled_default=not compact,
+            )
+            for sensor_type in ("total_spots", "occupied_spots", "occupancy_percentage")
+        ])
+        entities.append(
+            TfNSWCarParkForecastSensor(
+                facility,
+                carpark_id,
+                carpark_name,
+                "predicted_full",
+                enabled_default=not compact,
+            )
+        )
+    
+    entities.append(
+        TfNSWNearestCarParkSensor(
+            coordinator,
+            hass.data[DOMAIN][DATA_LOCATOR],
+            config_entry.entry_id,
+            config_entry.data.get(CONF_NEAREST_ENTITY, DEFAULT_NEAREST_ENTITY),
+            config_entry.data.get(
+                CONF_NEAREST_MIN_AVAILABLE, DEFAULT_NEAREST_MIN_AVAILABLE
+            ),
+        )
+    )
+    
+    entities.extend(
+        TfNSWCarParkMetricSensor(coordinator.metrics, config_entry.entry_id, metric)
+        for metric in (
+            "refresh_duration",
+            "api_requests",
+            "request_latency",
+            "cache_hit_rate",
+            "payload_bytes",
+        )
+    )
     
     async_add_entities(entities)
 
+    # Zones are only known from the payload, so add their sensors as they appear
+    known_zones: set[tuple[str, str]] = set()
+
+    @callback
+    def async_add_zone_sensors() -> None:
+        """Add sensors for zones seen for the first time."""
+        new_entities = []
+        for carpark_id, snapshot in (coordinator.data or {}).items():
+            if carpark_id not in carpark_names:
+                continue
+            for zone in snapshot.zones:
+                if (carpark_id, zone.zone_id) in known_zones:
+                    continue
+                known_zones.add((carpark_id, zone.zone_id))
+                new_entities.extend(
+                    TfNSWCarParkZoneSensor(
+                        coordinator.facilities[carpark_id],
+                        carpark_id,
+                        carpark_names[carpark_id],
+                        zone.zone_id,
+                        zone.zone_name,
+                        sensor_type,
+                        enabled_default=not compact,
+                    )
+                    for sensor_type in ("available_spots", "occupied_spots")
+                )
+        if new_entities:
+            async_add_entities(new_entities)
+
+    async_add_zone_sensors()
+    config_entry.async_on_unload(coordinator.async_add_listener(async_add_zone_sensors))
+
+    # Suburb groups appear as the suburbs of car parks become known
+    known_groups: set[str] = set()
+
+    @callback
+    def async_add_group_sensors() -> None:
+        """Add sensors for groups seen for the first time."""
+        new_entities = []
+        for group_id, group in coordinator.groups.items():
+            if group_id in known_groups:
+                continue
+            known_groups.add(group_id)
+            new_entities.append(
+                TfNSWGroupSensor(group, config_entry.entry_id, "available_spots")
+            )
+            new_entities.extend(
+                TfNSWGroupSensor(
+                    group,
+                    config_entry.entry_id,
+                    sensor_type,
+                    enabled_default=not compact,
+                )
+                for sensor_type in (
+                    "total_spots",
+                    "occupied_spots",
+                    "occupancy_percentage",
+                )
+            )
+        if new_entities:
+            async_add_entities(new_entities)
+
+    async_add_group_sensors()
+    config_entry.async_on_unload(
+        coordinator.async_add_listener(async_add_group_sensors)
+    )
+
 
 class TfNSWCarParkSensor(CoordinatorEntity, SensorEntity):
     """Representation of a TfNSW Car Park sensor."""
 
+    # Static facility details are shown in the UI but not stored per state
+    _unrecorded_attributes = STATIC_ATTRIBUTES
+
     def __init__(
         self,
         coordinator,
         carpark_id: str,
         carpark_name: str,
         sensor_type: str,
+        enabled_default: bool = True,
     ) -> None:
         """Initialize the sensor."""
         super().__init__(coordinator)
+        self._attr_entity_registry_enabled_default = enabled_default
         self._carpark_id = carpark_id
         self._carpark_name = carpark_name
         self._sensor_type = sensor_type
@@ -98,160 +235,478 @@ class TfNSWCarParkSensor(CoordinatorEntity, SensorEntity):
             self._attr_name = f"{carpark_name} Occupancy"
             self._attr_icon = "mdi:percent"
             self._attr_native_unit_of_measurement = "%"
+        elif sensor_type == "predicted_full":
+            self._attr_name = f"{carpark_name} Predicted Full"
+            self._attr_icon = "mdi:car-clock"
+            self._attr_device_class = SensorDeviceClass.TIMESTAMP
         
-        self._attr_state_class = SensorStateClass.MEASUREMENT
+        if sensor_type != "predicted_full":
+            self._attr_state_class = SensorStateClass.MEASUREMENT
+        self._last_fingerprint: Optional[int] = None
+        self._last_available: Optional[bool] = None
+        self._attributes_source: Optional[tuple] = None
+        self._attributes: Dict[str, Any] = {}
+        
+        # Group every sensor of a car park under one device
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, carpark_id)},
+            name=carpark_name,
+            manufacturer="Transport for NSW",
+            model="Park&Ride car park",
+        )
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only when this car park's data or availability changed."""
+        fingerprint = self._fingerprint
+        available = self.available
+        if (
+            fingerprint is not None
+            and fingerprint == self._last_fingerprint
+            and available == self._last_available
+        ):
+            return
+        self._last_fingerprint = fingerprint
+        self._last_available = available
+        self.async_write_ha_state()
 
     @property
-    def native_value(self) -> Optional[int]:
+    def _fingerprint(self) -> Optional[int]:
+        """Return a value that changes whenever this sensor's data does."""
+        snapshot = self._snapshot
+        return snapshot.fingerprint if snapshot else None
+
+    @property
+    def _snapshot(self) -> Optional[CarParkSnapshot]:
+        """Return this car park's snapshot from the latest refresh."""
+        return self.coordinator.data
+
+    @property
+    def native_value(self) -> Optional[float]:
         """Return the state of the sensor."""
-        if not self.coordinator.data or self._carpark_id not in self.coordinator.data:
-            _LOGGER.debug("No data available for carpark %s", self._carpark_id)
+        if (snapshot := self._snapshot) is None:
             return None
         
-        data = self.coordinator.data[self._carpark_id]
-        
-        _LOGGER.debug("Processing %s for carpark %s", self._sensor_type, self._carpark_id)
-        
         if self._sensor_type == "available_spots":
-            # Available = Total capacity - Currently occupied
-            total_capacity = data.get("spots")  # Total capacity
-            occupied = data.get("occupancy", {}).get("total")  # Currently occupied
-            
-            _LOGGER.debug("Available spots calculation: capacity=%s, occupied=%s", total_capacity, occupied)
-            
-            if total_capacity is not None and occupied is not None:
-                try:
-                    capacity_int = int(total_capacity)
-                    occupied_int = int(occupied)
-                    available = capacity_int - occupied_int
-                    _LOGGER.debug("Calculated available spots: %d", available)
-                    return available
-                except (ValueError, TypeError) as e:
-                    _LOGGER.error("Error calculating available spots: %s", e)
-                    return None
-        
-        elif self._sensor_type == "total_spots":
-            # Total capacity from "spots" field
-            total_capacity = data.get("spots")
-            if total_capacity is not None:
-                try:
-                    return int(total_capacity)
-                except (ValueError, TypeError) as e:
-                    _LOGGER.error("Error parsing total spots: %s", e)
-                    return None
-        
-        elif self._sensor_type == "occupied_spots":
-            # Currently occupied spots from occupancy.total
-            occupied = data.get("occupancy", {}).get("total")
-            if occupied is not None:
-                try:
-                    return int(occupied)
-                except (ValueError, TypeError) as e:
-                    _LOGGER.error("Error parsing occupied spots: %s", e)
-                    return None
-        
-        elif self._sensor_type == "occupancy_percentage":
-            # Percentage occupied = (occupied / total_capacity) * 100
-            total_capacity = data.get("spots")
-            occupied = data.get("occupancy", {}).get("total")
-            
-            if total_capacity is not None and occupied is not None:
-                try:
-                    capacity_int = int(total_capacity)
-                    occupied_int = int(occupied)
-                    if capacity_int > 0:
-                        percentage = round((occupied_int / capacity_int) * 100, 1)
-                        return percentage
-                    return 0
-                except (ValueError, TypeError, ZeroDivisionError) as e:
-                    _LOGGER.error("Error calculating occupancy percentage: %s", e)
-                    return None
-        
+            return snapshot.available
+        if self._sensor_type == "total_spots":
+            return snapshot.total_capacity
+        if self._sensor_type == "occupied_spots":
+            return snapshot.occupied
+        if self._sensor_type == "occupancy_percentage":
+            return snapshot.occupancy_percentage
         return None
 
     @property
     def extra_state_attributes(self) -> Dict[str, Any]:
         """Return extra state attributes."""
-        if not self.coordinator.data or self._carpark_id not in self.coordinator.data:
+        if (snapshot := self._snapshot) is None:
             return {}
-        
-        data = self.coordinator.data[self._carpark_id]
-        location = data.get("location", {})
-        occupancy = data.get("occupancy", {})
-        
-        attributes = {
+        # Only one sensor per car park carries the full attribute set
+        if self._sensor_type != "available_spots":
+            return snapshot.summary_attributes
+        # Merge in the shared static metadata only when either side changed
+        metadata = self.coordinator.directory.metadata(self._carpark_id)
+        source = (snapshot.attributes, metadata)
+        if self._attributes_source is None or any(
+            new is not old for new, old in zip(source, self._attributes_source)
+        ):
+            self._attributes = {**metadata.attributes, **snapshot.attributes}
+            self._attributes_source = source
+        return self._attributes
+
+    @property
+    def available(self) -> bool:
+        """Return if entity is available."""
+        return super().available and self.coordinator.data is not None
+
+
+class TfNSWCarParkForecastSensor(TfNSWCarParkSensor):
+    """Predicted time a TfNSW car park fills up, with its forecast."""
+
+    _unrecorded_attributes = STATIC_ATTRIBUTES | {"forecast"}
+
+    @property
+    def _forecast(self) -> Optional[CarParkForecast]:
+        """Return this car park's latest forecast."""
+        return self.coordinator.forecast
+
+    @property
+    def _fingerprint(self) -> Optional[int]:
+        """Return a value that changes whenever the forecast does."""
+        forecast = self._forecast
+        return forecast.fingerprint if forecast else None
+
+    @property
+    def native_value(self) -> Optional[datetime]:
+        """Return when the car park is expected to be full."""
+        if (forecast := self._forecast) is None or forecast.predict_full_time is None:
+            return None
+        return dt_util.utc_from_timestamp(forecast.predict_full_time)
+
+    @property
+    def extra_state_attributes(self) -> Dict[str, Any]:
+        """Return the forecast occupancy over the next few hours."""
+        if (forecast := self._forecast) is None:
+            return {}
+        return {
             "carpark_id": self._carpark_id,
-            "facility_name": data.get("facility_name"),
-            "facility_id": data.get("facility_id"),
-            "tfnsw_facility_id": data.get("tfnsw_facility_id"),
-            "park_id": data.get("ParkID"),
-            "suburb": location.get("suburb"),
-            "address": location.get("address"),
-            "latitude": location.get("latitude"),
-            "longitude": location.get("longitude"),
-            "last_updated": data.get("MessageDate"),
-            "time": data.get("time"),
-            "tsn": data.get("tsn"),
+            "forecast": [
+                {
+                    "time": dt_util.utc_from_timestamp(time).isoformat(),
+                    "occupied": occupied,
+                    "available": forecast.capacity - occupied,
+                }
+                for time, occupied in zip(forecast.times, forecast.occupied)
+            ],
         }
+
+
+class TfNSWCarParkZoneSensor(TfNSWCarParkSensor):
+    """Representation of a zone within a TfNSW car park."""
+
+    def __init__(
+        self,
+        coordinator,
+        carpark_id: str,
+        carpark_name: str,
+        zone_id: str,
+        zone_name: Optional[str],
+        sensor_type: str,
+        enabled_default: bool = True,
+    ) -> None:
+        """Initialize the zone sensor."""
+        super().__init__(
+            coordinator, carpark_id, carpark_name, sensor_type, enabled_default
+        )
+        self._zone_id = zone_id
+        zone_label = (zone_name or "").strip() or f"Zone {zone_id}"
         
-        # Add capacity and occupancy details
-        total_capacity = data.get("spots")
-        occupied_spots = occupancy.get("total")
-        
-        if total_capacity is not None:
-            try:
-                attributes["total_capacity"] = int(total_capacity)
-            except (ValueError, TypeError):
-                attributes["total_capacity"] = total_capacity
-        
-        if occupied_spots is not None:
-            try:
-                attributes["occupied_spots"] = int(occupied_spots)
-            except (ValueError, TypeError):
-                attributes["occupied_spots"] = occupied_spots
-        
-        # Calculate available spots
-        if total_capacity is not None and occupied_spots is not None:
-            try:
-                capacity = int(total_capacity)
-                occupied = int(occupied_spots)
-                attributes["available_spots"] = capacity - occupied
-            except (ValueError, TypeError):
-                pass
-        
-        # Add other occupancy details
-        attributes.update({
-            "monthlies": occupancy.get("monthlies"),
-            "open_gate": occupancy.get("open_gate"),
-            "transients": occupancy.get("transients"),
-            "loop": occupancy.get("loop"),
-        })
-        
-        # Add zone information if available
-        zones = data.get("zones", [])
-        if zones:
-            zone_info = []
-            for zone in zones:
-                if zone.get("zone_name") and zone.get("zone_name").strip():
-                    zone_data = {
-                        "zone_id": zone.get("zone_id"),
-                        "zone_name": zone.get("zone_name"),
-                        "spots": zone.get("spots"),
-                    }
-                    zone_occupancy = zone.get("occupancy", {})
-                    if zone_occupancy.get("transients"):
-                        zone_data["transients"] = zone_occupancy.get("transients")
-                    zone_info.append(zone_data)
-            if zone_info:
-                attributes["zones"] = zone_info
-        
-        return {k: v for k, v in attributes.items() if v is not None}
+        self._attr_unique_id = f"{DOMAIN}_{carpark_id}_zone_{zone_id}_{sensor_type}"
+        self.entity_id = (
+            f"sensor.tfnsw_carpark_{carpark_id}_zone_{slugify(zone_id)}_{sensor_type}"
+        )
+        if sensor_type == "available_spots":
+            self._attr_name = f"{carpark_name} {zone_label} Available Spots"
+        else:
+            self._attr_name = f"{carpark_name} {zone_label} Occupied Spots"
+        self._attr_extra_state_attributes = {
+            "carpark_id": carpark_id,
+            "zone_id": zone_id,
+            "zone_name": zone_name,
+        }
+
+    @property
+    def _zone(self) -> Optional[ZoneSnapshot]:
+        """Return this zone's snapshot from the latest refresh."""
+        if (snapshot := self._snapshot) is None:
+            return None
+        return snapshot.zone(self._zone_id)
+
+    @property
+    def _fingerprint(self) -> Optional[int]:
+        """Return a value that changes whenever this zone's data does."""
+        if (zone := self._zone) is None:
+            return None
+        return hash((zone.total_capacity, zone.occupied, self._snapshot.stale))
+
+    @property
+    def native_value(self) -> Optional[int]:
+        """Return the state of the sensor."""
+        if (zone := self._zone) is None:
+            return None
+        if self._sensor_type == "available_spots":
+            return zone.available
+        return zone.occupied
+
+    @property
+    def extra_state_attributes(self) -> Dict[str, Any]:
+        """Return the zone's identifying attributes."""
+        return self._attr_extra_state_attributes
 
     @property
     def available(self) -> bool:
         """Return if entity is available."""
+        return super().available and self._zone is not None
+
+
+class TfNSWGroupSensor(CoordinatorEntity, SensorEntity):
+    """Combined availability of a suburb or custom group of car parks."""
+
+    def __init__(
+        self,
+        coordinator,
+        entry_id: str,
+        sensor_type: str,
+        enabled_default: bool = True,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        totals: GroupTotals = coordinator.totals
+        self._attr_entity_registry_enabled_default = enabled_default
+        self._sensor_type = sensor_type
+        self._attr_unique_id = (
+            f"{DOMAIN}_{entry_id}_group_{totals.group_id}_{sensor_type}"
+        )
+        self.entity_id = f"sensor.tfnsw_carpark_group_{totals.group_id}_{sensor_type}"
+
+        if sensor_type == "available_spots":
+            self._attr_name = f"{totals.name} Available Spots"
+            self._attr_icon = "mdi:car"
+            self._attr_native_unit_of_measurement = "spots"
+        elif sensor_type == "total_spots":
+            self._attr_name = f"{totals.name} Total Spots"
+            self._attr_icon = "mdi:car-multiple"
+            self._attr_native_unit_of_measurement = "spots"
+        elif sensor_type == "occupied_spots":
+            self._attr_name = f"{totals.name} Occupied Spots"
+            self._attr_icon = "mdi:car-off"
+            self._attr_native_unit_of_measurement = "spots"
+        elif sensor_type == "occupancy_percentage":
+            self._attr_name = f"{totals.name} Occupancy"
+            self._attr_icon = "mdi:percent"
+            self._attr_native_unit_of_measurement = "%"
+        self._attr_state_class = SensorStateClass.MEASUREMENT
+        self._last_version: Optional[int] = None
+
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, f"{entry_id}_group_{totals.group_id}")},
+            name=totals.name,
+            manufacturer="Transport for NSW",
+            model="Car park group",
+            entry_type=DeviceEntryType.SERVICE,
+        )
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only when the group's totals moved."""
+        version = self.coordinator.totals.version
+        if version == self._last_version:
+            return
+        self._last_version = version
+        self.async_write_ha_state()
+
+    @property
+    def native_value(self) -> Optional[float]:
+        """Return the state of the sensor."""
+        totals: GroupTotals = self.coordinator.totals
+        if self._sensor_type == "available_spots":
+            return totals.available
+        if self._sensor_type == "total_spots":
+            return totals.total_capacity
+        if self._sensor_type == "occupied_spots":
+            return totals.occupied
+        if self._sensor_type == "occupancy_percentage":
+            return totals.occupancy_percentage
+        return None
+
+    @property
+    def extra_state_attributes(self) -> Dict[str, Any]:
+        """Return how many members the totals cover."""
+        totals: GroupTotals = self.coordinator.totals
+        attributes = {
+            "carparks": totals.members,
+            "reporting": totals.reporting,
+            "stale": totals.stale,
+        }
+        if self._sensor_type == "available_spots":
+            attributes.update(
+                total_capacity=totals.total_capacity,
+                occupied_spots=totals.occupied,
+                occupancy_percentage=totals.occupancy_percentage,
+            )
+        return attributes
+
+    @property
+    def available(self) -> bool:
+        """Return True once any member has reported."""
         return (
-            self.coordinator.last_update_success 
-            and self.coordinator.data is not None 
-            and self._carpark_id in self.coordinator.data
+            super().available
+            and self.coordinator.data is not None
+            and self.coordinator.totals.reporting > 0
+        )
+
+
+class TfNSWNearestCarParkSensor(CoordinatorEntity, SensorEntity):
+    """Nearest tracked car park with free spots to a person or zone."""
+
+    _attr_icon = "mdi:map-marker-radius"
+    _unrecorded_attributes = frozenset({"candidates"})
+
+    def __init__(
+        self,
+        coordinator,
+        locator: CarParkLocator,
+        entry_id: str,
+        origin_entity_id: str,
+        min_available: int,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._locator = locator
+        self._origin_entity_id = origin_entity_id
+        self._min_available = min_available
+        self._results: list = []
+        self._attr_unique_id = f"{DOMAIN}_{entry_id}_nearest_available"
+        self._attr_name = "Nearest Available Car Park"
+
+    async def async_added_to_hass(self) -> None:
+        """Follow the origin entity as well as the coordinator."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_track_state_change_event(
+                self.hass, [self._origin_entity_id], self._async_origin_changed
+            )
+        )
+        self._update_results()
+
+    @callback
+    def _async_origin_changed(self, event: Event) -> None:
+        """Update when the origin entity moves."""
+        if self._update_results():
+            self.async_write_ha_state()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Update when car park availability changes."""
+        if self._update_results():
+            self.async_write_ha_state()
+
+    def _update_results(self) -> bool:
+        """Query the locator, returning True if the answer changed."""
+        results = []
+        state = self.hass.states.get(self._origin_entity_id)
+        if state is not None:
+            latitude = state.attributes.get(ATTR_LATITUDE)
+            longitude = state.attributes.get(ATTR_LONGITUDE)
+            if latitude is not None and longitude is not None:
+                results = self._locator.nearest(
+                    latitude, longitude, DEFAULT_NEAREST_COUNT, self._min_available
+                )
+        if results == self._results:
+            return False
+        self._results = results
+        return True
+
+    @property
+    def native_value(self) -> Optional[str]:
+        """Return the name of the nearest car park with space."""
+        return self._results[0]["name"] if self._results else None
+
+    @property
+    def extra_state_attributes(self) -> Dict[str, Any]:
+        """Return the nearest car park and the runners-up."""
+        if not self._results:
+            return {"origin": self._origin_entity_id}
+        nearest = self._results[0]
+        return {
+            "origin": self._origin_entity_id,
+            "carpark_id": nearest["carpark_id"],
+            "distance_km": nearest["distance_km"],
+            "available_spots": nearest["available_spots"],
+            "candidates": self._results,
+        }
+
+
+class TfNSWCarParkMetricSensor(SensorEntity):
+    """Diagnostic view of the integration's request and refresh metrics."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_has_entity_name = True
+
+    def __init__(self, metrics: RefreshMetrics, entry_id: str, metric: str) -> None:
+        """Initialize the sensor."""
+        self._metrics = metrics
+        self._metric = metric
+        self._attr_unique_id = f"{DOMAIN}_{entry_id}_{metric}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, entry_id)},
+            name="TfNSW Car Park API",
+            manufacturer="Transport for NSW",
+            entry_type=DeviceEntryType.SERVICE,
         )
+        
+        if metric == "refresh_duration":
+            self._attr_name = "Refresh Duration"
+            self._attr_icon = "mdi:timer-outline"
+            self._attr_device_class = SensorDeviceClass.DURATION
+            self._attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+            self._attr_state_class = SensorStateClass.MEASUREMENT
+        elif metric == "api_requests":
+            self._attr_name = "API Requests"
+            self._attr_icon = "mdi:api"
+            self._attr_native_unit_of_measurement = "requests"
+            self._attr_state_class = SensorStateClass.TOTAL_INCREASING
+        elif metric == "request_latency":
+            self._attr_name = "Request Latency P95"
+            self._attr_icon = "mdi:timer-sand"
+            self._attr_device_class = SensorDeviceClass.DURATION
+            self._attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+            self._attr_state_class = SensorStateClass.MEASUREMENT
+        elif metric == "cache_hit_rate":
+            self._attr_name = "Unchanged Payload Rate"
+            self._attr_icon = "mdi:cached"
+            self._attr_native_unit_of_measurement = PERCENTAGE
+            self._attr_state_class = SensorStateClass.MEASUREMENT
+            self._attr_entity_registry_enabled_default = False
+        elif metric == "payload_bytes":
+            self._attr_name = "Payload Received"
+            self._attr_icon = "mdi:download-network"
+            self._attr_device_class = SensorDeviceClass.DATA_SIZE
+            self._attr_native_unit_of_measurement = UnitOfInformation.BYTES
+            self._attr_state_class = SensorStateClass.TOTAL_INCREASING
+            self._attr_entity_registry_enabled_default = False
+
+    @property
+    def native_value(self) -> Optional[float]:
+        """Return the current value of the metric."""
+        metrics = self._metrics
+        if self._metric == "refresh_duration":
+            if metrics.last_refresh_ms is None:
+                return None
+            return round(metrics.last_refresh_ms)
+        if self._metric == "api_requests":
+            return metrics.requests
+        if self._metric == "request_latency":
+            return metrics.latency.quantile(0.95)
+        if self._metric == "cache_hit_rate":
+            hit_rate = metrics.cache_hit_rate
+            return round(hit_rate * 100, 1) if hit_rate is not None else None
+        if self._metric == "payload_bytes":
+            return metrics.payload_bytes
+        return None
+
+    @property
+    def extra_state_attributes(self) -> Dict[str, Any]:
+        """Return the counters behind the metric."""
+        metrics = self._metrics
+        if self._metric == "refresh_duration":
+            return {
+                "refreshes": metrics.refreshes,
+                "mean_ms": _round(metrics.refresh_duration.mean),
+                "p95_ms": metrics.refresh_duration.quantile(0.95),
+                "loop_block_ms": _round(metrics.last_loop_block_ms),
+                "max_loop_block_ms": _round(metrics.loop_block.maximum),
+            }
+        if self._metric == "api_requests":
+            return {
+                "retries": metrics.retries,
+                "failures": metrics.failures,
+                "not_modified": metrics.not_modified,
+                "circuit_rejections": metrics.circuit_rejections,
+                "coalesced": metrics.coalesced,
+            }
+        if self._metric == "request_latency":
+            return {
+                "mean_ms": _round(metrics.latency.mean),
+                "max_ms": _round(metrics.latency.maximum),
+                "slowest": dict(metrics.slowest()),
+            }
+        if self._metric == "payload_bytes":
+            return {"parse_ms": _round(metrics.parse_seconds * 1000)}
+        return {}
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    """Round a metric for display."""
+    return round(value, 1) if value is not None else None
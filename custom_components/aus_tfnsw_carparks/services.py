@@ -0,0 +1,202 @@
+"""Services for the TfNSW Car Park integration."""
+from __future__ import annotations
+
+import logging
+from datetime import timedelta
+from typing import Set
+
+import voluptuous as vol
+
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.const import ATTR_ENTITY_ID, ATTR_LATITUDE, ATTR_LONGITUDE
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    CONF_SELECTED_CARPARKS,
+    DATA_LOCATOR,
+    DEFAULT_NEAREST_COUNT,
+    DEFAULT_NEAREST_MIN_AVAILABLE,
+    DEFAULT_THRESHOLD_HYSTERESIS,
+    DOMAIN,
+    SERVICE_FIND_NEAREST,
+    SERVICE_GET_HISTORY,
+    SERVICE_REMOVE_THRESHOLD,
+    SERVICE_SET_THRESHOLD,
+)
+from .history import RESOLUTIONS, async_get_history
+from .thresholds import async_get_thresholds
+
+_LOGGER = logging.getLogger(__name__)
+
+ATTR_CARPARK_ID = "carpark_id"
+ATTR_ZONE_ID = "zone_id"
+ATTR_DAYS = "days"
+ATTR_RESOLUTION = "resolution"
+ATTR_COUNT = "count"
+ATTR_MIN_AVAILABLE = "min_available"
+ATTR_BELOW = "below"
+ATTR_HYSTERESIS = "hysteresis"
+
+GET_HISTORY_SCHEMA = vol.Schema({
+    vol.Required(ATTR_CARPARK_ID): cv.string,
+    vol.Optional(ATTR_ZONE_ID): cv.string,
+    vol.Optional(ATTR_DAYS, default=1): vol.All(
+        vol.Coerce(float), vol.Range(min=0, min_included=False)
+    ),
+    vol.Optional(ATTR_RESOLUTION): vol.In([name for name, _, _ in RESOLUTIONS]),
+})
+
+FIND_NEAREST_SCHEMA = vol.All(
+    vol.Schema({
+        vol.Inclusive(ATTR_LATITUDE, "coordinates"): cv.latitude,
+        vol.Inclusive(ATTR_LONGITUDE, "coordinates"): cv.longitude,
+        vol.Optional(ATTR_ENTITY_ID): cv.entity_id,
+        vol.Optional(ATTR_COUNT, default=DEFAULT_NEAREST_COUNT): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=50)
+        ),
+        vol.Optional(
+            ATTR_MIN_AVAILABLE, default=DEFAULT_NEAREST_MIN_AVAILABLE
+        ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+    }),
+    cv.has_at_least_one_key(ATTR_LATITUDE, ATTR_ENTITY_ID),
+)
+
+SET_THRESHOLD_SCHEMA = vol.Schema({
+    vol.Required(ATTR_CARPARK_ID): cv.string,
+    vol.Optional(ATTR_ZONE_ID): cv.string,
+    vol.Required(ATTR_BELOW): vol.All(vol.Coerce(int), vol.Range(min=1)),
+    vol.Optional(ATTR_HYSTERESIS, default=DEFAULT_THRESHOLD_HYSTERESIS): vol.All(
+        vol.Coerce(int), vol.Range(min=0)
+    ),
+})
+
+REMOVE_THRESHOLD_SCHEMA = vol.Schema({
+    vol.Required(ATTR_CARPARK_ID): cv.string,
+    vol.Optional(ATTR_ZONE_ID): cv.string,
+    vol.Optional(ATTR_BELOW): vol.All(vol.Coerce(int), vol.Range(min=1)),
+})
+
+
+@callback
+def _tracked_carparks(hass: HomeAssistant) -> Set[str]:
+    """Return the car parks selected by any config entry."""
+    return {
+        carpark_id
+        for entry in hass.config_entries.async_entries(DOMAIN)
+        for carpark_id in entry.data.get(CONF_SELECTED_CARPARKS, [])
+    }
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the integration's services."""
+
+    async def async_get_history_service(call: ServiceCall) -> ServiceResponse:
+        """Return occupancy history for a car park or zone."""
+        # Only tracked car parks have history, and ids name storage files
+        if (carpark_id := call.data[ATTR_CARPARK_ID]) not in _tracked_carparks(hass):
+            raise ServiceValidationError(f"Car park {carpark_id} is not tracked")
+        history = await async_get_history(hass, [carpark_id])
+        end = dt_util.utcnow()
+        start = end - timedelta(days=call.data[ATTR_DAYS])
+        resolution, points = history.query(
+            carpark_id,
+            call.data.get(ATTR_ZONE_ID),
+            start.timestamp(),
+            end.timestamp(),
+            call.data.get(ATTR_RESOLUTION),
+        )
+        for point in points:
+            point["time"] = dt_util.utc_from_timestamp(point["time"]).isoformat()
+        return {
+            ATTR_CARPARK_ID: carpark_id,
+            ATTR_ZONE_ID: call.data.get(ATTR_ZONE_ID),
+            ATTR_RESOLUTION: resolution,
+            "points": points,
+        }
+
+    async def async_find_nearest_service(call: ServiceCall) -> ServiceResponse:
+        """Return the nearest tracked car parks with free spots."""
+        if (locator := hass.data.get(DOMAIN, {}).get(DATA_LOCATOR)) is None:
+            raise ServiceValidationError("No TfNSW car parks are being tracked")
+        if ATTR_LATITUDE in call.data:
+            latitude = call.data[ATTR_LATITUDE]
+            longitude = call.data[ATTR_LONGITUDE]
+        else:
+            state = hass.states.get(call.data[ATTR_ENTITY_ID])
+            if (
+                state is None
+                or (latitude := state.attributes.get(ATTR_LATITUDE)) is None
+                or (longitude := state.attributes.get(ATTR_LONGITUDE)) is None
+            ):
+                raise ServiceValidationError(
+                    f"{call.data[ATTR_ENTITY_ID]} has no location"
+                )
+        return {
+            "carparks": locator.nearest(
+                latitude,
+                longitude,
+                call.data[ATTR_COUNT],
+                call.data[ATTR_MIN_AVAILABLE],
+            )
+        }
+
+    async def async_set_threshold_service(call: ServiceCall) -> None:
+        """Fire events when a car park or zone crosses a level of free spots."""
+        thresholds = await async_get_thresholds(hass)
+        thresholds.async_set(
+            call.data[ATTR_CARPARK_ID],
+            call.data.get(ATTR_ZONE_ID),
+            call.data[ATTR_BELOW],
+            call.data[ATTR_HYSTERESIS],
+        )
+
+    async def async_remove_threshold_service(call: ServiceCall) -> None:
+        """Stop watching thresholds of a car park or zone."""
+        thresholds = await async_get_thresholds(hass)
+        if not thresholds.async_remove(
+            call.data[ATTR_CARPARK_ID],
+            call.data.get(ATTR_ZONE_ID),
+            call.data.get(ATTR_BELOW),
+        ):
+            raise ServiceValidationError(
+                f"No matching threshold for carpark {call.data[ATTR_CARPARK_ID]}"
+            )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_FIND_NEAREST,
+        async_find_nearest_service,
+        schema=FIND_NEAREST_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_HISTORY,
+        async_get_history_service,
+        schema=GET_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SET_THRESHOLD,
+        async_set_threshold_service,
+        schema=SET_THRESHOLD_SCHEMA,
+    )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_REMOVE_THRESHOLD,
+        async_remove_threshold_service,
+        schema=REMOVE_THRESHOLD_SCHEMA,
+    )
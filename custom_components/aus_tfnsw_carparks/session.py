@@ -0,0 +1,80 @@
+"""Shared HTTP session for the TfNSW Car Park integration."""
+from __future__ import annotations
+
+import logging
+
+import aiohttp
+
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import Event, HomeAssistant, callback
+
+from .api import ConnectionStats, RequestCoalescer, create_session
+from .const import DATA_SESSION, DOMAIN
+from .scheduler import RequestBudget
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class SharedSession:
+    """One pooled aiohttp session, coalescer and request budget per instance."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the shared session."""
+        self.stats = ConnectionStats()
+        self.session = create_session(self.stats)
+        self.coalescer = RequestCoalescer()
+        self.budget = RequestBudget()
+        self._users = 0
+        self._unsub_close = hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_CLOSE, self._async_close_on_stop
+        )
+
+    @callback
+    def acquire(self) -> aiohttp.ClientSession:
+        """Register a config entry as a user of the session."""
+        self._users += 1
+        return self.session
+
+    async def async_release(self) -> None:
+        """Unregister a config entry, closing the session after the last one."""
+        self._users -= 1
+        if self._users <= 0:
+            await self.async_close()
+
+    async def async_close(self) -> None:
+        """Close the session and stop listening for shutdown."""
+        if self._unsub_close:
+            self._unsub_close()
+            self._unsub_close = None
+        _LOGGER.debug(
+            "Closing shared session, connection reuse rate %.0f%% (%d reused, %d new)",
+            self.stats.reuse_rate * 100,
+            self.stats.reused,
+            self.stats.created,
+        )
+        await self.session.close()
+
+    async def _async_close_on_stop(self, event: Event) -> None:
+        """Close the session when Home Assistant shuts down."""
+        self._unsub_close = None
+        await self.session.close()
+
+
+@callback
+def async_get_shared_session(hass: HomeAssistant) -> SharedSession:
+    """Return the shared session, creating it if needed."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    shared = domain_data.get(DATA_SESSION)
+    if shared is None or shared.session.closed:
+        shared = domain_data[DATA_SESSION] = SharedSession(hass)
+    return shared
+
+
+async def async_release_shared_session(hass: HomeAssistant) -> None:
+    """Release a config entry's hold on the shared session."""
+    domain_data = hass.data.get(DOMAIN, {})
+    if (shared := domain_data.get(DATA_SESSION)) is None:
+        return
+    await shared.async_release()
+    if shared.session.closed:
+        domain_data.pop(DATA_SESSION, None)
@@ -0,0 +1,193 @@
+"""Shared on-disk snapshot file for the TfNSW Car Park integration.
+
+A collector process polls the API and writes the latest payload of every
+facility to one file, which any number of Home Assistant instances read
+instead of calling the API themselves.
+
+Layout, all little-endian:
+
+    header  magic, format version, generation, written at, facility count
+    index   per facility: id, CRC-32 of its payload, payload offset, length
+    data    JSON payloads
+
+The file is replaced atomically, so readers never see a partial write.
+Readers stat the file and only map it when it changed, then decode only
+the payloads whose checksum moved since their last read.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from .const import SNAPSHOT_FILE_MAX_AGE
+
+try:
+    from orjson import dumps as _json_dumps, loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+    def _json_dumps(data: Any) -> bytes:
+        """Encode data as compact JSON."""
+        return json.dumps(data, separators=(",", ":")).encode()
+
+
+_LOGGER = logging.getLogger(__name__)
+
+MAGIC = b"TFNSWCP\0"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sHxxQdI")
+INDEX_ENTRY = struct.Struct("<16sIII")
+MAX_ID_LENGTH = INDEX_ENTRY.size - 12
+
+
+class SnapshotFileError(Exception):
+    """Raised when a snapshot file cannot be understood."""
+
+
+def write_snapshot_file(
+    path: str, payloads: Mapping[str, Dict[str, Any]], generation: int
+) -> None:
+    """Write every payload to the snapshot file, replacing it atomically."""
+    entries = []
+    for facility_id, payload in payloads.items():
+        encoded_id = facility_id.encode()
+        if len(encoded_id) > MAX_ID_LENGTH:
+            _LOGGER.warning("Skipping facility with oversized id %s", facility_id)
+            continue
+        entries.append((encoded_id, _json_dumps(payload)))
+
+    offset = HEADER.size + INDEX_ENTRY.size * len(entries)
+    parts = [HEADER.pack(MAGIC, FORMAT_VERSION, generation, time.time(), len(entries))]
+    for encoded_id, body in entries:
+        parts.append(INDEX_ENTRY.pack(encoded_id, zlib.crc32(body), offset, len(body)))
+        offset += len(body)
+    parts.extend(body for _, body in entries)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tfnsw-snapshot-")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(b"".join(parts))
+            file.flush()
+            os.fsync(file.fileno())
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def read_snapshot_header(data: bytes) -> Tuple[int, float, int]:
+    """Return the generation, write time and facility count of a file."""
+    if len(data) < HEADER.size:
+        raise SnapshotFileError("File is shorter than its header")
+    magic, version, generation, written_at, count = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise SnapshotFileError("Not a TfNSW car park snapshot file")
+    if version != FORMAT_VERSION:
+        raise SnapshotFileError(f"Unsupported snapshot file version {version}")
+    return generation, written_at, count
+
+
+def read_snapshot_file(path: str) -> Dict[str, Dict[str, Any]]:
+    """Return every payload in a snapshot file."""
+    with open(path, "rb") as file:
+        data = file.read()
+    _, _, count = read_snapshot_header(data)
+    payloads = {}
+    for index in range(count):
+        encoded_id, _, offset, length = INDEX_ENTRY.unpack_from(
+            data, HEADER.size + index * INDEX_ENTRY.size
+        )
+        payloads[encoded_id.rstrip(b"\0").decode()] = json_loads(
+            data[offset:offset + length]
+        )
+    return payloads
+
+
+class SnapshotFileReader:
+    """Read the payloads that changed since the last read of a snapshot file.
+
+    Blocking, so the integration calls it from an executor.
+    """
+
+    def __init__(self, path: str, max_age: float = SNAPSHOT_FILE_MAX_AGE) -> None:
+        """Initialize the reader."""
+        self.path = path
+        self._max_age = max_age
+        self._file_key: Optional[Tuple[int, int, int]] = None
+        self._checksums: Dict[str, int] = {}
+        self._written_at: Optional[float] = None
+        self.stale = False
+
+    def read(
+        self, facility_ids: Iterable[str]
+    ) -> List[Tuple[str, Optional[Dict[str, Any]]]]:
+        """Return (id, payload) for the given facilities that changed.
+
+        When the file goes missing or stops being updated, every facility is
+        returned once with no payload so callers can flag it stale.
+        """
+        wanted = set(facility_ids)
+        try:
+            stat = os.stat(self.path)
+        except OSError as err:
+            return self._mark_stale(wanted, f"cannot read {self.path}: {err}")
+
+        file_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if file_key != self._file_key:
+            try:
+                changed = self._read_changed(wanted)
+            except (OSError, ValueError, struct.error, SnapshotFileError) as err:
+                return self._mark_stale(wanted, f"cannot read {self.path}: {err}")
+            self._file_key = file_key
+        else:
+            changed = []
+
+        written_at = self._written_at
+        if written_at is not None and time.time() - written_at > self._max_age:
+            return self._mark_stale(wanted, f"{self.path} is no longer updated")
+        if self.stale:
+            _LOGGER.info("Snapshot file %s is being updated again", self.path)
+            self.stale = False
+        return changed
+
+    def _read_changed(
+        self, wanted: Iterable[str]
+    ) -> List[Tuple[str, Optional[Dict[str, Any]]]]:
+        """Map the file and decode the payloads whose checksum changed."""
+        wanted = set(wanted)
+        changed = []
+        with open(self.path, "rb") as file, mmap.mmap(
+            file.fileno(), 0, access=mmap.ACCESS_READ
+        ) as data:
+            _, self._written_at, count = read_snapshot_header(data)
+            for index in range(count):
+                encoded_id, checksum, offset, length = INDEX_ENTRY.unpack_from(
+                    data, HEADER.size + index * INDEX_ENTRY.size
+                )
+                facility_id = encoded_id.rstrip(b"\0").decode()
+                if facility_id not in wanted:
+                    continue
+                if self._checksums.get(facility_id) == checksum and not self.stale:
+                    continue
+                self._checksums[facility_id] = checksum
+                changed.append((facility_id, json_loads(data[offset:offset + length])))
+        return changed
+
+    def _mark_stale(
+        self, wanted: Iterable[str], reason: str
+    ) -> List[Tuple[str, Optional[Dict[str, Any]]]]:
+        """Report every facility as missing the first time the file goes stale."""
+        if self.stale:
+            return []
+        _LOGGER.warning("Serving last known car park data, %s", reason)
+        self.stale = True
+        return [(facility_id, None) for facility_id in wanted]
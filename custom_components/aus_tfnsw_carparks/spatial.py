@@ -0,0 +1,217 @@
+"""Nearest car park lookups for the TfNSW Car Park integration."""
+from __future__ import annotations
+
+import math
+from collections import defaultdict
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Tuple
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DATA_LOCATOR, DOMAIN, GRID_CELL_DEGREES
+from .directory import FacilityDirectory
+from .models import CarParkSnapshot
+
+if TYPE_CHECKING:
+    from .coordinator import TfNSWCarParkCoordinator
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Return the great-circle distance between two points in kilometres."""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    half_dlon = math.radians(lon2 - lon1) / 2
+    a = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(half_dlon) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _to_float(value) -> Optional[float]:
+    """Convert an API coordinate to float, returning None if it is invalid."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class SpatialIndex:
+    """Uniform grid over car park coordinates.
+
+    Queries scan rings of cells outwards from the query point and stop once
+    the next ring cannot hold anything closer than the results so far.
+    """
+
+    def __init__(
+        self,
+        points: Iterable[Tuple[str, float, float]],
+        cell_size: float = GRID_CELL_DEGREES,
+    ) -> None:
+        """Build the index from (id, latitude, longitude) points."""
+        self._cell_size = cell_size
+        self._cells: Dict[Tuple[int, int], List[Tuple[str, float, float]]] = (
+            defaultdict(list)
+        )
+        for point in points:
+            self._cells[self._cell(point[1], point[2])].append(point)
+        self._cells = dict(self._cells)
+        self.size = sum(len(cell) for cell in self._cells.values())
+        if self._cells:
+            rows = [row for row, _ in self._cells]
+            cols = [col for _, col in self._cells]
+            self._bounds = (min(rows), max(rows), min(cols), max(cols))
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        """Return the grid cell holding a coordinate."""
+        return (
+            math.floor(latitude / self._cell_size),
+            math.floor(longitude / self._cell_size),
+        )
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        count: int,
+        accept: Callable[[str], bool] = lambda _: True,
+    ) -> List[Tuple[float, str]]:
+        """Return up to count (distance km, id) pairs, nearest first."""
+        if not self._cells or count <= 0:
+            return []
+        row, col = self._cell(latitude, longitude)
+        min_row, max_row, min_col, max_col = self._bounds
+        max_ring = max(
+            abs(row - min_row),
+            abs(row - max_row),
+            abs(col - min_col),
+            abs(col - max_col),
+        )
+        # A cell r rings away is at least (r - 1) cells from the query point
+        ring_km = self._cell_size * KM_PER_DEGREE * max(
+            math.cos(math.radians(latitude)), 0.01
+        )
+
+        found: List[Tuple[float, str]] = []
+        for ring in range(max_ring + 1):
+            if len(found) >= count and (ring - 1) * ring_km > found[count - 1][0]:
+                break
+            for cell in self._ring(row, col, ring):
+                for point_id, point_lat, point_lon in self._cells.get(cell, ()):
+                    if not accept(point_id):
+                        continue
+                    distance = haversine_km(latitude, longitude, point_lat, point_lon)
+                    found.append((distance, point_id))
+            found.sort()
+        return found[:count]
+
+    @staticmethod
+    def _ring(row: int, col: int, ring: int) -> Iterable[Tuple[int, int]]:
+        """Yield the cells exactly ring steps away from a cell."""
+        if ring == 0:
+            yield row, col
+            return
+        for offset in range(-ring, ring + 1):
+            yield row - ring, col + offset
+            yield row + ring, col + offset
+        for offset in range(-ring + 1, ring):
+            yield row + offset, col - ring
+            yield row + offset, col + ring
+
+
+class CarParkLocator:
+    """Find the nearest tracked car parks with free spots.
+
+    The index covers every car park selected in any config entry and is
+    rebuilt lazily when the selection or the directory's metadata changes.
+    Availability is read from the coordinators' cached snapshots.
+    """
+
+    def __init__(self, directory: FacilityDirectory) -> None:
+        """Initialize the locator."""
+        self.directory = directory
+        self._coordinators: List[TfNSWCarParkCoordinator] = []
+        self._index: Optional[SpatialIndex] = None
+        self._index_version: Optional[int] = None
+
+    @callback
+    def async_register(
+        self, coordinator: TfNSWCarParkCoordinator
+    ) -> Callable[[], None]:
+        """Track a coordinator's car parks until the returned callback is called."""
+        self._coordinators.append(coordinator)
+        self._index = None
+
+        @callback
+        def unregister() -> None:
+            self._coordinators.remove(coordinator)
+            self._index = None
+
+        return unregister
+
+    def snapshot(self, carpark_id: str) -> Optional[CarParkSnapshot]:
+        """Return the latest snapshot of a tracked car park."""
+        for coordinator in self._coordinators:
+            if coordinator.data and (snapshot := coordinator.data.get(carpark_id)):
+                return snapshot
+        return None
+
+    def _get_index(self) -> SpatialIndex:
+        """Return the spatial index, rebuilding it if it is out of date."""
+        if self._index is None or self._index_version != self.directory.version:
+            points = []
+            for carpark_id in {
+                carpark_id
+                for coordinator in self._coordinators
+                for carpark_id in coordinator.selected_carparks
+            }:
+                metadata = self.directory.metadata(carpark_id)
+                latitude = _to_float(metadata.latitude)
+                longitude = _to_float(metadata.longitude)
+                if latitude is not None and longitude is not None:
+                    points.append((carpark_id, latitude, longitude))
+            self._index = SpatialIndex(points)
+            self._index_version = self.directory.version
+        return self._index
+
+    def nearest(
+        self, latitude: float, longitude: float, count: int, min_available: int
+    ) -> List[Dict[str, object]]:
+        """Return the nearest car parks with at least min_available spots."""
+
+        def has_space(carpark_id: str) -> bool:
+            snapshot = self.snapshot(carpark_id)
+            return (
+                snapshot is not None
+                and snapshot.available is not None
+                and snapshot.available >= min_available
+            )
+
+        results = []
+        for distance, carpark_id in self._get_index().nearest(
+            latitude, longitude, count, has_space
+        ):
+            snapshot = self.snapshot(carpark_id)
+            metadata = self.directory.metadata(carpark_id)
+            results.append({
+                "carpark_id": carpark_id,
+                "name": metadata.name or snapshot.facility_name or carpark_id,
+                "suburb": metadata.suburb,
+                "distance_km": round(distance, 2),
+                "available_spots": snapshot.available,
+                "stale": snapshot.stale,
+            })
+        return results
+
+
+@callback
+def async_get_locator(
+    hass: HomeAssistant, directory: FacilityDirectory
+) -> CarParkLocator:
+    """Return the car park locator, creating it if needed."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (locator := domain_data.get(DATA_LOCATOR)) is None:
+        locator = domain_data[DATA_LOCATOR] = CarParkLocator(directory)
+    return locator
@@ -0,0 +1,187 @@
+"""Availability threshold events for the TfNSW Car Park integration."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DATA_THRESHOLDS, DOMAIN, EVENT_THRESHOLD
+from .models import CarParkSnapshot
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_KEY = f"{DOMAIN}.thresholds"
+STORAGE_VERSION = 1
+
+
+class Threshold:
+    """Alert when free spots in a car park or zone drop below a level."""
+
+    __slots__ = ("carpark_id", "zone_id", "below", "hysteresis", "is_below")
+
+    def __init__(
+        self, carpark_id: str, zone_id: Optional[str], below: int, hysteresis: int
+    ) -> None:
+        """Initialize the threshold, state unknown until the first snapshot."""
+        self.carpark_id = carpark_id
+        self.zone_id = zone_id
+        self.below = below
+        self.hysteresis = hysteresis
+        self.is_below: Optional[bool] = None
+
+    def matches(self, zone_id: Optional[str], below: Optional[int]) -> bool:
+        """Return True if this threshold has the given zone and level."""
+        return self.zone_id == zone_id and below in (None, self.below)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the threshold in a form suitable for storage."""
+        return {
+            "carpark_id": self.carpark_id,
+            "zone_id": self.zone_id,
+            "below": self.below,
+            "hysteresis": self.hysteresis,
+        }
+
+
+class ThresholdMonitor:
+    """Fire events when availability crosses user-defined thresholds.
+
+    Only car parks whose snapshot changed are evaluated. A threshold fires
+    once when free spots fall below its level and once more when they
+    recover to the level plus its hysteresis, so values hovering around
+    the level do not flap. The first snapshot seen only sets the state.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the monitor."""
+        self.hass = hass
+        self._store: Store[Dict[str, Any]] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._load_lock = asyncio.Lock()
+        self._loaded = False
+        self._thresholds: Dict[str, List[Threshold]] = {}
+        # Entries sharing a car park push the same snapshot, evaluate it once
+        self._evaluated: Dict[str, int] = {}
+
+    async def async_load(self) -> None:
+        """Load the thresholds from storage once."""
+        async with self._load_lock:
+            if self._loaded:
+                return
+            if stored := await self._store.async_load():
+                for item in stored.get("thresholds", []):
+                    self._add(
+                        Threshold(
+                            item["carpark_id"],
+                            item.get("zone_id"),
+                            item["below"],
+                            item["hysteresis"],
+                        )
+                    )
+            self._loaded = True
+
+    def _add(self, threshold: Threshold) -> None:
+        """Index a threshold by its car park."""
+        self._thresholds.setdefault(threshold.carpark_id, []).append(threshold)
+
+    @callback
+    def async_set(
+        self, carpark_id: str, zone_id: Optional[str], below: int, hysteresis: int
+    ) -> None:
+        """Add a threshold, replacing one with the same car park, zone and level."""
+        self.async_remove(carpark_id, zone_id, below)
+        self._add(Threshold(carpark_id, zone_id, below, hysteresis))
+        # Evaluate against the next snapshot even if it is unchanged
+        self._evaluated.pop(carpark_id, None)
+        self._async_save()
+
+    @callback
+    def async_remove(
+        self, carpark_id: str, zone_id: Optional[str], below: Optional[int] = None
+    ) -> int:
+        """Remove matching thresholds, every level if none is given."""
+        thresholds = self._thresholds.get(carpark_id, [])
+        kept = [t for t in thresholds if not t.matches(zone_id, below)]
+        removed = len(thresholds) - len(kept)
+        if kept:
+            self._thresholds[carpark_id] = kept
+        else:
+            self._thresholds.pop(carpark_id, None)
+        if removed:
+            self._async_save()
+        return removed
+
+    @callback
+    def async_evaluate(self, snapshot: CarParkSnapshot) -> None:
+        """Check a car park's thresholds against its latest snapshot."""
+        if (thresholds := self._thresholds.get(snapshot.carpark_id)) is None:
+            return
+        if self._evaluated.get(snapshot.carpark_id) == snapshot.fingerprint:
+            return
+        self._evaluated[snapshot.carpark_id] = snapshot.fingerprint
+
+        for threshold in thresholds:
+            if threshold.zone_id is None:
+                available = snapshot.available
+            elif (zone := snapshot.zone(threshold.zone_id)) is not None:
+                available = zone.available
+            else:
+                continue
+            if available is None:
+                continue
+            if available < threshold.below:
+                is_below = True
+            elif available >= threshold.below + threshold.hysteresis:
+                is_below = False
+            else:
+                # Inside the hysteresis band, keep the current state
+                continue
+            if threshold.is_below is None or threshold.is_below == is_below:
+                threshold.is_below = is_below
+                continue
+            threshold.is_below = is_below
+            _LOGGER.debug(
+                "Carpark %s zone %s crossed %d spots: %s",
+                snapshot.carpark_id,
+                threshold.zone_id,
+                threshold.below,
+                available,
+            )
+            self.hass.bus.async_fire(
+                EVENT_THRESHOLD,
+                {
+                    "carpark_id": snapshot.carpark_id,
+                    "zone_id": threshold.zone_id,
+                    "name": snapshot.facility_name,
+                    "type": "below" if is_below else "recovered",
+                    "below": threshold.below,
+                    "available_spots": available,
+                },
+            )
+
+    @callback
+    def _async_save(self) -> None:
+        """Save the thresholds."""
+        self._store.async_delay_save(self._data_to_save, 0)
+
+    @callback
+    def _data_to_save(self) -> Dict[str, Any]:
+        """Return the data to persist."""
+        return {
+            "thresholds": [
+                threshold.as_dict()
+                for thresholds in self._thresholds.values()
+                for threshold in thresholds
+            ]
+        }
+
+
+async def async_get_thresholds(hass: HomeAssistant) -> ThresholdMonitor:
+    """Return the loaded threshold monitor, creating it if needed."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (monitor := domain_data.get(DATA_THRESHOLDS)) is None:
+        monitor = domain_data[DATA_THRESHOLDS] = ThresholdMonitor(hass)
+    await monitor.async_load()
+    return monitor
@@ -0,0 +1,217 @@
+"""Local stand-in for the TfNSW car park API.
+
+Serves generated facility and zone payloads shaped like
+https://api.transport.nsw.gov.au/v1/carpark, with configurable latency,
+error rate and 429 responses, so the integration's refresh path can be
+exercised and profiled without a network connection or an API key.
+
+    python scripts/mock_tfnsw_api.py --facilities 500 --latency 80 --rate-limited 0.02
+
+Point TfNSWCarParkAPI at it with base_url="http://127.0.0.1:8080/v1/carpark".
+With --bulk the list endpoint returns every facility's full payload, which
+the integration uses for bulk refreshes. The benchmarks under tests/ run
+create_app in-process.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import time
+from datetime import datetime
+from typing import Any, Dict
+
+from aiohttp import web
+
+_LOGGER = logging.getLogger(__name__)
+
+SUBURBS = (
+    "Tallawong", "Kellyville", "Bella Vista", "Hills Showground", "Cherrybrook",
+    "Edmondson Park", "Leppington", "Campbelltown", "Gordon", "Warriewood",
+    "Narrabeen", "Mona Vale", "Dee Why", "Sutherland", "Kiama", "Gosford",
+)
+
+
+def _facility(facility_id: int, rng: random.Random) -> Dict[str, Any]:
+    """Return the static part of a generated facility."""
+    suburb = SUBURBS[facility_id % len(SUBURBS)]
+    zones = [
+        {
+            "zone_id": str(zone),
+            "zone_name": f"Level {zone}",
+            "spots": rng.randint(50, 400),
+        }
+        for zone in range(1, rng.randint(1, 4) + 1)
+    ]
+    return {
+        "tsn": str(2000000 + facility_id),
+        "facility_id": str(facility_id),
+        "facility_name": f"Park&Ride - {suburb} {facility_id}",
+        "tfnsw_facility_id": f"{2000000 + facility_id}TPR001",
+        "ParkID": str(facility_id),
+        "spots": str(sum(zone["spots"] for zone in zones)),
+        "location": {
+            "suburb": suburb,
+            "address": f"{facility_id} Station Road",
+            "latitude": f"{-33.87 + rng.uniform(-0.6, 0.6):.6f}",
+            "longitude": f"{151.0 + rng.uniform(-0.6, 0.6):.6f}",
+        },
+        "zones": zones,
+        # Morning fill time, in hours, differs per facility
+        "_peak": rng.uniform(6.5, 8.5),
+    }
+
+
+def _occupancy_ratio(peak: float, now: float) -> float:
+    """Return a plausible weekday occupancy ratio for a time of day."""
+    hour = datetime.fromtimestamp(now).hour + datetime.fromtimestamp(now).minute / 60
+    if hour < peak - 1.5:
+        return 0.05
+    if hour < peak:
+        return 0.05 + 0.93 * (hour - peak + 1.5) / 1.5
+    if hour < 16:
+        return 0.98
+    return max(0.05, 0.98 - 0.93 * (hour - 16) / 4)
+
+
+def _payload(facility: Dict[str, Any], now: float) -> Dict[str, Any]:
+    """Return the live payload of a facility at a point in time."""
+    ratio = _occupancy_ratio(facility["_peak"], now)
+    # Upstream data moves in roughly one minute steps
+    message_time = now - now % 60
+    zones = []
+    for zone in facility["zones"]:
+        noise = math.sin(message_time / 600 + int(zone["zone_id"])) * 0.02
+        total = max(0, min(zone["spots"], round(zone["spots"] * (ratio + noise))))
+        zones.append({
+            "spots": str(zone["spots"]),
+            "zone_id": zone["zone_id"],
+            "zone_name": zone["zone_name"],
+            "parent_zone_id": "0",
+            "occupancy": {
+                "loop": None,
+                "total": str(total),
+                "monthlies": None,
+                "open_gate": None,
+                "transients": str(total),
+            },
+        })
+    total = sum(int(zone["occupancy"]["total"]) for zone in zones)
+    payload = {key: value for key, value in facility.items() if not key.startswith("_")}
+    payload.update({
+        "zones": zones,
+        "occupancy": {
+            "loop": None,
+            "total": str(total),
+            "monthlies": None,
+            "open_gate": None,
+            "transients": str(total),
+        },
+        "MessageDate": datetime.fromtimestamp(message_time).isoformat(
+            timespec="seconds"
+        ),
+        "time": str(int(message_time)),
+    })
+    return payload
+
+
+def create_app(
+    facilities: int = 100,
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+    rate_limited: float = 0.0,
+    seed: int = 1,
+    bulk: bool = False,
+) -> web.Application:
+    """Create the mock API application.
+
+    Latency and jitter are in milliseconds, error_rate and rate_limited are
+    the shares of 503 and 429 responses.
+    """
+    rng = random.Random(seed)
+    generated = {
+        str(facility_id): _facility(facility_id, rng)
+        for facility_id in range(1, facilities + 1)
+    }
+    names = {
+        facility_id: data["facility_name"]
+        for facility_id, data in generated.items()
+    }
+    names_body = json.dumps(names)
+    names_etag = '"' + hashlib.sha1(names_body.encode()).hexdigest() + '"'
+    stats = {"requests": 0, "errors": 0, "rate_limited": 0}
+
+    async def carpark(request: web.Request) -> web.Response:
+        """Serve the list or a single facility."""
+        stats["requests"] += 1
+        if latency:
+            await asyncio.sleep(max(0.0, rng.gauss(latency, jitter)) / 1000)
+        if rng.random() < rate_limited:
+            stats["rate_limited"] += 1
+            return web.json_response(
+                {"error": "Rate limit exceeded"},
+                status=429,
+                headers={"Retry-After": "1"},
+            )
+        if rng.random() < error_rate:
+            stats["errors"] += 1
+            return web.json_response({"error": "Upstream unavailable"}, status=503)
+
+        if (facility_id := request.query.get("facility")) is None:
+            if bulk:
+                now = time.time()
+                return web.json_response({
+                    facility_id: _payload(facility, now)
+                    for facility_id, facility in generated.items()
+                })
+            if request.headers.get("If-None-Match") == names_etag:
+                return web.Response(status=304, headers={"ETag": names_etag})
+            return web.Response(
+                text=names_body,
+                content_type="application/json",
+                headers={"ETag": names_etag},
+            )
+        if (facility := generated.get(facility_id)) is None:
+            return web.json_response({"error": "Unknown facility"}, status=404)
+        return web.json_response(_payload(facility, time.time()))
+
+    async def report(request: web.Request) -> web.Response:
+        """Serve request counters."""
+        return web.json_response(stats)
+
+    app = web.Application()
+    app.router.add_get("/v1/carpark", carpark)
+    app.router.add_get("/stats", report)
+    return app
+
+
+def main() -> None:
+    """Run the mock API server."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--facilities", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=50, help="mean latency in ms")
+    parser.add_argument(
+        "--jitter", type=float, default=20, help="latency std dev in ms"
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 503s")
+    parser.add_argument("--rate-limited", type=float, default=0.0, help="share of 429s")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--bulk", action="store_true", help="serve full payloads from the list"
+    )
+    args = vars(parser.parse_args())
+    host = args.pop("host")
+    port = args.pop("port")
+    logging.basicConfig(level=logging.INFO)
+    web.run_app(create_app(**args), host=host, port=port)
+
+
+if __name__ == "__main__":
+    main()
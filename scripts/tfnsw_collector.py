@@ -0,0 +1,154 @@
+"""Headless TfNSW car park collector.
+
+Polls the TfNSW API once on behalf of any number of Home Assistant
+instances and keeps a shared snapshot file up to date. Point each
+instance's "Snapshot file" option at the same path, for example on a
+shared volume, and upstream traffic depends only on the distinct
+facilities tracked, not on the number of instances.
+
+    python scripts/tfnsw_collector.py --api-key KEY --output /share/tfnsw.bin \\
+        --facility 486 --facility 487
+
+Reuses the integration's API client, adaptive scheduler and payload
+handling without importing Home Assistant. Needs aiohttp and
+async_timeout, and uses orjson when it is installed.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import sys
+import types
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict
+
+PACKAGE = "aus_tfnsw_carparks"
+COMPONENT_DIR = Path(__file__).resolve().parent.parent / "custom_components" / PACKAGE
+
+# Load the integration's Home Assistant free modules without running its
+# __init__, which sets up the Home Assistant side
+_package = types.ModuleType(PACKAGE)
+_package.__path__ = [str(COMPONENT_DIR)]
+sys.modules[PACKAGE] = _package
+
+from aus_tfnsw_carparks.api import TfNSWCarParkAPI  # noqa: E402
+from aus_tfnsw_carparks.const import (  # noqa: E402
+    API_BASE_URL,
+    DEFAULT_DAILY_REQUEST_BUDGET,
+    SCHEDULER_TICK,
+)
+from aus_tfnsw_carparks.models import CarParkSnapshot, payload_fingerprint  # noqa: E402
+from aus_tfnsw_carparks.scheduler import PollScheduler  # noqa: E402
+from aus_tfnsw_carparks.snapshot_file import (  # noqa: E402
+    SnapshotFileError,
+    read_snapshot_file,
+    write_snapshot_file,
+)
+
+_LOGGER = logging.getLogger("tfnsw_collector")
+
+
+def _load_payloads(path: str) -> Dict[str, Dict[str, Any]]:
+    """Return the payloads of an existing snapshot file, if it is readable."""
+    try:
+        return read_snapshot_file(path)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError, SnapshotFileError) as err:
+        _LOGGER.warning("Ignoring unreadable snapshot file %s: %s", path, err)
+        return {}
+
+
+async def collect(args: argparse.Namespace, stop: asyncio.Event) -> None:
+    """Poll the selected facilities and rewrite the snapshot file every tick."""
+    api = TfNSWCarParkAPI(args.api_key, base_url=args.base_url)
+    try:
+        facility_ids = args.facility or list(await api.get_carpark_list())
+        _LOGGER.info("Collecting %d facilities into %s", len(facility_ids), args.output)
+        scheduler = PollScheduler(facility_ids, args.daily_budget)
+        payloads = {
+            facility_id: payload
+            for facility_id, payload in _load_payloads(args.output).items()
+            if facility_id in facility_ids
+        }
+        generation = 0
+
+        while not stop.is_set():
+            now = datetime.now().astimezone()
+            changed = 0
+            async for facility_id, data in api.iter_carpark_data(scheduler.due(now)):
+                if not data:
+                    scheduler.record_failure(facility_id, now)
+                    continue
+                fingerprint = payload_fingerprint(data)
+                snapshot = CarParkSnapshot.from_payload(facility_id, data, fingerprint)
+                scheduler.record(
+                    facility_id,
+                    now,
+                    fingerprint,
+                    snapshot.message_date,
+                    snapshot.occupied,
+                )
+                if payloads.get(facility_id) != data:
+                    payloads[facility_id] = data
+                    changed += 1
+
+            # Rewrite every tick so readers can tell the collector is alive
+            generation += 1
+            await asyncio.get_running_loop().run_in_executor(
+                None, write_snapshot_file, args.output, payloads, generation
+            )
+            _LOGGER.debug(
+                "Wrote generation %d, %d facilities changed, %d requests so far",
+                generation,
+                changed,
+                api.metrics.requests,
+            )
+            try:
+                await asyncio.wait_for(stop.wait(), SCHEDULER_TICK)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        await api.close()
+
+
+def main() -> None:
+    """Run the collector until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--api-key",
+        default=os.environ.get("TFNSW_API_KEY"),
+        help="TfNSW API key, defaults to $TFNSW_API_KEY",
+    )
+    parser.add_argument("--output", required=True, help="snapshot file to write")
+    parser.add_argument(
+        "--facility",
+        action="append",
+        help="facility id to collect, repeat for more; defaults to all",
+    )
+    parser.add_argument(
+        "--daily-budget", type=int, default=DEFAULT_DAILY_REQUEST_BUDGET
+    )
+    parser.add_argument("--base-url", default=API_BASE_URL)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    if not args.api_key:
+        parser.error("an API key is required, pass --api-key or set TFNSW_API_KEY")
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+
+    async def run() -> None:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        await collect(args, stop)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
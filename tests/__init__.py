@@ -0,0 +1 @@
+"""Tests for the TfNSW Car Park integration."""
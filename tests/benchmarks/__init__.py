@@ -0,0 +1,85 @@
+"""Benchmarks for the TfNSW Car Park integration.
+
+Each benchmark records its measurements with the report fixture, and they
+are printed in a section at the end of the run:
+
+    pytest tests/benchmarks
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from aiohttp.test_utils import make_mocked_request
+
+from mock_tfnsw_api import create_app
+
+# Snapshots themselves should not show up as allocations
+_TRACE_FILTERS = [tracemalloc.Filter(False, tracemalloc.__file__)]
+
+
+class Measurement:
+    """Wall time and memory use of a block of code."""
+
+    __slots__ = ("seconds", "current", "peak", "blocks")
+
+    def __init__(self) -> None:
+        """Initialize an empty measurement."""
+        self.seconds = 0.0
+        # Bytes still held at the end and at most, and net allocated blocks
+        self.current: Optional[int] = None
+        self.peak: Optional[int] = None
+        self.blocks: Optional[int] = None
+
+    def as_dict(self) -> dict:
+        """Return the measurement for the report."""
+        return {
+            "ms": round(self.seconds * 1000, 2),
+            "current_kib": None if self.current is None else self.current // 1024,
+            "peak_kib": None if self.peak is None else self.peak // 1024,
+            "blocks": self.blocks,
+        }
+
+
+@contextmanager
+def measure(trace_memory: bool = True) -> Iterator[Measurement]:
+    """Measure the wall time and traced memory of a block.
+
+    Tracing slows Python code down, so compare traced timings with each
+    other and measure untraced when the time itself matters.
+    """
+    measurement = Measurement()
+    if trace_memory:
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    try:
+        yield measurement
+    finally:
+        measurement.seconds = time.perf_counter() - started
+        if trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+            tracemalloc.stop()
+            measurement.current = current - baseline
+            measurement.peak = peak - baseline
+            measurement.blocks = sum(
+                stat.count_diff for stat in after.compare_to(before, "filename")
+            )
+
+
+def bulk_body(facilities: int) -> bytes:
+    """Return a bulk response body from the mock API, served without a socket."""
+    app = create_app(facilities=facilities, bulk=True)
+    request = make_mocked_request("GET", "/v1/carpark", app=app)
+
+    async def serve():
+        match = await app.router.resolve(request)
+        return await match.handler(request)
+
+    return asyncio.run(serve()).body
@@ -0,0 +1,42 @@
+"""Fixtures for the TfNSW Car Park benchmarks."""
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Tuple
+
+import pytest
+
+RESULTS: List[Tuple[str, Dict[str, Any]]] = []
+
+
+@pytest.fixture(autouse=True)
+def enable_event_loop_debug() -> None:
+    """Keep Home Assistant's test plugin from enabling loop debug mode.
+
+    Debug mode times every callback, which would skew the measurements.
+    """
+
+
+@pytest.fixture
+def report(request: pytest.FixtureRequest) -> Callable[..., None]:
+    """Return a function recording measurements for the end of the run."""
+
+    def record(label: str = "", **values: Any) -> None:
+        """Record measurements under the test's name."""
+        name = request.node.name + (f" {label}" if label else "")
+        RESULTS.append((name, values))
+
+    return record
+
+
+def pytest_terminal_summary(terminalreporter) -> None:
+    """Print the recorded measurements."""
+    if not RESULTS:
+        return
+    terminalreporter.section("benchmarks")
+    for name, values in RESULTS:
+        terminalreporter.write_line(
+            f"{name}: "
+            + ", ".join(
+                f"{key}={value}" for key, value in values.items() if value is not None
+            )
+        )
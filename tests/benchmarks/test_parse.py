@@ -0,0 +1,68 @@
+"""Benchmark decoding a bulk response."""
+from __future__ import annotations
+
+import json
+import time
+from typing import Any, Callable, Dict
+
+import pytest
+
+orjson = pytest.importorskip("orjson")
+
+from . import bulk_body, measure  # noqa: E402
+
+FACILITIES = 500
+REPEATS = 5
+# orjson does not reuse the interpreter's cached one character strings
+KEPT_RATIO = 1.25
+
+
+def _json(body: bytes) -> Dict[str, Any]:
+    """Decode the whole body with the standard library, as before."""
+    return json.loads(body)
+
+
+def _orjson(body: bytes) -> Dict[str, Any]:
+    """Decode the whole body with orjson."""
+    return orjson.loads(body)
+
+
+def _best_time(decode: Callable[[bytes], Any], body: bytes) -> float:
+    """Return the fastest of several untraced decodes, in seconds."""
+    best = float("inf")
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        decode(body)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def test_decode_bulk(report) -> None:
+    """Compare decoders on time, peak memory and memory kept afterwards.
+
+    The standard library decoder is the baseline. orjson, which the client
+    uses, must decode faster without a higher peak, and keep about as much.
+    """
+    body = bulk_body(FACILITIES)
+    results = {}
+    for label, decode in (("json", _json), ("orjson", _orjson)):
+        seconds = _best_time(decode, body)
+        with measure() as traced:
+            data = decode(body)
+        assert len(data) == FACILITIES
+        del data
+        results[label] = (seconds, traced)
+        report(
+            label,
+            body_kib=len(body) // 1024,
+            ms=round(seconds * 1000, 2),
+            peak_kib=traced.peak // 1024,
+            kept_kib=traced.current // 1024,
+            blocks=traced.blocks,
+        )
+
+    json_seconds, baseline = results["json"]
+    orjson_seconds, decoded = results["orjson"]
+    assert orjson_seconds < json_seconds
+    assert decoded.peak <= baseline.peak
+    assert decoded.current <= baseline.current * KEPT_RATIO
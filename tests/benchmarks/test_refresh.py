@@ -0,0 +1,43 @@
+"""Benchmark a refresh and the entity reads that follow it."""
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+from aus_tfnsw_carparks.const import BULK_REFRESH_THRESHOLD  # noqa: E402
+
+from . import measure  # noqa: E402
+from ..helpers import (  # noqa: E402
+    async_create_coordinator,
+    create_sensors,
+    read_sensors,
+)
+
+
+@pytest.mark.parametrize("facilities", [1, 10, 100, 500])
+async def test_refresh(
+    hass: HomeAssistant, mock_api, report, facilities: int
+) -> None:
+    """Refresh every facility, then read every sensor twice."""
+    api = await mock_api(facilities=facilities)
+    coordinator = await async_create_coordinator(hass, api, facilities)
+    sensors = create_sensors(coordinator)
+
+    with measure() as refresh:
+        await coordinator.async_refresh()
+    assert coordinator.last_update_success
+    # Larger selections first try a bulk request, which the mock declines
+    probed = facilities > BULK_REFRESH_THRESHOLD
+    assert len(coordinator.data) == facilities
+    assert api.metrics.requests == facilities + probed
+    report("refresh", requests=api.metrics.requests, **refresh.as_dict())
+
+    # The first read builds the merged attributes, the second reuses them
+    for label in ("first read", "second read"):
+        with measure() as read:
+            # Predicted full times are only set for car parks filling up
+            assert read_sensors(sensors) >= 4 * len(coordinator.data)
+        report(label, sensors=len(sensors), **read.as_dict())
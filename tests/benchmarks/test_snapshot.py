@@ -0,0 +1,229 @@
+"""Benchmark reading sensors from raw payloads against parsed snapshots."""
+from __future__ import annotations
+
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import pytest
+
+from aus_tfnsw_carparks.models import CarParkSnapshot, FacilityMetadata
+
+from . import bulk_body, measure
+
+REPEATS = 5
+SENSOR_TYPES = (
+    "available_spots",
+    "total_spots",
+    "occupied_spots",
+    "occupancy_percentage",
+)
+
+
+def _walk_value(data: Dict[str, Any], sensor_type: str) -> Optional[float]:
+    """Return a sensor's state from the raw payload, as sensors used to.
+
+    Mirrors the old native_value without its debug logging.
+    """
+    if sensor_type == "available_spots":
+        total_capacity = data.get("spots")
+        occupied = data.get("occupancy", {}).get("total")
+        if total_capacity is not None and occupied is not None:
+            try:
+                return int(total_capacity) - int(occupied)
+            except (ValueError, TypeError):
+                return None
+    elif sensor_type == "total_spots":
+        total_capacity = data.get("spots")
+        if total_capacity is not None:
+            try:
+                return int(total_capacity)
+            except (ValueError, TypeError):
+                return None
+    elif sensor_type == "occupied_spots":
+        occupied = data.get("occupancy", {}).get("total")
+        if occupied is not None:
+            try:
+                return int(occupied)
+            except (ValueError, TypeError):
+                return None
+    elif sensor_type == "occupancy_percentage":
+        total_capacity = data.get("spots")
+        occupied = data.get("occupancy", {}).get("total")
+        if total_capacity is not None and occupied is not None:
+            try:
+                capacity_int = int(total_capacity)
+                occupied_int = int(occupied)
+                if capacity_int > 0:
+                    return round((occupied_int / capacity_int) * 100, 1)
+                return 0
+            except (ValueError, TypeError, ZeroDivisionError):
+                return None
+    return None
+
+
+def _walk_attributes(carpark_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a sensor's attributes from the raw payload, as sensors used to."""
+    location = data.get("location", {})
+    occupancy = data.get("occupancy", {})
+    attributes = {
+        "carpark_id": carpark_id,
+        "facility_name": data.get("facility_name"),
+        "facility_id": data.get("facility_id"),
+        "tfnsw_facility_id": data.get("tfnsw_facility_id"),
+        "park_id": data.get("ParkID"),
+        "suburb": location.get("suburb"),
+        "address": location.get("address"),
+        "latitude": location.get("latitude"),
+        "longitude": location.get("longitude"),
+        "last_updated": data.get("MessageDate"),
+        "time": data.get("time"),
+        "tsn": data.get("tsn"),
+    }
+    total_capacity = data.get("spots")
+    occupied_spots = occupancy.get("total")
+    if total_capacity is not None:
+        try:
+            attributes["total_capacity"] = int(total_capacity)
+        except (ValueError, TypeError):
+            attributes["total_capacity"] = total_capacity
+    if occupied_spots is not None:
+        try:
+            attributes["occupied_spots"] = int(occupied_spots)
+        except (ValueError, TypeError):
+            attributes["occupied_spots"] = occupied_spots
+    if total_capacity is not None and occupied_spots is not None:
+        try:
+            attributes["available_spots"] = int(total_capacity) - int(occupied_spots)
+        except (ValueError, TypeError):
+            pass
+    attributes.update({
+        "monthlies": occupancy.get("monthlies"),
+        "open_gate": occupancy.get("open_gate"),
+        "transients": occupancy.get("transients"),
+        "loop": occupancy.get("loop"),
+    })
+    zones = data.get("zones", [])
+    if zones:
+        zone_info = []
+        for zone in zones:
+            if zone.get("zone_name") and zone.get("zone_name").strip():
+                zone_data = {
+                    "zone_id": zone.get("zone_id"),
+                    "zone_name": zone.get("zone_name"),
+                    "spots": zone.get("spots"),
+                }
+                zone_occupancy = zone.get("occupancy", {})
+                if zone_occupancy.get("transients"):
+                    zone_data["transients"] = zone_occupancy.get("transients")
+                zone_info.append(zone_data)
+        if zone_info:
+            attributes["zones"] = zone_info
+    return {k: v for k, v in attributes.items() if v is not None}
+
+
+def _metadata(carpark_id: str, data: Dict[str, Any]) -> FacilityMetadata:
+    """Return the static metadata the directory would hold for a payload."""
+    location = data.get("location") or {}
+    return FacilityMetadata.from_directory(
+        carpark_id,
+        {
+            "name": data.get("facility_name"),
+            "facility_id": data.get("facility_id"),
+            "tfnsw_facility_id": data.get("tfnsw_facility_id"),
+            "park_id": data.get("ParkID"),
+            **location,
+        },
+    )
+
+
+def _read_walking(payloads: Dict[str, Dict[str, Any]]) -> List[Any]:
+    """Read every sensor of every car park by walking its payload.
+
+    Each of the four sensors walked the payload for its state and built
+    the full attribute set on every state write.
+    """
+    return [
+        (
+            _walk_value(data, sensor_type),
+            _walk_attributes(carpark_id, data),
+        )
+        for carpark_id, data in payloads.items()
+        for sensor_type in SENSOR_TYPES
+    ]
+
+
+def _read_snapshots(
+    payloads: Dict[str, Dict[str, Any]],
+    metadata: Dict[str, FacilityMetadata],
+) -> List[Any]:
+    """Parse each payload once, then read every sensor from the snapshot.
+
+    One sensor per car park merges the snapshot's attributes with the
+    shared metadata, the others return the summary.
+    """
+    reads = []
+    for carpark_id, data in payloads.items():
+        snapshot = CarParkSnapshot.from_payload(carpark_id, data)
+        reads.extend((
+            (
+                snapshot.available,
+                {**metadata[carpark_id].attributes, **snapshot.attributes},
+            ),
+            (snapshot.total_capacity, snapshot.summary_attributes),
+            (snapshot.occupied, snapshot.summary_attributes),
+            (snapshot.occupancy_percentage, snapshot.summary_attributes),
+        ))
+    return reads
+
+
+def _best_time(read: Callable[[], Any]) -> float:
+    """Return the fastest of several untraced reads, in seconds."""
+    best = float("inf")
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        read()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+@pytest.mark.parametrize("facilities", [100, 500])
+def test_snapshot_reads(report, facilities: int) -> None:
+    """Compare one refresh's sensor reads from payloads and from snapshots."""
+    payloads = json.loads(bulk_body(facilities))
+    metadata = {
+        carpark_id: _metadata(carpark_id, data)
+        for carpark_id, data in payloads.items()
+    }
+
+    walked = _read_walking(payloads)
+    parsed = _read_snapshots(payloads, metadata)
+    assert [value for value, _ in parsed] == [value for value, _ in walked]
+    # The primary sensor keeps every attribute, zone ids are now strings
+    for (_, new), (_, old) in zip(parsed[::4], walked[::4]):
+        zones = old.pop("zones", [])
+        assert old.items() <= new.items()
+        assert new.get("zones", []) == [
+            {**zone, "zone_id": str(zone["zone_id"])} for zone in zones
+        ]
+
+    results = {}
+    for label, read in (
+        ("walking", lambda: _read_walking(payloads)),
+        ("snapshot", lambda: _read_snapshots(payloads, metadata)),
+    ):
+        seconds = _best_time(read)
+        with measure() as traced:
+            reads = read()
+        results[label] = seconds
+        report(
+            label,
+            sensors=len(reads),
+            ms=round(seconds * 1000, 2),
+            peak_kib=traced.peak // 1024,
+            kept_kib=traced.current // 1024,
+            blocks=traced.blocks,
+        )
+        del reads
+
+    assert results["snapshot"] < results["walking"]
@@ -0,0 +1,65 @@
+"""Shared setup for the TfNSW Car Park tests.
+
+The integration is imported as a bare package, the way
+scripts/tfnsw_collector.py does, so tests of its Home Assistant free
+modules run without Home Assistant installed. Tests that need it skip
+themselves when pytest-homeassistant-custom-component is missing.
+"""
+from __future__ import annotations
+
+import sys
+import types
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, List
+
+import pytest
+from aiohttp.test_utils import TestServer
+
+PACKAGE = "aus_tfnsw_carparks"
+ROOT = Path(__file__).resolve().parent.parent
+COMPONENT_DIR = ROOT / "custom_components" / PACKAGE
+
+if PACKAGE not in sys.modules:
+    _package = types.ModuleType(PACKAGE)
+    _package.__path__ = [str(COMPONENT_DIR)]
+    sys.modules[PACKAGE] = _package
+
+# Makes the mock API importable as mock_tfnsw_api
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from aus_tfnsw_carparks.api import TfNSWCarParkAPI  # noqa: E402
+from mock_tfnsw_api import create_app  # noqa: E402
+
+
+@pytest.fixture
+async def mock_api(
+    socket_enabled,
+) -> AsyncIterator[Callable[..., Awaitable[TfNSWCarParkAPI]]]:
+    """Return a factory serving the mock API and returning a client for it.
+
+    The server listens on the loopback interface, which Home Assistant's
+    test plugin allows once sockets are enabled. The client's concurrency
+    and rate limits are raised so they do not slow the tests down.
+    """
+    servers: List[TestServer] = []
+    clients: List[TfNSWCarParkAPI] = []
+
+    async def start(**options: Any) -> TfNSWCarParkAPI:
+        """Serve the mock API with create_app's options."""
+        server = TestServer(create_app(**options), host="127.0.0.1")
+        await server.start_server()
+        servers.append(server)
+        api = TfNSWCarParkAPI(
+            "test",
+            max_concurrency=32,
+            requests_per_second=10000,
+            base_url=str(server.make_url("/v1/carpark")),
+        )
+        clients.append(api)
+        return api
+
+    yield start
+    for api in clients:
+        await api.close()
+    for server in servers:
+        await server.close()
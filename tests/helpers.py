@@ -0,0 +1,97 @@
+"""Home Assistant side setup shared by the coordinator tests and benchmarks."""
+from __future__ import annotations
+
+from typing import Any, List, Optional
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    MockEntityPlatform,
+)
+
+from aus_tfnsw_carparks.api import ConnectionStats, TfNSWCarParkAPI
+from aus_tfnsw_carparks.const import CONF_SELECTED_CARPARKS, DOMAIN
+from aus_tfnsw_carparks.coordinator import TfNSWCarParkCoordinator
+from aus_tfnsw_carparks.directory import FacilityDirectory
+from aus_tfnsw_carparks.history import OccupancyHistory
+from aus_tfnsw_carparks.sensor import (
+    TfNSWCarParkForecastSensor,
+    TfNSWCarParkSensor,
+)
+from aus_tfnsw_carparks.thresholds import ThresholdMonitor
+
+SENSOR_TYPES = (
+    "available_spots",
+    "total_spots",
+    "occupied_spots",
+    "occupancy_percentage",
+)
+
+
+def create_entry(facilities: int, **data: Any) -> MockConfigEntry:
+    """Return a config entry selecting the mock API's first facilities."""
+    carpark_ids = [str(index) for index in range(1, facilities + 1)]
+    return MockConfigEntry(
+        domain=DOMAIN, data={CONF_SELECTED_CARPARKS: carpark_ids, **data}
+    )
+
+
+async def async_create_coordinator(
+    hass: HomeAssistant,
+    api: TfNSWCarParkAPI,
+    facilities: int,
+    entry: Optional[MockConfigEntry] = None,
+    **data: Any,
+) -> TfNSWCarParkCoordinator:
+    """Return a coordinator tracking the mock API's first facilities."""
+    if entry is None:
+        entry = create_entry(facilities, **data)
+    carpark_ids = entry.data[CONF_SELECTED_CARPARKS]
+    directory = FacilityDirectory(hass)
+    # Names come from the payloads, skip the background list refresh
+    directory.fetched_at = dt_util.utcnow().timestamp()
+    history = OccupancyHistory(hass)
+    await history.async_load(carpark_ids)
+    thresholds = ThresholdMonitor(hass)
+    await thresholds.async_load()
+    return TfNSWCarParkCoordinator(
+        hass, entry, api, directory, history, thresholds, ConnectionStats()
+    )
+
+
+def create_sensors(coordinator: TfNSWCarParkCoordinator) -> List[TfNSWCarParkSensor]:
+    """Return the sensors async_setup_entry would add for each car park."""
+    sensors: List[TfNSWCarParkSensor] = []
+    for carpark_id, facility in coordinator.facilities.items():
+        sensors.extend(
+            TfNSWCarParkSensor(facility, carpark_id, carpark_id, sensor_type)
+            for sensor_type in SENSOR_TYPES
+        )
+        sensors.append(
+            TfNSWCarParkForecastSensor(
+                facility, carpark_id, carpark_id, "predicted_full"
+            )
+        )
+    return sensors
+
+
+async def async_add_sensors(
+    hass: HomeAssistant, sensors: List[TfNSWCarParkSensor]
+) -> None:
+    """Add sensors to Home Assistant, so coordinator updates write their state."""
+    platform = MockEntityPlatform(hass, domain="sensor", platform_name=DOMAIN)
+    await platform.async_add_entities(sensors)
+
+
+def read_sensors(sensors: List[TfNSWCarParkSensor]) -> int:
+    """Read every sensor's state and attributes as a state write would.
+
+    Returns how many sensors had a value.
+    """
+    values = 0
+    for sensor in sensors:
+        if sensor.native_value is not None:
+            values += 1
+        sensor.extra_state_attributes
+    return values
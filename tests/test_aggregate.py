@@ -0,0 +1,120 @@
+"""Tests for group totals."""
+from __future__ import annotations
+
+import random
+from typing import Dict, Optional
+
+import pytest
+
+from aus_tfnsw_carparks.aggregate import GroupTotals, format_groups, parse_groups
+from aus_tfnsw_carparks.models import CarParkSnapshot
+
+
+def _snapshot(carpark_id: str, capacity: int, occupied: int) -> CarParkSnapshot:
+    """Return a snapshot with the given capacity and occupancy."""
+    return CarParkSnapshot.from_payload(
+        carpark_id,
+        {"spots": str(capacity), "occupancy": {"total": str(occupied)}},
+    )
+
+
+def test_totals_follow_members() -> None:
+    """Totals move as members report, change and leave."""
+    totals = GroupTotals("custom_north", "North")
+    totals.add_member("1")
+    totals.add_member("2")
+    assert totals.members == 2
+    assert totals.occupancy_percentage is None
+
+    assert totals.update("1", _snapshot("1", 100, 40))
+    assert totals.update("2", _snapshot("2", 300, 260))
+    assert (totals.total_capacity, totals.occupied, totals.available) == (
+        400,
+        300,
+        100,
+    )
+    assert totals.reporting == 2
+    assert totals.occupancy_percentage == 75.0
+
+    assert totals.update("1", _snapshot("1", 100, 90))
+    assert (totals.occupied, totals.available) == (350, 50)
+
+    assert totals.remove_member("2")
+    assert totals.members == 1
+    assert (totals.total_capacity, totals.occupied, totals.reporting) == (
+        100,
+        90,
+        1,
+    )
+
+
+def test_unchanged_update_keeps_version() -> None:
+    """An update that does not move the totals is reported as such."""
+    totals = GroupTotals("custom_north", "North")
+    assert totals.update("1", _snapshot("1", 100, 40))
+    version = totals.version
+    assert not totals.update("1", _snapshot("1", 100, 40))
+    assert not totals.remove_member("2")
+    assert totals.version == version
+
+
+def test_stale_and_missing_members() -> None:
+    """Stale members are counted, members without data are not."""
+    totals = GroupTotals("custom_north", "North")
+    snapshot = _snapshot("1", 100, 40)
+    totals.update("1", snapshot)
+    assert totals.update("1", snapshot.as_stale())
+    assert (totals.reporting, totals.stale, totals.occupied) == (1, 1, 40)
+
+    assert totals.update("1", None)
+    assert (totals.reporting, totals.stale, totals.total_capacity) == (0, 0, 0)
+    assert totals.members == 1
+
+
+def test_running_totals_match_recomputed() -> None:
+    """Incremental totals equal totals summed from scratch."""
+    rng = random.Random(3)
+    totals = GroupTotals("suburb_gordon", "Gordon")
+    latest: Dict[str, Optional[CarParkSnapshot]] = {}
+    for _ in range(2000):
+        carpark_id = str(rng.randint(1, 30))
+        action = rng.random()
+        if action < 0.1:
+            totals.remove_member(carpark_id)
+            latest.pop(carpark_id, None)
+            continue
+        if action < 0.2:
+            snapshot = None
+        else:
+            capacity = rng.randint(0, 500)
+            snapshot = _snapshot(carpark_id, capacity, rng.randint(0, capacity))
+            if action < 0.3:
+                snapshot = snapshot.as_stale()
+        totals.update(carpark_id, snapshot)
+        latest[carpark_id] = snapshot
+
+    reporting = [s for s in latest.values() if s is not None]
+    assert totals.members == len(latest)
+    assert totals.total_capacity == sum(s.total_capacity for s in reporting)
+    assert totals.occupied == sum(s.occupied for s in reporting)
+    assert totals.available == sum(s.available for s in reporting)
+    assert totals.reporting == len(reporting)
+    assert totals.stale == sum(s.stale for s in reporting)
+
+
+def test_parse_groups() -> None:
+    """Groups are read one per line, ignoring blanks and duplicate ids."""
+    text = "North: 1, 2,2\n\n  Station car parks :487,486,  "
+    groups = parse_groups(text)
+    assert groups == {"North": ["1", "2"], "Station car parks": ["487", "486"]}
+    assert parse_groups(format_groups(groups)) == groups
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["North 1, 2", ": 1, 2", "North:", "North: ,", "North: 1\nNorth: 2"],
+)
+def test_parse_groups_rejects(text: str) -> None:
+    """Malformed lines and repeated names are rejected."""
+    with pytest.raises(ValueError):
+        parse_groups(text)
@@ -0,0 +1,125 @@
+"""Tests for the API client's shared request handling."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from aus_tfnsw_carparks import api
+from aus_tfnsw_carparks.api import CircuitBreaker, CircuitOpenError, RequestCoalescer
+
+
+def _coalescer(*api_keys: str, working=(), key_cooldown=900) -> RequestCoalescer:
+    """Return a coalescer with registered and proven keys."""
+    coalescer = RequestCoalescer(key_cooldown=key_cooldown)
+    for api_key in api_keys:
+        coalescer.register_key(api_key)
+    for api_key in working:
+        coalescer.record_key_success(api_key)
+    return coalescer
+
+
+def test_rotation_shares_working_keys() -> None:
+    """Keys that worked are shared, unproven keys only serve their owner."""
+    coalescer = _coalescer("a", "b", "c", working=("a", "b"))
+    assert {coalescer.next_key("a") for _ in range(6)} == {"a", "b"}
+    assert {coalescer.next_key("c") for _ in range(6)} == {"a", "b", "c"}
+
+
+def test_rejected_key_sits_out() -> None:
+    """A rejected key leaves the rotation, even for its owner, for a while."""
+    coalescer = _coalescer("a", "b", working=("a", "b"))
+    coalescer.record_key_rejected("b")
+    assert {coalescer.next_key("a") for _ in range(4)} == {"a"}
+    assert {coalescer.next_key("b") for _ in range(4)} == {"a"}
+
+    coalescer.record_key_rejected("a")
+    assert coalescer.next_key("b") == "b"
+
+
+def test_rejected_key_returns_after_cooldown() -> None:
+    """After the cool-down the owner may try its key again."""
+    coalescer = _coalescer("a", "b", working=("a", "b"), key_cooldown=0)
+    coalescer.record_key_rejected("b")
+    assert {coalescer.next_key("a") for _ in range(4)} == {"a"}
+    assert {coalescer.next_key("b") for _ in range(4)} == {"a", "b"}
+    coalescer.record_key_success("b")
+    assert {coalescer.next_key("a") for _ in range(4)} == {"a", "b"}
+
+
+def test_unregister_keeps_shared_key() -> None:
+    """A key stays proven while another client still holds it."""
+    coalescer = _coalescer("a", "a", "b", working=("a", "b"))
+    coalescer.unregister_key("a")
+    assert {coalescer.next_key("b") for _ in range(4)} == {"a", "b"}
+    coalescer.unregister_key("a")
+    assert {coalescer.next_key("b") for _ in range(4)} == {"b"}
+
+
+def test_fetch_coalesces_concurrent_requests() -> None:
+    """Concurrent fetches of a facility share one upstream request."""
+    calls = []
+
+    async def fetch():
+        calls.append(None)
+        await asyncio.sleep(0)
+        return {"facility_id": "486"}
+
+    async def run():
+        coalescer = RequestCoalescer()
+        first, second = await asyncio.gather(
+            coalescer.fetch("486", fetch), coalescer.fetch("486", fetch)
+        )
+        third = await coalescer.fetch("486", fetch)
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert len(calls) == 1
+    assert first == ({"facility_id": "486"}, False)
+    assert second == third == ({"facility_id": "486"}, True)
+
+
+def test_fetch_does_not_cache_failures() -> None:
+    """A failed fetch is retried by the next caller."""
+    results = [None, {"facility_id": "486"}]
+
+    async def fetch():
+        return results.pop(0)
+
+    async def run():
+        coalescer = RequestCoalescer()
+        return [await coalescer.fetch("486", fetch) for _ in range(2)]
+
+    assert asyncio.run(run()) == [(None, False), ({"facility_id": "486"}, False)]
+
+
+def test_half_open_circuit_admits_one_trial(monkeypatch) -> None:
+    """After the reset timeout one trial goes through and the rest wait on it."""
+    clock = [0.0]
+    monkeypatch.setattr(api.time, "monotonic", lambda: clock[0])
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.check()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    clock[0] = 60
+    breaker.check()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    # A failed trial reopens the circuit for a full timeout
+    breaker.record_failure()
+    clock[0] = 119
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    # A trial that never reports back gives way to the next one
+    clock[0] = 120
+    breaker.check()
+    clock[0] = 180
+    breaker.check()
+    breaker.record_success()
+    breaker.check()
+    breaker.check()
+    assert not breaker.is_open
@@ -0,0 +1,60 @@
+"""Tests for the refresh coordinator."""
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.const import EVENT_HOMEASSISTANT_FINAL_WRITE  # noqa: E402
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+from aus_tfnsw_carparks.const import (  # noqa: E402
+    BULK_REFRESH_THRESHOLD,
+    CONF_DAILY_REQUEST_BUDGET,
+    MIN_DAILY_REQUEST_BUDGET,
+)
+from aus_tfnsw_carparks.scheduler import RequestBudget  # noqa: E402
+
+from .helpers import async_create_coordinator, create_entry  # noqa: E402
+
+FACILITIES = BULK_REFRESH_THRESHOLD + 5
+
+
+async def test_declined_bulk_probe(hass: HomeAssistant, mock_api) -> None:
+    """A declined bulk probe is remembered and costs no car park its data."""
+    api = await mock_api(facilities=FACILITIES)
+    entry = create_entry(FACILITIES)
+    coordinator = await async_create_coordinator(hass, api, FACILITIES, entry)
+    await coordinator.async_refresh()
+    assert len(coordinator.data) == FACILITIES
+    assert api.metrics.requests == FACILITIES + 1
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_FINAL_WRITE)
+    await hass.async_block_till_done()
+
+    # After a restart the car parks are fetched one by one straight away
+    restarted = await async_create_coordinator(hass, api, FACILITIES, entry)
+    assert await restarted.async_restore()
+    assert not restarted.use_bulk
+    await restarted.async_refresh()
+    assert api.metrics.requests == 2 * FACILITIES + 1
+    assert not any(snapshot.stale for snapshot in restarted.data.values())
+
+
+async def test_every_request_draws_on_the_budget(
+    hass: HomeAssistant, mock_api
+) -> None:
+    """The bulk probe and retries are counted against the request budget."""
+    api = await mock_api(facilities=FACILITIES, error_rate=0.1)
+    api.budget = RequestBudget()
+    coordinator = await async_create_coordinator(
+        hass,
+        api,
+        FACILITIES,
+        **{CONF_DAILY_REQUEST_BUDGET: MIN_DAILY_REQUEST_BUDGET},
+    )
+    await coordinator.async_refresh()
+    assert api.metrics.retries
+    # The burst is one sweep and a probe, and next to nothing accrues
+    assert api.budget._tokens == pytest.approx(
+        FACILITIES + 1 - api.metrics.requests, abs=0.01
+    )
@@ -0,0 +1,71 @@
+"""Tests for occupancy forecasting."""
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("homeassistant")
+np = pytest.importorskip("numpy")
+
+from aus_tfnsw_carparks.const import (  # noqa: E402
+    FORECAST_HORIZON,
+    FORECAST_STEP,
+)
+from aus_tfnsw_carparks.forecast import ForecastEngine  # noqa: E402
+from aus_tfnsw_carparks.models import CarParkSnapshot  # noqa: E402
+
+START = 1_772_409_600  # Monday 2026-03-02 00:00 UTC
+
+
+def _snapshot(carpark_id: str, occupied: int) -> CarParkSnapshot:
+    """Return a snapshot of a 100 spot car park."""
+    return CarParkSnapshot.from_payload(
+        carpark_id, {"spots": "100", "occupancy": {"total": str(occupied)}}
+    )
+
+
+def _hourly(profile) -> tuple:
+    """Return hourly columns for four weeks following a 24 hour profile."""
+    start = START - 4 * 7 * 86400 + np.arange(4 * 7 * 24) * 3600.0
+    total = np.array([profile[int(hour) % 24] for hour in start / 3600])
+    return start, total, np.ones_like(start)
+
+
+def test_steps_are_aligned() -> None:
+    """Step times sit on step boundaries, so refreshes within a step agree."""
+    engine = ForecastEngine()
+    engine.build_profiles([None], ["486"], START, 0)
+    snapshots = {"486": _snapshot("486", 40)}
+
+    first = engine.forecast(snapshots, START + 10, 0)["486"]
+    second = engine.forecast(snapshots, START + FORECAST_STEP - 10, 0)["486"]
+    assert first.times[0] == START + FORECAST_STEP
+    assert len(first.times) == FORECAST_HORIZON // FORECAST_STEP
+    assert all(time % FORECAST_STEP == 0 for time in first.times)
+    assert first.times == second.times
+    assert first.fingerprint == second.fingerprint
+
+    # Without a profile occupancy is assumed to stay put
+    assert set(first.occupied) == {40}
+    assert first.predict_full_time is None
+    assert engine.forecast(snapshots, START + FORECAST_STEP, 0)["486"].times != (
+        first.times
+    )
+
+
+def test_forecast_follows_profile() -> None:
+    """A car park that fills every morning is predicted to fill again."""
+    profile = [5] * 6 + [30, 70, 99] + [99] * 8 + [40] * 7
+    engine = ForecastEngine()
+    engine.build_profiles([_hourly(profile), None], ["486", "487"], START, 0)
+    assert not engine.profiles_stale(["486", "487"], START + 60)
+    assert engine.profiles_stale(["486"], START + 60)
+
+    now = START + 6 * 3600
+    forecasts = engine.forecast(
+        {"486": _snapshot("486", 30), "487": _snapshot("487", 30)}, now, 0
+    )
+    filling = forecasts["486"]
+    assert filling.predict_full_time is not None
+    assert now + 3600 < filling.predict_full_time <= now + 3 * 3600
+    assert list(filling.occupied) == sorted(filling.occupied)
+    assert forecasts["487"].predict_full_time is None
@@ -0,0 +1,126 @@
+"""Tests for the local occupancy history."""
+from __future__ import annotations
+
+from datetime import timedelta
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+from homeassistant.util import dt as dt_util  # noqa: E402
+from pytest_homeassistant_custom_component.common import (  # noqa: E402
+    async_fire_time_changed,
+)
+
+from aus_tfnsw_carparks.history import (  # noqa: E402
+    SAVE_DELAY,
+    STORAGE_KEY,
+    OccupancyHistory,
+    OccupancySeries,
+    Rollup,
+)
+from aus_tfnsw_carparks.models import CarParkSnapshot  # noqa: E402
+
+START = 1_772_409_600  # A Monday, on a day boundary
+
+
+def _snapshot(occupied: int) -> CarParkSnapshot:
+    """Return a snapshot of a car park with one zone."""
+    return CarParkSnapshot.from_payload(
+        "486",
+        {
+            "spots": "500",
+            "occupancy": {"total": str(occupied)},
+            "zones": [{"zone_id": "1", "occupancy": {"total": str(occupied // 2)}}],
+        },
+    )
+
+
+def test_rollup_buckets() -> None:
+    """Samples fold into their bucket's mean, minimum and maximum."""
+    rollup = Rollup(300, 10)
+    for offset, value in ((0, 10), (100, 30), (299, 20), (300, 50)):
+        rollup.add(START + offset, value)
+    # Out of order samples are dropped
+    rollup.add(START, 99)
+
+    assert rollup.query(START, START + 300) == [
+        {"time": START, "mean": 20.0, "min": 10, "max": 30},
+        {"time": START + 300, "mean": 50.0, "min": 50, "max": 50},
+    ]
+    assert rollup.query(START + 150, START + 299) == [
+        {"time": START, "mean": 20.0, "min": 10, "max": 30}
+    ]
+
+
+def test_rollup_retention() -> None:
+    """Old buckets are trimmed once retention is overshot."""
+    rollup = Rollup(300, 100)
+    for index in range(200):
+        rollup.add(START + index * 300, index)
+    assert 100 <= len(rollup.start) <= 110
+    assert rollup.start[-1] == START + 199 * 300
+    assert not rollup.covers(START)
+
+
+def test_young_history_resolution() -> None:
+    """A young history is queried at the finest resolution retaining the range."""
+    series = OccupancySeries()
+    for index in range(24):
+        series.add(START + index * 3600, index)
+    end = START + 23 * 3600
+
+    assert series.resolution_for(end - 86400 * 2) == "5min"
+    assert series.resolution_for(end - 86400 * 30) == "hour"
+    assert series.resolution_for(end - 86400 * 365) == "day"
+    assert series.resolution_for(end - 86400 * 1000) == "5min"
+    assert OccupancySeries().resolution_for(end) == "day"
+
+
+def test_rollup_round_trip() -> None:
+    """A rollup restores exactly from its stored form."""
+    rollup = Rollup(3600, 10)
+    for index in range(5):
+        rollup.add(START + index * 1800, index * 7)
+    restored = Rollup(3600, 10)
+    restored.load(rollup.as_dict())
+    assert restored.query(0, START * 2) == rollup.query(0, START * 2)
+
+
+async def test_history_saves_while_recording(
+    hass: HomeAssistant, hass_storage
+) -> None:
+    """Samples arriving every tick do not hold back the delayed save."""
+    history = OccupancyHistory(hass)
+    await history.async_load(["486"])
+    now = dt_util.utcnow()
+    key = f"{STORAGE_KEY}.486"
+
+    history.async_record(START, _snapshot(100))
+    for step in range(1, 5):
+        async_fire_time_changed(hass, now + timedelta(seconds=step * SAVE_DELAY / 5))
+        await hass.async_block_till_done()
+        history.async_record(START + step * 60, _snapshot(100 + step))
+        assert key not in hass_storage
+
+    async_fire_time_changed(hass, now + timedelta(seconds=SAVE_DELAY + 1))
+    await hass.async_block_till_done()
+    assert key in hass_storage
+
+    reloaded = OccupancyHistory(hass)
+    await reloaded.async_load(["486"])
+    for zone_id in (None, "1"):
+        assert reloaded.query("486", zone_id, START, START + 3600) == (
+            history.query("486", zone_id, START, START + 3600)
+        )
+    assert reloaded.query("486", None, START, START + 300)[1] == [
+        {"time": START, "mean": 102.0, "min": 100, "max": 104}
+    ]
+
+
+async def test_history_skips_missing_values(hass: HomeAssistant) -> None:
+    """Snapshots without an occupancy add nothing."""
+    history = OccupancyHistory(hass)
+    history.async_record(START, CarParkSnapshot.from_payload("486", {}))
+    assert history.query("486", None, START, START + 60) == (None, [])
@@ -0,0 +1,174 @@
+"""Tests for the adaptive polling scheduler."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from aus_tfnsw_carparks.const import BACKOFF_FACTOR
+from aus_tfnsw_carparks.scheduler import PollScheduler, RequestBudget
+
+NOW = datetime(2026, 3, 2, 8, 0, tzinfo=timezone.utc)
+
+
+def _scheduler(
+    facility_ids=("1", "2"), daily_budget=86400, **kwargs
+) -> PollScheduler:
+    """Return a scheduler with the default intervals spelled out."""
+    return PollScheduler(
+        facility_ids,
+        daily_budget,
+        default_interval=300,
+        min_interval=60,
+        max_interval=1800,
+        **kwargs,
+    )
+
+
+def test_everything_due_at_start() -> None:
+    """Every facility is due on the first tick, inside the startup burst."""
+    scheduler = _scheduler(("3", "1", "2"), daily_budget=10)
+    assert scheduler.due(NOW) == ["1", "2", "3"]
+    # The burst keeps one token for a bulk probe
+    assert scheduler.due(NOW) == ["1"]
+    assert scheduler.due(NOW) == []
+
+
+def test_changed_data_follows_cadence() -> None:
+    """The interval moves towards the upstream update cadence."""
+    scheduler = _scheduler(("1",))
+    scheduler.due(NOW)
+    scheduler.record("1", NOW, 1, "2026-03-02T08:00:00+00:00", None)
+    assert scheduler.due(NOW + timedelta(seconds=299)) == []
+
+    later = NOW + timedelta(seconds=300)
+    assert scheduler.due(later) == ["1"]
+    scheduler.record("1", later, 2, "2026-03-02T08:02:00+00:00", None)
+    # 300s smoothed towards the 120s between messages
+    assert scheduler.due(later + timedelta(seconds=245)) == []
+    assert scheduler.due(later + timedelta(seconds=246)) == ["1"]
+
+
+def test_unchanged_data_backs_off() -> None:
+    """An unchanged fingerprint stretches the interval."""
+    scheduler = _scheduler(("1",))
+    scheduler.due(NOW)
+    scheduler.record("1", NOW, 1, None, None)
+    later = NOW + timedelta(seconds=300)
+    assert scheduler.due(later) == ["1"]
+    scheduler.record("1", later, 1, None, None)
+
+    backoff = 300 * BACKOFF_FACTOR
+    assert scheduler.due(later + timedelta(seconds=backoff - 1)) == []
+    assert scheduler.due(later + timedelta(seconds=backoff)) == ["1"]
+
+
+def test_backoff_is_capped() -> None:
+    """Backing off never goes past the maximum interval."""
+    scheduler = _scheduler(("1",))
+    now = NOW
+    for _ in range(20):
+        assert scheduler.due(now) == ["1"]
+        scheduler.record("1", now, 1, None, None)
+        now += timedelta(seconds=1800)
+
+
+def test_failure_retries_at_minimum_interval() -> None:
+    """A failed facility is retried after the minimum interval."""
+    scheduler = _scheduler()
+    scheduler.due(NOW)
+    scheduler.record("1", NOW, 1, None, None)
+    scheduler.record_failure("2", NOW)
+    assert scheduler.due(NOW + timedelta(seconds=59)) == []
+    assert scheduler.due(NOW + timedelta(seconds=60)) == ["2"]
+
+
+def test_budget_limits_requests() -> None:
+    """Once the burst is spent, tokens accrue at the daily budget's rate."""
+    facility_ids = ("a", "b", "c", "d")
+    # One request per 100 seconds
+    scheduler = _scheduler(facility_ids, daily_budget=864)
+    assert len(scheduler.due(NOW)) == 4
+    assert scheduler.bulk_due(NOW)
+    for facility_id in facility_ids:
+        scheduler.record_failure(facility_id, NOW)
+
+    assert scheduler.due(NOW + timedelta(seconds=60)) == []
+    assert scheduler.due(NOW + timedelta(seconds=160)) == ["a"]
+    scheduler.record_failure("a", NOW + timedelta(seconds=160))
+    assert scheduler.due(NOW + timedelta(seconds=260)) == ["b"]
+
+
+def test_bulk_due() -> None:
+    """A bulk request needs a facility to be due."""
+    scheduler = _scheduler()
+    assert scheduler.bulk_due(NOW)
+    scheduler.record("1", NOW, 1, None, None)
+    scheduler.record("2", NOW, 2, None, None)
+    assert not scheduler.bulk_due(NOW + timedelta(seconds=1))
+    assert scheduler.bulk_due(NOW + timedelta(seconds=300))
+
+
+def test_bulk_due_costs_one_token() -> None:
+    """A bulk request covers every facility for a single token."""
+    scheduler = _scheduler(("1", "2"), daily_budget=1)
+    for _ in range(3):
+        assert scheduler.bulk_due(NOW)
+    assert not scheduler.bulk_due(NOW)
+
+
+def test_bulk_probe_leaves_a_full_sweep() -> None:
+    """A declined bulk probe still leaves the burst for a full sweep."""
+    scheduler = _scheduler(("1", "2"), daily_budget=1)
+    assert scheduler.bulk_due(NOW)
+    assert scheduler.due(NOW) == ["1", "2"]
+
+
+def test_unreserved_requests_hold_back_polls() -> None:
+    """Retries and other unscheduled requests are paid for by later polls."""
+    scheduler = _scheduler(("1",), daily_budget=864)
+    assert scheduler.due(NOW) == ["1"]
+    scheduler.record_failure("1", NOW)
+    for _ in range(3):
+        scheduler.budget.charge()
+
+    # One spare token, three charged, so two are owed at 100s each
+    assert scheduler.due(NOW + timedelta(seconds=299)) == []
+    assert scheduler.due(NOW + timedelta(seconds=300)) == ["1"]
+
+
+def test_refunded_polls_are_not_counted() -> None:
+    """A reserved poll that was not sent goes back to the budget."""
+    scheduler = _scheduler(("1", "2"), daily_budget=1)
+    assert scheduler.due(NOW) == ["1", "2"]
+    assert scheduler.bulk_due(NOW)
+    scheduler.budget.refund()
+    assert scheduler.bulk_due(NOW)
+    assert not scheduler.bulk_due(NOW)
+
+
+def test_budget_shared_between_entries() -> None:
+    """Entries draw on one budget, at one rate per API key."""
+    budget = RequestBudget()
+    first = _scheduler(("1",), daily_budget=864, budget=budget, api_key="a")
+    second = _scheduler(("2",), daily_budget=1728, budget=budget, api_key="a")
+    assert first.due(NOW) == ["1"]
+    assert second.due(NOW) == ["2"]
+    assert second.bulk_due(NOW)
+    assert first.bulk_due(NOW)
+    assert not second.bulk_due(NOW)
+
+    # Both use key a, so its smallest budget applies: one per 100 seconds
+    assert not first.bulk_due(NOW + timedelta(seconds=99))
+    assert second.bulk_due(NOW + timedelta(seconds=100))
+
+    # A second key adds its budget: one per 50 seconds between them
+    third = _scheduler(("3",), daily_budget=864, budget=budget, api_key="b")
+    assert third.due(NOW + timedelta(seconds=100)) == ["3"]
+    assert third.bulk_due(NOW + timedelta(seconds=100))
+    assert not first.bulk_due(NOW + timedelta(seconds=100))
+    assert not first.bulk_due(NOW + timedelta(seconds=149))
+    assert first.bulk_due(NOW + timedelta(seconds=150))
+
+    third.close()
+    second.close()
+    assert not first.bulk_due(NOW + timedelta(seconds=200))
+    assert first.bulk_due(NOW + timedelta(seconds=250))
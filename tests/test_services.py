@@ -0,0 +1,58 @@
+"""Tests for the integration's services."""
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+from homeassistant.exceptions import ServiceValidationError  # noqa: E402
+
+from aus_tfnsw_carparks.const import DOMAIN, SERVICE_GET_HISTORY  # noqa: E402
+from aus_tfnsw_carparks.history import async_get_history  # noqa: E402
+from aus_tfnsw_carparks.models import CarParkSnapshot  # noqa: E402
+from aus_tfnsw_carparks.services import async_setup_services  # noqa: E402
+
+from .helpers import create_entry  # noqa: E402
+
+START = 1_772_409_600
+
+
+async def test_get_history_of_tracked_carpark(hass: HomeAssistant) -> None:
+    """History is returned for car parks a config entry tracks."""
+    create_entry(2).add_to_hass(hass)
+    async_setup_services(hass)
+    history = await async_get_history(hass, ["2"])
+    history.async_record(
+        START, CarParkSnapshot.from_payload("2", {"occupancy": {"total": "7"}})
+    )
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_GET_HISTORY,
+        {"carpark_id": "2", "days": 3650},
+        blocking=True,
+        return_response=True,
+    )
+    assert response["resolution"] == "5min"
+    assert [point["mean"] for point in response["points"]] == [7.0]
+
+
+async def test_get_history_rejects_untracked_carpark(
+    hass: HomeAssistant, hass_storage
+) -> None:
+    """Untracked ids are rejected before any storage is touched."""
+    create_entry(2).add_to_hass(hass)
+    async_setup_services(hass)
+
+    with pytest.raises(ServiceValidationError):
+        await hass.services.async_call(
+            DOMAIN,
+            SERVICE_GET_HISTORY,
+            {"carpark_id": "../3"},
+            blocking=True,
+            return_response=True,
+        )
+    history = await async_get_history(hass)
+    assert not history.series
+    assert not hass_storage
@@ -0,0 +1,102 @@
+"""Tests for the shared snapshot file."""
+from __future__ import annotations
+
+import os
+import time
+
+import pytest
+
+from aus_tfnsw_carparks.snapshot_file import (
+    MAGIC,
+    SnapshotFileError,
+    SnapshotFileReader,
+    read_snapshot_file,
+    read_snapshot_header,
+    write_snapshot_file,
+)
+
+PAYLOADS = {
+    "486": {"facility_name": "Park&Ride - Gordon", "occupancy": {"total": "12"}},
+    "487": {"facility_name": "Park&Ride - Kiama", "occupancy": {"total": "3"}},
+    "488": {"facility_name": "Park&Ride - Gosford", "occupancy": {"total": "0"}},
+}
+
+
+def test_round_trip(tmp_path) -> None:
+    """Payloads read back as written, with the header describing them."""
+    path = str(tmp_path / "snapshot.bin")
+    write_snapshot_file(path, PAYLOADS, generation=7)
+    assert read_snapshot_file(path) == PAYLOADS
+
+    with open(path, "rb") as file:
+        generation, written_at, count = read_snapshot_header(file.read())
+    assert generation == 7
+    assert count == len(PAYLOADS)
+    assert written_at == pytest.approx(time.time(), abs=60)
+    assert not [name for name in os.listdir(tmp_path) if name != "snapshot.bin"]
+
+
+def test_oversized_ids_are_skipped(tmp_path) -> None:
+    """Ids too long for the index are left out rather than truncated."""
+    path = str(tmp_path / "snapshot.bin")
+    write_snapshot_file(path, {"x" * 40: {}, "486": PAYLOADS["486"]}, 1)
+    assert read_snapshot_file(path) == {"486": PAYLOADS["486"]}
+
+
+@pytest.mark.parametrize(
+    "data",
+    [b"", MAGIC, b"NOTASNAP" + bytes(32), MAGIC + b"\x09\x00" + bytes(30)],
+)
+def test_bad_header(data: bytes) -> None:
+    """Short files, foreign files and other versions are rejected."""
+    with pytest.raises(SnapshotFileError):
+        read_snapshot_header(data)
+
+
+def test_reader_returns_changed_payloads(tmp_path) -> None:
+    """The reader only decodes wanted payloads whose checksum moved."""
+    path = str(tmp_path / "snapshot.bin")
+    write_snapshot_file(path, PAYLOADS, 1)
+    reader = SnapshotFileReader(path)
+    assert sorted(reader.read(["486", "487"])) == [
+        ("486", PAYLOADS["486"]),
+        ("487", PAYLOADS["487"]),
+    ]
+    assert reader.read(["486", "487"]) == []
+
+    changed = {"total": "13"}
+    write_snapshot_file(path, {**PAYLOADS, "486": {"occupancy": changed}}, 2)
+    assert reader.read(["486", "487"]) == [("486", {"occupancy": changed})]
+    assert not reader.stale
+
+
+def test_reader_flags_missing_file_once(tmp_path) -> None:
+    """A missing file reports every facility once, then recovers."""
+    path = str(tmp_path / "snapshot.bin")
+    reader = SnapshotFileReader(path)
+    assert sorted(reader.read(["486", "487"])) == [("486", None), ("487", None)]
+    assert reader.stale
+    assert reader.read(["486", "487"]) == []
+
+    write_snapshot_file(path, PAYLOADS, 1)
+    assert len(reader.read(["486", "487"])) == 2
+    assert not reader.stale
+
+
+def test_reader_flags_old_file(tmp_path) -> None:
+    """A file that stops being updated is reported stale."""
+    path = str(tmp_path / "snapshot.bin")
+    write_snapshot_file(path, PAYLOADS, 1)
+    reader = SnapshotFileReader(path, max_age=0)
+    time.sleep(0.01)
+    assert sorted(reader.read(["486"])) == [("486", None)]
+    assert reader.stale
+
+
+def test_reader_flags_corrupt_file(tmp_path) -> None:
+    """A file that cannot be parsed is reported stale."""
+    path = tmp_path / "snapshot.bin"
+    path.write_bytes(b"not a snapshot file at all, just some bytes")
+    reader = SnapshotFileReader(str(path))
+    assert reader.read(["486"]) == [("486", None)]
+    assert reader.stale
@@ -0,0 +1,50 @@
+"""Tests for nearest car park lookups."""
+from __future__ import annotations
+
+import random
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from aus_tfnsw_carparks.spatial import SpatialIndex, haversine_km  # noqa: E402
+
+
+def test_haversine() -> None:
+    """Distances match known values."""
+    assert haversine_km(-33.87, 151.2, -33.87, 151.2) == 0
+    # Sydney to Melbourne
+    assert haversine_km(-33.8688, 151.2093, -37.8136, 144.9631) == pytest.approx(
+        713.4, abs=1
+    )
+
+
+@pytest.mark.parametrize("cell_size", [0.01, 0.05, 1.0])
+def test_nearest_matches_brute_force(cell_size: float) -> None:
+    """The grid search returns what a full scan would."""
+    rng = random.Random(5)
+    points = [
+        (str(index), -33.87 + rng.uniform(-0.8, 0.8), 151.0 + rng.uniform(-0.8, 0.8))
+        for index in range(400)
+    ]
+    index = SpatialIndex(points, cell_size)
+    assert index.size == len(points)
+
+    for _ in range(50):
+        latitude = -33.87 + rng.uniform(-1.2, 1.2)
+        longitude = 151.0 + rng.uniform(-1.2, 1.2)
+        expected = sorted(
+            (haversine_km(latitude, longitude, lat, lon), point_id)
+            for point_id, lat, lon in points
+        )
+        assert index.nearest(latitude, longitude, 5) == expected[:5]
+
+
+def test_nearest_with_filter() -> None:
+    """Rejected points are skipped and short results are returned as is."""
+    points = [("1", -33.80, 151.00), ("2", -33.81, 151.00), ("3", -34.5, 151.5)]
+    index = SpatialIndex(points)
+    nearest = index.nearest(-33.80, 151.00, 5, lambda point_id: point_id != "1")
+    assert [point_id for _, point_id in nearest] == ["2", "3"]
+    assert index.nearest(-33.80, 151.00, 0) == []
+    assert SpatialIndex([]).nearest(-33.80, 151.00, 3) == []
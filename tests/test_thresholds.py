@@ -0,0 +1,128 @@
+"""Tests for availability threshold events."""
+from __future__ import annotations
+
+from typing import Optional
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+from pytest_homeassistant_custom_component.common import (  # noqa: E402
+    async_capture_events,
+    async_fire_time_changed,
+)
+
+from aus_tfnsw_carparks.const import EVENT_THRESHOLD  # noqa: E402
+from aus_tfnsw_carparks.models import CarParkSnapshot  # noqa: E402
+from aus_tfnsw_carparks.thresholds import ThresholdMonitor  # noqa: E402
+
+
+def _snapshot(
+    available: int, zone_available: int = 100, fingerprint: Optional[int] = None
+) -> CarParkSnapshot:
+    """Return a 100 spot car park with one 200 spot zone."""
+    return CarParkSnapshot.from_payload(
+        "486",
+        {
+            "facility_name": "Park&Ride - Gordon",
+            "spots": "100",
+            "occupancy": {"total": str(100 - available)},
+            "zones": [
+                {
+                    "zone_id": "1",
+                    "zone_name": "Level 1",
+                    "spots": "200",
+                    "occupancy": {"total": str(200 - zone_available)},
+                }
+            ],
+        },
+        fingerprint,
+    )
+
+
+async def test_hysteresis(hass: HomeAssistant) -> None:
+    """A threshold fires once on the way down and once on recovery."""
+    events = async_capture_events(hass, EVENT_THRESHOLD)
+    monitor = ThresholdMonitor(hass)
+    await monitor.async_load()
+    monitor.async_set("486", None, 50, 5)
+
+    # The first snapshot only sets the state, then 52 and 54 sit in the band
+    for available in (60, 45, 40, 52, 54, 56, 58, 49):
+        monitor.async_evaluate(_snapshot(available))
+    await hass.async_block_till_done()
+
+    assert [(e.data["type"], e.data["available_spots"]) for e in events] == [
+        ("below", 45),
+        ("recovered", 56),
+        ("below", 49),
+    ]
+    assert events[0].data == {
+        "carpark_id": "486",
+        "zone_id": None,
+        "name": "Park&Ride - Gordon",
+        "type": "below",
+        "below": 50,
+        "available_spots": 45,
+    }
+
+
+async def test_starting_below(hass: HomeAssistant) -> None:
+    """A car park that is already below its threshold does not fire."""
+    events = async_capture_events(hass, EVENT_THRESHOLD)
+    monitor = ThresholdMonitor(hass)
+    await monitor.async_load()
+    monitor.async_set("486", None, 50, 5)
+    monitor.async_evaluate(_snapshot(10))
+    monitor.async_evaluate(_snapshot(20))
+    await hass.async_block_till_done()
+    assert events == []
+
+
+async def test_unchanged_snapshot_is_skipped(hass: HomeAssistant) -> None:
+    """A snapshot with an already evaluated fingerprint is ignored."""
+    events = async_capture_events(hass, EVENT_THRESHOLD)
+    monitor = ThresholdMonitor(hass)
+    await monitor.async_load()
+    monitor.async_set("486", None, 50, 5)
+    first = _snapshot(60)
+    monitor.async_evaluate(first)
+    monitor.async_evaluate(_snapshot(40, fingerprint=first.fingerprint))
+    await hass.async_block_till_done()
+    assert events == []
+
+
+async def test_zone_threshold(hass: HomeAssistant) -> None:
+    """Zone thresholds follow the zone rather than the car park."""
+    events = async_capture_events(hass, EVENT_THRESHOLD)
+    monitor = ThresholdMonitor(hass)
+    await monitor.async_load()
+    monitor.async_set("486", "1", 20, 5)
+    monitor.async_set("486", "2", 20, 5)
+    monitor.async_evaluate(_snapshot(0, zone_available=30))
+    monitor.async_evaluate(_snapshot(0, zone_available=10))
+    await hass.async_block_till_done()
+    assert [(e.data["zone_id"], e.data["type"]) for e in events] == [("1", "below")]
+
+
+async def test_set_remove_and_persist(hass: HomeAssistant, hass_storage) -> None:
+    """Thresholds are replaced by level, removed by zone and saved."""
+    monitor = ThresholdMonitor(hass)
+    await monitor.async_load()
+    monitor.async_set("486", None, 50, 5)
+    monitor.async_set("486", None, 50, 10)
+    monitor.async_set("486", None, 20, 5)
+    monitor.async_set("486", "1", 20, 5)
+    assert monitor.async_remove("486", None, 20) == 1
+    assert monitor.async_remove("487", None) == 0
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+
+    reloaded = ThresholdMonitor(hass)
+    await reloaded.async_load()
+    assert sorted(
+        (t.zone_id or "", t.below, t.hysteresis)
+        for t in reloaded._thresholds["486"]
+    ) == [("", 50, 10), ("1", 20, 5)]
+    assert reloaded.async_remove("486", "1") == 1